@@ -0,0 +1,197 @@
+import asyncio
+from collections import deque
+import ssl
+from typing import Deque, Dict, Optional, Tuple
+
+from exceptions import TransportError
+from transport import PoolStats, _HostKey, _split_url
+
+
+__all__ = [
+        "AsyncHTTPConnectionPool",
+        ]
+
+
+_StreamT = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+# broken or hostile response, connection state is unknown after it
+_RESPONSE_ERRORS = (
+        OSError,
+        asyncio.TimeoutError,
+        asyncio.IncompleteReadError,
+        asyncio.LimitOverrunError,
+        ValueError,
+        )
+
+
+class AsyncHTTPConnectionPool:
+    """asyncio variant of HTTPConnectionPool.
+
+    Implements only what weather service needs: GET requests
+    over HTTP/1.1 keep-alive with Content-Length or chunked body."""
+
+    def __init__(
+            self,
+            pool_size: int = 10,
+            connect_timeout: float = 3.0,
+            read_timeout: float = 10.0,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            ) -> None:
+        if pool_size < 1:
+            raise ValueError("pool_size must be positive")
+        self._pool_size = pool_size
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        if ssl_context is None:
+            ssl_context = ssl._create_unverified_context()
+        self._ssl_context = ssl_context
+        self._idle: Dict[_HostKey, Deque[_StreamT]] = {}
+        self._stats = PoolStats()
+
+    @property
+    def stats(self) -> PoolStats:
+        return self._stats
+
+    async def get(self, url: str) -> bytes:
+        """make GET request and return response body.
+
+        Connection goes back to pool only after complete response,
+        on any error or cancellation it is closed."""
+        key, path = _split_url(url)
+        stream, reused = await self._acquire(key)
+        released = False
+        try:
+            try:
+                status, body, keep = await self._request(stream, key, path)
+            except (asyncio.IncompleteReadError, ConnectionError) as err:
+                stream[1].close()
+                if not reused:
+                    raise TransportError(err) from err
+                self._stats.discarded += 1
+                self._stats.misses += 1
+                stream = await self._new_connection(key)
+                status, body, keep = await self._safe_request(
+                        stream,
+                        key,
+                        path,
+                        )
+            except _RESPONSE_ERRORS as err:
+                raise TransportError(err) from err
+            self._release(key, stream, keep)
+            released = True
+        finally:
+            if not released:
+                stream[1].close()
+        if status != 200:
+            raise TransportError(
+                    f"bad response status {status}",
+                    status=status,
+                    )
+        return body
+
+    async def close(self) -> None:
+        """close all idle connections."""
+        idle, self._idle = self._idle, {}
+        for streams in idle.values():
+            for _, writer in streams:
+                writer.close()
+
+    async def _acquire(self, key: _HostKey) -> Tuple[_StreamT, bool]:
+        self._stats.requests += 1
+        idle = self._idle.get(key)
+        while idle:
+            stream = idle.pop()
+            if stream[0].at_eof():
+                # closed by server while waiting in pool
+                stream[1].close()
+                continue
+            self._stats.hits += 1
+            return stream, True
+        self._stats.misses += 1
+        return await self._new_connection(key), False
+
+    def _release(self, key: _HostKey, stream: _StreamT, keep: bool) -> None:
+        idle = self._idle.setdefault(key, deque())
+        if keep and len(idle) < self._pool_size:
+            idle.append(stream)
+            return
+        stream[1].close()
+
+    async def _new_connection(self, key: _HostKey) -> _StreamT:
+        scheme, host, port = key
+        ssl_context = self._ssl_context if scheme == "https" else None
+        try:
+            return await asyncio.wait_for(
+                    asyncio.open_connection(host, port, ssl=ssl_context),
+                    self._connect_timeout,
+                    )
+        except (OSError, asyncio.TimeoutError) as err:
+            raise TransportError(err) from err
+
+    async def _request(
+            self,
+            stream: _StreamT,
+            key: _HostKey,
+            path: str,
+            ) -> Tuple[int, bytes, bool]:
+        reader, writer = stream
+        host = key[1]
+        writer.write(
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                "Connection: keep-alive\r\n"
+                "Accept-Encoding: identity\r\n\r\n".encode("latin-1")
+                )
+        await writer.drain()
+        return await asyncio.wait_for(
+                self._read_response(reader),
+                self._read_timeout,
+                )
+
+    async def _safe_request(
+            self,
+            stream: _StreamT,
+            key: _HostKey,
+            path: str,
+            ) -> Tuple[int, bytes, bool]:
+        try:
+            return await self._request(stream, key, path)
+        except _RESPONSE_ERRORS as err:
+            raise TransportError(err) from err
+
+    async def _read_response(
+            self,
+            reader: asyncio.StreamReader,
+            ) -> Tuple[int, bytes, bool]:
+        status_line = await reader.readuntil(b"\r\n")
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep = headers.get("connection", "").lower() != "close"
+        if version == "HTTP/1.0":
+            keep = headers.get("connection", "").lower() == "keep-alive"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body, keep = await reader.read(), False
+        return int(status), body, keep
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";", 1)[0], 16)
+            if not size:
+                # skip trailers
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
@@ -0,0 +1,195 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+import threading
+from typing import AsyncIterator, Iterable, Iterator, Optional, Set, Tuple
+
+from coordinates import Coordinates
+from exceptions import ApiServiceError
+from async_transport import AsyncHTTPConnectionPool
+from rate_limit import current_priority
+from single_flight import AsyncSingleFlight, FlightStats, flight_key
+from weather_api_service import ExternalWeatherService, _PARSE_ERRORS
+from weather_cache import DEFAULT_PRECISION
+from weather_models import WeatherModel
+
+
+__all__ = [
+        "AsyncWeatherService",
+        "WeatherResult",
+        ]
+
+
+@dataclass(slots=True, frozen=True)
+class WeatherResult:
+    """result of single lookup in batch."""
+    coordinates: Coordinates
+    weather: Optional[WeatherModel] = None
+    error: Optional[ApiServiceError] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AsyncWeatherService:
+    """asyncio front for ExternalWeatherService.
+
+    Network part is done by AsyncHTTPConnectionPool, url building
+    and response parsing are delegated to wrapped sync service,
+    so both paths produce identical models. Concurrent lookups of
+    one place (see single_flight.flight_key) share one request unless
+    coalesce is off. Requests are counted by rate limiter of wrapped
+    service; quota waits run in threads of their own, cancelled lookup
+    stops its wait without taking token."""
+
+    def __init__(
+            self,
+            service: ExternalWeatherService,
+            max_in_flight: int = 10,
+            client: Optional[AsyncHTTPConnectionPool] = None,
+            coalesce: bool = True,
+            precision: int = DEFAULT_PRECISION,
+            ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be positive")
+        self._service = service
+        self._max_in_flight = max_in_flight
+        if client is None:
+            client = AsyncHTTPConnectionPool(pool_size=max_in_flight)
+        self._client = client
+        self._precision = precision
+        self._flights: Optional[AsyncSingleFlight[WeatherModel]] = None
+        if coalesce:
+            self._flights = AsyncSingleFlight()
+        self._quota_executor: Optional[ThreadPoolExecutor] = None
+        self._quota_waits: Set[threading.Event] = set()
+
+    @property
+    def client(self) -> AsyncHTTPConnectionPool:
+        return self._client
+
+    @property
+    def coalescing_stats(self) -> Optional[FlightStats]:
+        if self._flights is None:
+            return None
+        return self._flights.stats
+
+    async def get_weather(self, coordinates: Coordinates) -> WeatherModel:
+        if self._flights is None:
+            return await self._fetch_weather(coordinates)
+        return await self._flights.do(
+                flight_key(self._service, coordinates, self._precision),
+                lambda: self._fetch_weather(coordinates),
+                )
+
+    async def get_raw_weather(self, coordinates: Coordinates) -> bytes:
+        url = self._service.weather_url(coordinates)
+        await self._acquire_quota()
+        return await self._client.get(url)
+
+    async def get_weather_many(
+            self,
+            coordinates: Iterable[Coordinates],
+            ) -> AsyncIterator[WeatherResult]:
+        """yield results in completion order.
+
+        No more than max_in_flight requests are running at once,
+        coordinates are pulled from iterable only when slot is free."""
+        pending: Set["asyncio.Task[WeatherResult]"] = set()
+        coords_iter = iter(coordinates)
+        try:
+            while True:
+                self._fill(pending, coords_iter)
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                        pending,
+                        return_when=asyncio.FIRST_COMPLETED,
+                        )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self) -> None:
+        limiter = self._service.rate_limiter
+        if self._quota_waits and limiter is not None:
+            for cancelled in self._quota_waits:
+                cancelled.set()
+            limiter.wake()
+        if self._quota_executor is not None:
+            self._quota_executor.shutdown(wait=False)
+            self._quota_executor = None
+        await self._client.close()
+
+    async def _acquire_quota(self) -> None:
+        limiter = self._service.rate_limiter
+        if limiter is None:
+            return
+        if self._quota_executor is None:
+            # limiter blocks while waiting for token, keep loop and
+            # default executor free; one wait per request in flight
+            self._quota_executor = ThreadPoolExecutor(
+                    self._max_in_flight,
+                    thread_name_prefix="weather-quota",
+                    )
+        cancelled = threading.Event()
+        self._quota_waits.add(cancelled)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                    self._quota_executor,
+                    partial(
+                        limiter.acquire,
+                        current_priority(),
+                        cancelled=cancelled,
+                        ),
+                    )
+        except asyncio.CancelledError:
+            # thread is not stopped by cancellation, tell it to give up
+            cancelled.set()
+            limiter.wake()
+            raise
+        finally:
+            self._quota_waits.discard(cancelled)
+
+    async def _fetch_weather(self, coordinates: Coordinates) -> WeatherModel:
+        response = await self.get_raw_weather(coordinates)
+        try:
+            return self._service.parse_weather(response)
+        except _PARSE_ERRORS as err:
+            # broken response fails its lookup only, not whole batch
+            raise ApiServiceError(err) from err
+
+    def _fill(
+            self,
+            pending: Set["asyncio.Task[WeatherResult]"],
+            coords_iter: Iterator[Coordinates],
+            ) -> None:
+        while len(pending) < self._max_in_flight:
+            coordinates = next(coords_iter, None)
+            if coordinates is None:
+                return
+            pending.add(asyncio.ensure_future(self._lookup(coordinates)))
+
+    async def _lookup(self, coordinates: Coordinates) -> WeatherResult:
+        try:
+            weather = await self.get_weather(coordinates)
+        except ApiServiceError as err:
+            return WeatherResult(coordinates, error=err)
+        return WeatherResult(coordinates, weather=weather)
+
+
+async def _main(coordinates: Iterable[Tuple[float, float]]) -> None:
+    from config import network_weather_service
+    service = AsyncWeatherService(network_weather_service)
+    coords = (Coordinates(lat, lon) for lat, lon in coordinates)
+    async for result in service.get_weather_many(coords):
+        print(result)
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main([(55.75, 37.62), (59.93, 30.31)]))
@@ -24,6 +24,8 @@ WT = TypeVar("WT", covariant=True)
 class WeatherArg(Generic[_T, _TC]):
     """Base generic type."""
 
+    __slots__ = ("_value", )
+
     def __init__(self, value: _T) -> None:
         self._value = value
 
@@ -36,6 +38,8 @@ class WeatherArg(Generic[_T, _TC]):
 class NumericArg(WeatherArg):
     """represents types like int and float."""
 
+    __slots__ = ()
+
     def __init__(self, value: Union[int, float]) -> None:
         self._value = value
 
@@ -50,6 +54,8 @@ class NumericArg(WeatherArg):
 class LiteralArg(WeatherArg):
     """Represents types like str | bytes."""
 
+    __slots__ = ()
+
     def __init__(self, value: Union[str, bytes]) -> None:
         self._value = value
 
@@ -65,6 +71,8 @@ class WeatherInfoPart(ABC):
     """class represents any isinstance
     of weather."""
 
+    __slots__ = ()
+
     @classmethod
     @abstractmethod
     def rebuild(cls: Type[WT], item: WeatherArg) -> WT:
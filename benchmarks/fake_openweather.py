@@ -0,0 +1,319 @@
+"""Local stand-in for OpenWeather current weather API.
+
+Run from repository root:
+
+    python -m benchmarks.fake_openweather [--port 8080]
+            [--latency lognormal:40:0.5] [--error-rate 0.01]
+            [--rate-limit 60]
+
+Serves GET /data/2.5/weather?lat=..&lon=.. and /data/2.5/group?id=..
+(up to 20 ids) in OpenWeather layout over HTTP/1.1 keep-alive. Point
+the CLI to it in .env:
+
+    OPENWEATHER_URL=http://127.0.0.1:8080/data/2.5/weather?\
+lat={latitude}&lon={longitude}
+
+Latency is drawn from distribution given as kind:params, milliseconds:
+fixed:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV, exp:MEAN,
+lognormal:MEDIAN:SIGMA. Share of requests given by --error-rate gets
+500, requests over --rate-limit per second get 429. Keep-alive socket
+idle for --idle-timeout seconds is closed by server, as real servers
+do."""
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+
+LatencyT = Callable[[random.Random], float]
+
+WEATHER_PATH = "/data/2.5/weather"
+GROUP_PATH = "/data/2.5/group"
+GROUP_SIZE = 20
+_CONDITIONS = [
+    (800, "Clear", "clear sky", "01d"),
+    (801, "Clouds", "few clouds", "02d"),
+    (804, "Clouds", "overcast clouds", "04d"),
+    (500, "Rain", "light rain", "10d"),
+    (600, "Snow", "light snow", "13d"),
+    (701, "Mist", "mist", "50d"),
+]
+
+
+def parse_latency(spec: str) -> LatencyT:
+    """distribution of response delay in seconds from kind:params."""
+    kind, *raw_params = spec.split(":")
+    try:
+        params = [float(param) for param in raw_params]
+    except ValueError:
+        raise ValueError(f"bad latency parameters: {spec}")
+    ms = 1 / 1000
+    if kind == "fixed" and len(params) == 1:
+        return lambda rnd: params[0] * ms
+    if kind == "uniform" and len(params) == 2:
+        return lambda rnd: rnd.uniform(params[0], params[1]) * ms
+    if kind == "normal" and len(params) == 2:
+        return lambda rnd: max(0.0, rnd.gauss(params[0], params[1])) * ms
+    if kind == "exp" and len(params) == 1 and params[0] > 0:
+        return lambda rnd: rnd.expovariate(1 / params[0]) * ms
+    if kind == "lognormal" and len(params) == 2 and params[0] > 0:
+        mu = math.log(params[0])
+        return lambda rnd: rnd.lognormvariate(mu, params[1]) * ms
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+@dataclass(slots=True)
+class FakeServerStats:
+    requests: int = 0
+    ok: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    bad_requests: int = 0
+
+
+@dataclass
+class FakeOpenWeather:
+    """behaviour of stand-in server, shared by handler threads."""
+    latency: LatencyT = field(default=parse_latency("fixed:0"))
+    error_rate: float = 0.0
+    rate_limit: Optional[int] = None
+    seed: Optional[int] = None
+    # seconds, keep-alive socket idle longer is closed by server
+    idle_timeout: Optional[float] = None
+    stats: FakeServerStats = field(default_factory=FakeServerStats)
+
+    def __post_init__(self) -> None:
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque()
+
+    def respond(self, path: str) -> Tuple[int, bytes, float]:
+        """status, body and delay for request path."""
+        with self._lock:
+            self.stats.requests += 1
+            delay = self.latency(self._random)
+            failed = self._random.random() < self.error_rate
+            limited = self._over_limit(time.monotonic())
+            if limited:
+                self.stats.rate_limited += 1
+        if limited:
+            return 429, _error_body(
+                    429,
+                    "Your account is temporary blocked due to exceeding "
+                    "of requests limitation of your subscription type.",
+                    ), 0.0
+        query = urlsplit(path)
+        params = parse_qs(query.query)
+        body: Optional[bytes] = None
+        if query.path == WEATHER_PATH:
+            body = _weather_response(params)
+        elif query.path == GROUP_PATH:
+            body = _group_response(params)
+        if body is None:
+            with self._lock:
+                self.stats.bad_requests += 1
+            return 400, _error_body(400, "Nothing to geocode"), delay
+        if failed:
+            with self._lock:
+                self.stats.errors += 1
+            return 500, _error_body(500, "Internal error"), delay
+        with self._lock:
+            self.stats.ok += 1
+        return 200, body, delay
+
+    def _over_limit(self, now: float) -> bool:
+        """sliding one second window, called under lock."""
+        if self.rate_limit is None:
+            return False
+        while self._recent and now - self._recent[0] >= 1.0:
+            self._recent.popleft()
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+
+def _error_body(code: int, message: str) -> bytes:
+    return json.dumps({"cod": code, "message": message}).encode()
+
+
+def _weather_response(params: Dict[str, List[str]]) -> Optional[bytes]:
+    try:
+        latitude = float(params["lat"][0])
+        longitude = float(params["lon"][0])
+    except (KeyError, ValueError):
+        return None
+    if math.isnan(latitude + longitude):
+        return None
+    return weather_body(latitude, longitude)
+
+
+def _group_response(params: Dict[str, List[str]]) -> Optional[bytes]:
+    try:
+        ids = [int(city_id) for city_id in params["id"][0].split(",")]
+    except (KeyError, ValueError):
+        return None
+    if not 0 < len(ids) <= GROUP_SIZE:
+        return None
+    records = [
+        weather_record(*_place_of(city_id), city_id=city_id)
+        for city_id in ids
+    ]
+    return json.dumps(
+            {"cnt": len(records), "list": records},
+            ensure_ascii=False,
+            ).encode()
+
+
+def _place_of(city_id: int) -> Tuple[float, float]:
+    """made up but stable coordinates of city id."""
+    return (
+        city_id % 14000 / 100 - 70,
+        city_id // 14000 % 36000 / 100 - 180,
+    )
+
+
+def weather_body(latitude: float, longitude: float) -> bytes:
+    """current weather response, stable for the same place and hour."""
+    return json.dumps(
+            weather_record(latitude, longitude),
+            ensure_ascii=False,
+            ).encode()
+
+
+def weather_record(
+        latitude: float,
+        longitude: float,
+        city_id: Optional[int] = None,
+        ) -> Dict[str, Any]:
+    now = int(time.time())
+    place = round(latitude, 2), round(longitude, 2)
+    rnd = random.Random(hash(place) ^ (now // 3600))
+    weather_id, main, description, icon = rnd.choice(_CONDITIONS)
+    temp = round(25 - abs(latitude) * 0.6 + rnd.uniform(-5, 5), 2)
+    if city_id is None:
+        city_id = abs(hash(place)) % 10_000_000
+    return {
+        "coord": {"lon": longitude, "lat": latitude},
+        "weather": [{"id": weather_id, "main": main,
+                     "description": description, "icon": icon}],
+        "base": "stations",
+        "main": {"temp": temp, "feels_like": temp - 1.5,
+                 "pressure": 1013, "humidity": 70},
+        "visibility": 10000,
+        "wind": {"speed": round(rnd.uniform(0, 10), 1), "deg": 180},
+        "clouds": {"all": rnd.randrange(100)},
+        "dt": now - now % 600,
+        "sys": {"country": "XX", "sunrise": now - now % 86400 + 21600,
+                "sunset": now - now % 86400 + 64800},
+        "timezone": 0,
+        "id": city_id,
+        "name": f"Place {place[0]:.2f} {place[1]:.2f}",
+        "cod": 200,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go in separate writes, Nagle would hold body
+    disable_nagle_algorithm = True
+    server: "FakeOpenWeatherServer"
+
+    def setup(self) -> None:
+        # socket timeout, on expiry connection is closed
+        self.timeout = self.server.fake.idle_timeout
+        super().setup()
+
+    def do_GET(self) -> None:
+        status, body, delay = self.server.fake.respond(self.path)
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class FakeOpenWeatherServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address: Tuple[str, int],
+            fake: FakeOpenWeather,
+            ) -> None:
+        super().__init__(address, _Handler)
+        self.fake = fake
+
+    @property
+    def url_template(self) -> str:
+        host, port = self.server_address[:2]
+        return (f"http://{host}:{port}{WEATHER_PATH}?"
+                "lat={latitude}&lon={longitude}")
+
+
+def start_server(
+        fake: FakeOpenWeather,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ) -> FakeOpenWeatherServer:
+    """serve in background thread, port 0 picks free one."""
+    server = FakeOpenWeatherServer((host, port), fake)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def add_fake_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument("--latency", default="fixed:0",
+                        help="delay distribution, e.g. lognormal:40:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of 500 responses, 0..1")
+    parser.add_argument("--rate-limit", type=int,
+                        help="requests per second, 429 above it")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--idle-timeout", type=float, metavar="SECONDS",
+                        help="close keep-alive socket idle for SECONDS")
+
+
+def fake_from_args(args: Namespace) -> FakeOpenWeather:
+    return FakeOpenWeather(
+            latency=parse_latency(args.latency),
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+            seed=args.seed,
+            idle_timeout=args.idle_timeout,
+            )
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_fake_arguments(parser)
+    args = parser.parse_args()
+    fake = fake_from_args(args)
+    server = FakeOpenWeatherServer((args.host, args.port), fake)
+    print(f"OPENWEATHER_URL={server.url_template}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(asdict(fake.stats)))
+
+
+if __name__ == "__main__":
+    main()
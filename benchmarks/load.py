@@ -0,0 +1,174 @@
+"""Load test of OPW_WeatherService against local stand-in server.
+
+Run from repository root:
+
+    python -m benchmarks.load [--rps 200] [--duration 10] [--workers 16]
+            [--latency lognormal:40:0.5] [--error-rate 0.01]
+            [--rate-limit 1000] [--url TEMPLATE] [--json]
+
+Without --url starts benchmarks.fake_openweather in process on a free
+port. Requests are scheduled at fixed rate (open loop): latency is
+counted from planned start, so time spent waiting for a free worker
+is included and slow responses do not hide behind lower load."""
+from argparse import ArgumentParser, Namespace
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from benchmarks.fake_openweather import (
+        add_fake_arguments,
+        fake_from_args,
+        start_server,
+)
+from coordinates import Coordinates
+from exceptions import ApiServiceError, TransportError
+from transport import HTTPConnectionPool
+from weather_api_service import OPW_WeatherService
+
+
+def percentile(ordered: Sequence[float], share: float) -> float:
+    """nearest rank percentile of sorted values."""
+    if not ordered:
+        return float("nan")
+    rank = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class LoadResult:
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, latency: float, outcome: str) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes[outcome] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, object]:
+        ordered = sorted(self.latencies)
+        ok = self.outcomes["ok"]
+        return {
+            "requests": len(ordered),
+            "outcomes": dict(self.outcomes),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(ordered) / elapsed, 1),
+            "ok_rps": round(ok / elapsed, 1),
+            "latency_ms": {
+                name: round(percentile(ordered, share) * 1000, 2)
+                for name, share in (
+                    ("p50", 0.50),
+                    ("p95", 0.95),
+                    ("p99", 0.99),
+                    ("max", 1.0),
+                )
+            },
+        }
+
+
+def _outcome(err: Optional[Exception]) -> str:
+    if err is None:
+        return "ok"
+    if isinstance(err, TransportError) and err.status is not None:
+        return f"http_{err.status}"
+    return type(err).__name__
+
+
+def run_load(
+        service: OPW_WeatherService,
+        rps: float,
+        duration: float,
+        workers: int,
+        places: Sequence[Coordinates],
+        ) -> Dict[str, object]:
+    result = LoadResult()
+
+    def call(planned: float, coordinates: Coordinates) -> None:
+        error: Optional[Exception] = None
+        try:
+            service.get_weather(coordinates)
+        except ApiServiceError as err:
+            error = err
+        result.add(time.perf_counter() - planned, _outcome(error))
+
+    total = int(rps * duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i in range(total):
+            planned = started + i / rps
+            delay = planned - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(call, planned, places[i % len(places)])
+    return result.summary(time.perf_counter() - started)
+
+
+def random_places(count: int, seed: int = 0) -> List[Coordinates]:
+    rnd = random.Random(seed)
+    return [
+        Coordinates(round(rnd.uniform(-60, 70), 4),
+                    round(rnd.uniform(-180, 180), 4))
+        for _ in range(count)
+    ]
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="weather URL template, "
+                        "default is in-process stand-in server")
+    parser.add_argument("--rps", type=float, default=200.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--places", type=int, default=100)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    add_fake_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(fake_from_args(args))
+        url = server.url_template
+    transport = HTTPConnectionPool(pool_size=args.workers)
+    service = OPW_WeatherService(url, "metric", transport)
+    try:
+        summary = run_load(
+                service,
+                args.rps,
+                args.duration,
+                args.workers,
+                random_places(args.places),
+                )
+    finally:
+        transport.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    summary["target_rps"] = args.rps
+    summary["pool"] = {
+        "hit_rate": round(transport.stats.hit_rate, 3),
+        "discarded": transport.stats.discarded,
+    }
+    if args.json:
+        print(json.dumps(summary))
+        return
+    latency = summary["latency_ms"]
+    print(f"target {args.rps:.0f} rps, "
+          f"done {summary['throughput_rps']} rps "
+          f"({summary['ok_rps']} ok) in {summary['elapsed_s']} s")
+    print("latency ms: " + "  ".join(
+        f"{name} {value}" for name, value in latency.items()  # type: ignore
+        ))
+    print(f"outcomes: {summary['outcomes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Memory footprint of WeatherModel.
+
+Run from repository root:
+
+    python -m benchmarks.memory [--count N]
+
+Builds N models from OpenWeather responses through the public
+OPW_WeatherService.parse_weather and reports traced bytes per model.
+For comparison the same responses are turned into models of the
+layout used before slots and shared values: boxed values in objects
+with __dict__, fresh description and temperature per model."""
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from datetime import datetime
+import json
+import tracemalloc
+from typing import Any, Callable, Iterator, List, Optional
+
+from weather_api_service import OPW_WeatherService
+
+
+_CONDITIONS = [
+    ("Clouds", "few clouds"),
+    ("Clouds", "overcast clouds"),
+    ("Rain", "light rain"),
+    ("Clear", "clear sky"),
+    ("Snow", "snow"),
+]
+
+
+def responses(count: int) -> Iterator[bytes]:
+    """responses are made one by one, so only models stay in memory."""
+    for i in range(count):
+        main, description = _CONDITIONS[i % len(_CONDITIONS)]
+        yield json.dumps({
+            "main": {"temp": (i % 700) / 10 - 35},
+            "weather": [{"main": main, "description": description}],
+            "sys": {"sunrise": 1700000000 + i, "sunset": 1700040000 + i},
+            "name": "Moscow",
+            "dt": 1700020000 + i,
+        }).encode()
+
+
+class _Boxed:
+    def __init__(self, value: Any) -> None:
+        self._value = value
+
+
+class _BaselineTemperature:
+    def __init__(self, value: _Boxed) -> None:
+        self._temp = value
+        self._temp_kind = "℃"
+
+
+@dataclass(slots=True)
+class _BaselineDescription:
+    main: str
+    description: str
+
+
+@dataclass
+class _BaselineModel:
+    temperature: _BaselineTemperature
+    weather_type: _BaselineDescription
+    sunrise: datetime
+    sunset: datetime
+    city: str
+    observed_at: Optional[datetime] = None
+
+
+def _baseline_model(resp: bytes) -> _BaselineModel:
+    data = json.loads(resp)
+    weather = data["weather"][0]
+    return _BaselineModel(
+        temperature=_BaselineTemperature(_Boxed(round(data["main"]["temp"]))),
+        weather_type=_BaselineDescription(
+            weather["main"],
+            weather["description"],
+            ),
+        sunrise=datetime.fromtimestamp(data["sys"]["sunrise"]),
+        sunset=datetime.fromtimestamp(data["sys"]["sunset"]),
+        city=data["name"],
+        observed_at=datetime.fromtimestamp(data["dt"]),
+    )
+
+
+def measure(count: int, build: Callable[[bytes], Any]) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    models: List[Any] = [build(resp) for resp in responses(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(models) == count
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+    service = OPW_WeatherService("http://localhost/{latitude}/{longitude}",
+                                 "metric")
+    baseline = measure(args.count, _baseline_model)
+    current = measure(args.count, service.parse_weather)
+    if args.json:
+        print(json.dumps({
+            "count": args.count,
+            "baseline_bytes_per_model": baseline,
+            "bytes_per_model": current,
+        }))
+    else:
+        print(f"{args.count} models, bytes per WeatherModel:")
+        print(f"  baseline layout  {baseline:8.1f}")
+        print(f"  slots + shared   {current:8.1f}"
+              f"  ({1 - current / baseline:.0%} less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Microbenchmarks of parse, format, paint, print, storage and spatial index.
+
+Run from repository root:
+
+    python -m benchmarks.micro [--output FILE] [--baseline FILE]
+
+Inputs are synthetic, nothing goes to network. Every case reports best
+of several repeats in nanoseconds per operation. With --baseline
+results are compared with stored ones and cases slower by more than
+--threshold are reported as regressions (exit code 1)."""
+from argparse import ArgumentParser, Namespace
+from contextlib import contextmanager
+from datetime import datetime
+import io
+import json
+from pathlib import Path
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict, Iterator, List, Optional
+
+from colors import (
+        DrawMode,
+        Unicode256WeatherPalette,
+        WeatherPainter,
+)
+from columnar_storage import ColumnarWeatherStorage
+from coordinates import Coordinates
+from history import JSONLinesWeatherStorage, PlainFileWeatherStorage
+from history import SQLiteWeatherStorage, WeatherStorage
+from spatial_cache import SpatialIndex
+import view
+from view import CurrentWeatherPrinter, DisplaySettings
+from weather_api_service import OPW_WeatherService
+from weather_formatter import OpenweatherColorFormatter
+from weather_models import CelsiusTemperature, WeatherModel
+
+
+BenchT = Callable[[], None]
+
+_CONDITIONS = [
+    ("Clear", "clear sky"),
+    ("Clouds", "few clouds"),
+    ("Clouds", "overcast clouds"),
+    ("Rain", "light rain"),
+    ("Snow", "snow"),
+    ("Thunderstorm", "thunderstorm"),
+    ("Mist", "mist"),
+]
+_SAMPLES = 256
+
+
+def synthetic_responses(count: int = _SAMPLES) -> List[bytes]:
+    """current weather responses in OpenWeather layout."""
+    responses = []
+    for i in range(count):
+        main, description = _CONDITIONS[i % len(_CONDITIONS)]
+        dt = 1_700_000_000 + i * 600
+        responses.append(json.dumps({
+            "coord": {"lon": 37.62, "lat": 55.75},
+            "weather": [{"id": 800, "main": main,
+                         "description": description, "icon": "01d"}],
+            "base": "stations",
+            "main": {"temp": (i % 700) / 10 - 35, "feels_like": -1.5,
+                     "pressure": 1012, "humidity": 80},
+            "visibility": 10000,
+            "wind": {"speed": 3.1, "deg": 200},
+            "clouds": {"all": i % 100},
+            "dt": dt,
+            "sys": {"country": "RU", "sunrise": dt - 20_000,
+                    "sunset": dt + 10_000},
+            "timezone": 10800,
+            "id": 524901,
+            "name": "Moscow",
+            "cod": 200,
+        }).encode())
+    return responses
+
+
+def _service() -> OPW_WeatherService:
+    return OPW_WeatherService("http://localhost/{latitude}/{longitude}",
+                              "metric")
+
+
+def synthetic_models(count: int = _SAMPLES) -> List[WeatherModel]:
+    service = _service()
+    return [service.parse_weather(resp) for resp in synthetic_responses(count)]
+
+
+def _formatter(mode: DrawMode) -> OpenweatherColorFormatter:
+    from config import Container
+    return OpenweatherColorFormatter(Container({}).colorisers, mode)
+
+
+def _cycle(items: List) -> Callable[[], object]:
+    """endless supply of items, cheap compared to measured code."""
+    state = {"pos": 0}
+    size = len(items)
+
+    def next_item() -> object:
+        pos = state["pos"]
+        state["pos"] = (pos + 1) % size
+        return items[pos]
+    return next_item
+
+
+@contextmanager
+def _quiet_view() -> Iterator[None]:
+    """printers write to view.stdout, send it to memory."""
+    original = view.stdout
+    sink = io.StringIO()
+    view.stdout = sink
+    try:
+        yield
+    finally:
+        view.stdout = original
+
+
+def _bench_parse() -> BenchT:
+    service = _service()
+    next_resp = _cycle(synthetic_responses())
+    return lambda: service._parse_weather_service_response(next_resp())
+
+
+def _bench_format(mode: DrawMode) -> Callable[[], BenchT]:
+    def setup() -> BenchT:
+        formatter = _formatter(mode)
+        next_model = _cycle(synthetic_models())
+        return lambda: formatter.format_weather(next_model())
+    return setup
+
+
+def _bench_paint() -> BenchT:
+    painter = WeatherPainter(Unicode256WeatherPalette())
+    next_temperature = _cycle(
+            [CelsiusTemperature.of(value) for value in range(-40, 41)],
+            )
+    return lambda: painter.paint_in_color(next_temperature())
+
+
+def _bench_printer() -> BenchT:
+    printer = CurrentWeatherPrinter(DisplaySettings("%H:%M"))
+    formatter = _formatter(DrawMode.FULLCOLOR)
+    next_weather = _cycle(list(formatter.format_many(synthetic_models())))
+
+    def display() -> None:
+        with _quiet_view():
+            printer.display_weather(next_weather())
+    return display
+
+
+_SPATIAL_POINTS = 50_000
+
+
+def synthetic_places(count: int, seed: int = 1) -> List[Coordinates]:
+    """random places in 100 km square around Moscow."""
+    rnd = random.Random(seed)
+    return [
+        Coordinates(
+            latitude=55.75 + rnd.uniform(-0.45, 0.45),
+            longitude=37.62 + rnd.uniform(-0.8, 0.8),
+            )
+        for _ in range(count)
+    ]
+
+
+def _spatial_index() -> SpatialIndex[int]:
+    index: SpatialIndex[int] = SpatialIndex(500.0)
+    for number, place in enumerate(synthetic_places(_SPATIAL_POINTS)):
+        index.insert(place, number, float(number))
+    return index
+
+
+def _bench_spatial_insert() -> BenchT:
+    """insert with oldest point dropped, index stays full."""
+    index = _spatial_index()
+    next_place = _cycle(synthetic_places(_SAMPLES, seed=2))
+
+    def insert() -> None:
+        index.insert(next_place(), 0, 0.0)  # type: ignore[arg-type]
+        index.trim(_SPATIAL_POINTS)
+    return insert
+
+
+def _bench_spatial_nearest() -> BenchT:
+    index = _spatial_index()
+    next_place = _cycle(synthetic_places(_SAMPLES, seed=3))
+    return lambda: index.nearest(next_place(), 500.0)  # type: ignore[arg-type]
+
+
+def _bench_storage(
+        build: Callable[[Path], WeatherStorage],
+        ) -> Callable[[Path], BenchT]:
+    def setup(workdir: Path) -> BenchT:
+        storage = build(workdir)
+        next_model = _cycle(synthetic_models())
+        return lambda: storage.save(next_model())
+    return setup
+
+
+GLOBAL_CASES: Dict[str, Callable[[], BenchT]] = {
+    "parse.opw_weather": _bench_parse,
+    "format.fullcolor": _bench_format(DrawMode.FULLCOLOR),
+    "format.nocolor": _bench_format(DrawMode.NOCOLOR),
+    "paint.weather_painter": _bench_paint,
+    "print.current_weather": _bench_printer,
+    "spatial.insert": _bench_spatial_insert,
+    "spatial.nearest": _bench_spatial_nearest,
+}
+
+STORAGE_CASES: Dict[str, Callable[[Path], BenchT]] = {
+    "save.plain_file": _bench_storage(
+        lambda d: PlainFileWeatherStorage(d / "history.txt"),
+        ),
+    "save.jsonlines": _bench_storage(
+        lambda d: JSONLinesWeatherStorage(d / "history.jsonl"),
+        ),
+    "save.sqlite": _bench_storage(
+        lambda d: SQLiteWeatherStorage(d / "history.sqlite3"),
+        ),
+    "save.columnar": _bench_storage(
+        lambda d: ColumnarWeatherStorage(d / "columns"),
+        ),
+}
+
+
+def time_case(bench: BenchT, repeat: int, min_time: float) -> float:
+    """best time of one call, nanoseconds."""
+    timer = timeit.Timer(bench)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(number, int(number * min_time / elapsed))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e9
+
+
+def run(
+        names: Optional[str],
+        repeat: int,
+        min_time: float,
+        ) -> Dict[str, float]:
+    results = {}
+    for name, setup in GLOBAL_CASES.items():
+        if names is None or names in name:
+            results[name] = time_case(setup(), repeat, min_time)
+    for name, storage_setup in STORAGE_CASES.items():
+        if names is None or names in name:
+            with tempfile.TemporaryDirectory() as workdir:
+                bench = storage_setup(Path(workdir))
+                results[name] = time_case(bench, repeat, min_time)
+    return results
+
+
+def compare(
+        results: Dict[str, float],
+        baseline: Dict[str, float],
+        threshold: float,
+        ) -> List[str]:
+    """names of cases slower than baseline by more than threshold."""
+    return [
+        name for name, ns in results.items()
+        if name in baseline and ns > baseline[name] * (1 + threshold)
+    ]
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="run cases containing substring")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds per repeat")
+    parser.add_argument("--output", type=Path, help="save results as JSON")
+    parser.add_argument("--baseline", type=Path,
+                        help="JSON saved by --output to compare with")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown, 0.15 is 15%%")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = run(args.filter, args.repeat, args.min_time)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "ns_per_op": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    baseline: Dict[str, float] = {}
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["ns_per_op"]
+    regressions = compare(results, baseline, args.threshold)
+    for name, ns in results.items():
+        line = f"{name:<24}{ns:>12.0f} ns/op"
+        if name in baseline:
+            line += f"  x{ns / baseline[name]:.2f} vs baseline"
+        if name in regressions:
+            line += "  REGRESSION"
+        print(line)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Response parsing throughput.
+
+Run from repository root:
+
+    python -m benchmarks.parsing [--rounds N] [--json]
+
+Parses corpus of recorded current weather responses
+(fixtures/weather_responses.jsonl) with OPW_WeatherService for stdlib
+json (default without optional decoders), for opt-in select_fields
+(stdlib, needed fields only) and for every faster decoder that is
+installed."""
+from argparse import ArgumentParser
+import importlib
+import json
+from pathlib import Path
+import time
+from typing import Callable, Dict, List
+
+from exceptions import ApiServiceError
+from weather_api_service import JSONLoadsT, OPW_WeatherService
+from weather_api_service import select_fields
+from weather_models import WeatherModel
+
+
+CORPUS = (
+    Path(__file__).resolve().parent.parent
+    / "fixtures" / "weather_responses.jsonl"
+)
+OPTIONAL_DECODERS = ("orjson", "ujson")
+
+
+def load_corpus(path: Path = CORPUS) -> List[bytes]:
+    with open(path, "rb") as f:
+        return [line.rstrip(b"\n") for line in f if line.strip()]
+
+
+def available_decoders() -> Dict[str, JSONLoadsT]:
+    decoders: Dict[str, JSONLoadsT] = {
+        "json": json.loads,
+        "selective": select_fields,
+    }
+    for name in OPTIONAL_DECODERS:
+        try:
+            decoders[name] = importlib.import_module(name).loads
+        except ImportError:
+            pass
+    return decoders
+
+
+def _throughput(
+        parse: Callable[[bytes], WeatherModel],
+        corpus: List[bytes],
+        rounds: int,
+        ) -> float:
+    """responses per second."""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for resp in corpus:
+            parse(resp)
+    return rounds * len(corpus) / (time.perf_counter() - started)
+
+
+def run(rounds: int, corpus: List[bytes]) -> Dict[str, float]:
+    results = {}
+    for name, loads in available_decoders().items():
+        service = OPW_WeatherService("", "metric", loads=loads)
+        results[name] = _throughput(
+                service.parse_weather,
+                corpus,
+                rounds,
+                )
+    return results
+
+
+def check_errors() -> None:
+    """broken responses must raise ApiServiceError only."""
+    service = OPW_WeatherService("", "metric")
+    valid = load_corpus()[0]
+    for resp in (b"", b"{", b"[]", b"{}", b'{"main": {}}', b'{"sys": 1}',
+                 valid[:-1], valid + b"}"):
+        try:
+            service.parse_weather(resp)
+        except ApiServiceError:
+            continue
+        raise AssertionError(f"parsed broken response {resp!r}")
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+    check_errors()
+    corpus = load_corpus()
+    results = run(args.rounds, corpus)
+    if args.json:
+        print(json.dumps({"responses": len(corpus), "per_second": results}))
+        return
+    baseline = results["json"]
+    for name, per_second in results.items():
+        print(f"{name:<20} {per_second:>10.0f} resp/s  "
+              f"x{per_second / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cold start benchmark of the weather CLI.
+
+Run from repository root:
+
+    python -m benchmarks.startup [--runs N] [--json]
+
+Measures `python -X importtime -c "import config"` cumulative time,
+building of formatter / printer from synthetic config and wall time
+of `weather --help`. Exits with 1 if median exceeds budget."""
+from argparse import ArgumentParser, Namespace
+import json
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# cold start budgets, milliseconds (medians)
+BUDGETS_MS: Dict[str, float] = {
+    "import_config": 30.0,
+    "compose_view": 120.0,
+    "cli_help": 150.0,
+}
+
+_COMPOSE_SCRIPT = (
+    "import config;"
+    "c = config.Container({'OPW_DEF_UNITS': 'metric', 'OPW_DEF_LANG': 'ru',"
+    " 'OPW_APIKEY': 'x', 'DATETIME_FMT': '%H:%M', 'DB_FILENAME': 'x'});"
+    "c.formatter; c.weather_printer"
+)
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+            [sys.executable, *args],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+            )
+
+
+def _wall_ms(args: List[str]) -> Callable[[], float]:
+    def measure() -> float:
+        start = time.perf_counter()
+        _run(args)
+        return (time.perf_counter() - start) * 1000
+    return measure
+
+
+def _import_config_ms() -> float:
+    """cumulative import time of config module itself."""
+    stderr = _run(["-X", "importtime", "-c", "import config"]).stderr
+    for line in stderr.splitlines():
+        _, self_us, cumulative_us, name = (
+                [part.strip() for part in line.replace(":", "|", 1).split("|")]
+                )
+        if name == "config":
+            return int(cumulative_us) / 1000
+    raise RuntimeError("config is not found in importtime output")
+
+
+def measure(runs: int) -> Dict[str, float]:
+    probes: Dict[str, Callable[[], float]] = {
+        "import_config": _import_config_ms,
+        "compose_view": _wall_ms(["-c", _COMPOSE_SCRIPT]),
+        "cli_help": _wall_ms(["weather", "--help"]),
+    }
+    return {
+        name: statistics.median(probe() for _ in range(runs))
+        for name, probe in probes.items()
+    }
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = measure(args.runs)
+    over_budget = [
+        name for name, value in results.items() if value > BUDGETS_MS[name]
+    ]
+    if args.json:
+        print(json.dumps({"results_ms": results, "budgets_ms": BUDGETS_MS}))
+    else:
+        for name, value in results.items():
+            mark = "OVER" if name in over_budget else "ok"
+            print(f"{name:<16}{value:8.1f} ms  "
+                  f"(budget {BUDGETS_MS[name]:.0f} ms) {mark}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
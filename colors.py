@@ -1,6 +1,6 @@
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Dict
 from abc import ABC, abstractmethod
 from typing import Mapping
 
@@ -53,28 +53,38 @@ class BasePainter(WeatherColorizer):
         self._palette = palette
 
 
-def _get_icon_color(icon: LiteralT) -> Optional[int]:
-    """fetch icon color by icon type."""
-    return _ICON_COLORS_MAP.get(icon, None)
-
-
 class Unicode256WeatherPalette(BaseWeatherPalette):
+    """colors depend on temperature decade, table is built once."""
 
     _max_color_shift = 3
 
     def __init__(self) -> None:
         self._shift = 6
+        self._zero_color = WeatherColor(self._fetch_color_from_palette(0, 0))
+        # decade (value // 10) -> color, decades out of range are clamped
+        self._by_decade: Dict[int, WeatherColor] = {
+            decade: WeatherColor(
+                self._fetch_color_from_palette(decade * 10 + 5, abs(decade)),
+                )
+            for decade in range(
+                -self._max_color_shift,
+                self._max_color_shift + 1,
+                )
+        }
 
     def set_color_by(self, item: ColorableT) -> WeatherColor:
         abs_temp_value = item.value
         return self._mix_color(abs_temp_value)
 
     def _mix_color(self, value: float) -> WeatherColor:
-        col_shift = int(abs(value // 10))
-        if col_shift > self._max_color_shift:
-            col_shift = self._max_color_shift
-        color = self._fetch_color_from_palette(value, col_shift)
-        return WeatherColor(color)
+        if value == 0:
+            return self._zero_color
+        decade = int(value // 10)
+        if decade > self._max_color_shift:
+            decade = self._max_color_shift
+        elif decade < -self._max_color_shift:
+            decade = -self._max_color_shift
+        return self._by_decade[decade]
 
     def _fetch_color_from_palette(self, tempr_val: float, shift: int) -> int:
         color = None
@@ -88,18 +98,20 @@ class Unicode256WeatherPalette(BaseWeatherPalette):
 
 
 class Unicode256WeatherIconPalette(BaseWeatherPalette):
+    """icon colors, table is built once."""
+
+    def __init__(self) -> None:
+        self._default_color = WeatherColor(UnicodeColorsBaseCodes.ZERO.value)
+        self._by_icon: Dict[LiteralT, WeatherColor] = {
+            icon: WeatherColor(color)
+            for icon, color in _ICON_COLORS_MAP.items()
+        }
 
     def set_color_by(self, icon: ColorableT) -> WeatherColor:
         return self._mix_color(icon)
 
     def _mix_color(self, icon: ColorableT) -> WeatherColor:
-        color = self._fetch_clr_from_palette(icon)
-        if color is None:
-            color = UnicodeColorsBaseCodes.ZERO
-        return WeatherColor(color)
-
-    def _fetch_clr_from_palette(self, icon: ColorableT) -> Optional[int]:
-        return _get_icon_color(icon.value)
+        return self._by_icon.get(icon.value, self._default_color)
 
 
 class WeatherPainter(BasePainter):
@@ -0,0 +1,310 @@
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from typing import Tuple
+
+from exceptions import StorageError
+from history import Observation, make_observation
+from weather_models import WeatherModel
+from weather_utils import TemperatureScaleKind
+
+try:
+    import numpy as np  # type: ignore[import]
+except ImportError:
+    np = None
+
+
+__all__ = [
+        "ColumnarWeatherStorage",
+        ]
+
+
+# column name -> array typecode, files are in native byte order
+_COLUMNS: Dict[str, str] = {
+    "observed_at": "d",
+    "temperature": "d",
+    "sunrise": "d",
+    "sunset": "d",
+    "scale": "B",
+    "city": "H",
+    "condition": "H",
+}
+_SCALES: Sequence[str] = tuple(kind.value for kind in TemperatureScaleKind)
+_DICTIONARY_FILE = "dictionary.jsonl"
+
+
+class _Dictionary:
+    """value <-> code mapping for dictionary encoded column."""
+
+    def __init__(self, typecode: str) -> None:
+        self.values: List = []
+        self.codes: Dict = {}
+        # distinct values code column can hold
+        self.capacity = 1 << (8 * array(typecode).itemsize)
+
+    def add(self, value) -> int:
+        code = len(self.values)
+        if code >= self.capacity:
+            raise StorageError(
+                    f"more than {self.capacity} distinct values"
+                    " in dictionary encoded column",
+                    )
+        self.values.append(value)
+        self.codes[value] = code
+        return code
+
+    def truncate(self, size: int) -> None:
+        """forget values added after first size ones."""
+        for value in self.values[size:]:
+            del self.codes[value]
+        del self.values[size:]
+
+
+class ColumnarWeatherStorage:
+    """Store observations in binary column files inside directory.
+
+    Every column is plain array of fixed width items, city and weather
+    condition are dictionary encoded. Reads map only needed columns
+    with mmap and never copy them. Single writer is expected."""
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._dicts = {
+            name: _Dictionary(_COLUMNS[name]) for name in ("city", "condition")
+        }
+        self._rows = 0
+        self._init_storage()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def save(self, weather: WeatherModel) -> None:
+        self.save_many((weather, ))
+
+    def save_many(self, weathers: Iterable[WeatherModel]) -> None:
+        """encode batch in memory, then append once to every column."""
+        columns = {name: array(code) for name, code in _COLUMNS.items()}
+        new_entries: List[str] = []
+        sizes = {name: len(d.values) for name, d in self._dicts.items()}
+        try:
+            self._encode_batch(weathers, columns, new_entries)
+        except StorageError:
+            # nothing is written, codes of failed batch must not stay
+            for name, size in sizes.items():
+                self._dicts[name].truncate(size)
+            raise
+        try:
+            # dictionary goes first, so written codes are always known
+            if new_entries:
+                with open(self._path(_DICTIONARY_FILE), "a") as f:
+                    f.writelines(new_entries)
+            for name, values in columns.items():
+                with open(self._column_path(name), "ab") as f:
+                    values.tofile(f)
+        except OSError as err:
+            raise StorageError(err) from err
+        self._rows += len(columns["observed_at"])
+
+    def iter_observations(
+            self,
+            city: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            ) -> Iterator[Observation]:
+        """yield matching records in observed_at order."""
+        names = list(_COLUMNS)
+        with self._read_columns(*names) as cols:
+            rows = self._select(cols, city, start, end)
+            cities = self._dicts["city"].values
+            conditions = self._dicts["condition"].values
+            for row in rows:
+                main, description = conditions[cols["condition"][row]]
+                yield Observation(
+                        city=cities[cols["city"][row]],
+                        temperature=cols["temperature"][row],
+                        scale=_SCALES[cols["scale"][row]],
+                        main=main,
+                        description=description,
+                        sunrise=datetime.fromtimestamp(cols["sunrise"][row]),
+                        sunset=datetime.fromtimestamp(cols["sunset"][row]),
+                        observed_at=datetime.fromtimestamp(
+                            cols["observed_at"][row],
+                            ),
+                        )
+
+    def temperature_series(
+            self,
+            city: str,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            ) -> Tuple[Sequence[float], Sequence[float]]:
+        """return (timestamps, temperatures) of city in time order.
+
+        Only city, observed_at and temperature columns are read.
+        Result items are numpy arrays if numpy is installed, else
+        array.array('d'). Temperatures are in stored scale."""
+        with self._read_columns("city", "observed_at", "temperature") as cols:
+            rows = self._select(cols, city, start, end)
+            return (
+                self._take(cols["observed_at"], rows),
+                self._take(cols["temperature"], rows),
+            )
+
+    @staticmethod
+    def _take(column: memoryview, rows: Sequence[int]) -> Sequence[float]:
+        """copy selected rows out of mapped column."""
+        if np is not None:
+            return np.frombuffer(column, dtype=column.format)[rows]
+        return array(column.format, (column[row] for row in rows))
+
+    def _select(
+            self,
+            cols: Dict[str, memoryview],
+            city: Optional[str],
+            start: Optional[datetime],
+            end: Optional[datetime],
+            ) -> Sequence[int]:
+        """row numbers matching filters, sorted by observed_at."""
+        city_code = None
+        if city is not None:
+            city_code = self._dicts["city"].codes.get(city)
+            if city_code is None:
+                return []
+        start_ts = None if start is None else start.timestamp()
+        end_ts = None if end is None else end.timestamp()
+        if np is not None:
+            return self._select_numpy(cols, city_code, start_ts, end_ts)
+        observed_at = cols["observed_at"]
+        cities = cols["city"]
+        rows = [
+            row for row in range(self._rows)
+            if (city_code is None or cities[row] == city_code)
+            and (start_ts is None or observed_at[row] >= start_ts)
+            and (end_ts is None or observed_at[row] <= end_ts)
+        ]
+        rows.sort(key=observed_at.__getitem__)
+        return rows
+
+    def _select_numpy(
+            self,
+            cols: Dict[str, memoryview],
+            city_code: Optional[int],
+            start_ts: Optional[float],
+            end_ts: Optional[float],
+            ) -> Sequence[int]:
+        observed_at = np.frombuffer(cols["observed_at"], dtype="d")
+        mask = np.ones(self._rows, dtype=bool)
+        if city_code is not None:
+            mask &= np.frombuffer(cols["city"], dtype="H") == city_code
+        if start_ts is not None:
+            mask &= observed_at >= start_ts
+        if end_ts is not None:
+            mask &= observed_at <= end_ts
+        rows = np.flatnonzero(mask)
+        return rows[np.argsort(observed_at[rows], kind="stable")]
+
+    @contextmanager
+    def _read_columns(self, *names: str) -> Iterator[Dict[str, memoryview]]:
+        maps: List[mmap.mmap] = []
+        views: Dict[str, memoryview] = {}
+        try:
+            for name in names:
+                views[name] = self._map_column(name, maps)
+            yield views
+        except OSError as err:
+            raise StorageError(err) from err
+        finally:
+            for view in views.values():
+                view.release()
+            for mapped in maps:
+                mapped.close()
+
+    def _map_column(self, name: str, maps: List[mmap.mmap]) -> memoryview:
+        code = _COLUMNS[name]
+        if not self._rows:
+            return memoryview(array(code))
+        with open(self._column_path(name), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        maps.append(mapped)
+        size = self._rows * array(code).itemsize
+        return memoryview(mapped)[:size].cast(code)
+
+    def _encode_batch(
+            self,
+            weathers: Iterable[WeatherModel],
+            columns: Dict[str, array],
+            new_entries: List[str],
+            ) -> None:
+        for weather in weathers:
+            obs = make_observation(weather)
+            columns["observed_at"].append(obs.observed_at.timestamp())
+            columns["temperature"].append(obs.temperature)
+            columns["sunrise"].append(obs.sunrise.timestamp())
+            columns["sunset"].append(obs.sunset.timestamp())
+            columns["scale"].append(_SCALES.index(obs.scale))
+            columns["city"].append(
+                    self._encode("city", obs.city, new_entries),
+                    )
+            columns["condition"].append(
+                    self._encode(
+                        "condition",
+                        (obs.main, obs.description),
+                        new_entries,
+                        ),
+                    )
+
+    def _encode(self, column: str, value, new_entries: List[str]) -> int:
+        dictionary = self._dicts[column]
+        code = dictionary.codes.get(value)
+        if code is None:
+            code = dictionary.add(value)
+            entry = {"column": column, "value": value}
+            new_entries.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        return code
+
+    def _init_storage(self) -> None:
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            self._load_dictionary()
+            self._rows = self._repair_columns()
+        except (OSError, ValueError) as err:
+            raise StorageError(err) from err
+
+    def _load_dictionary(self) -> None:
+        path = self._path(_DICTIONARY_FILE)
+        if not path.exists():
+            return
+        with open(path, "r") as f:
+            for line in f:
+                entry = json.loads(line)
+                value = entry["value"]
+                if isinstance(value, list):
+                    value = tuple(value)
+                self._dicts[entry["column"]].add(value)
+
+    def _repair_columns(self) -> int:
+        """cut columns to common length after interrupted append."""
+        lengths = {}
+        for name, code in _COLUMNS.items():
+            path = self._column_path(name)
+            path.touch(exist_ok=True)
+            lengths[name] = path.stat().st_size // array(code).itemsize
+        rows = min(lengths.values())
+        for name, code in _COLUMNS.items():
+            if lengths[name] != rows:
+                os.truncate(
+                        self._column_path(name),
+                        rows * array(code).itemsize,
+                        )
+        return rows
+
+    def _column_path(self, name: str) -> Path:
+        return self._path(f"{name}.{_COLUMNS[name]}")
+
+    def _path(self, name: str) -> Path:
+        return self._directory / name
@@ -1,75 +1,419 @@
-from typing import Literal, Union, TypeAlias, cast
-from pathlib import Path
-
-from settings import load_config
-from weather_utils import (
-        subscribe_coloriser,
-)
-from colors import (
-        Unicode256WeatherPalette,
-        Unicode256WeatherIconPalette,
-        WeatherPainter,
-        WeatherIconPainter,
-        DrawMode,
-)
-from weather_models import (
-        CelsiusTemperature,
-        FarenheitTemperature,
-        WeatherIcon,
-)
-from weather_formatter import OpenweatherColorFormatter
-from weather_api_service import OPW_WeatherService
-from view import DisplaySettings, CurrentWeatherPrinter
-from base_types import ColorMapT
-from history import JSONFileWeatherStorage, save_weather
+"""Lazy composition root.
+
+Nothing is imported, read or built when module is imported: every
+item is created by Container on first access and cached. Module level
+names (config.formatter, config.UNITS, ...) are resolved through
+module __getattr__, so `from config import formatter` still works,
+but it builds formatter right there."""
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Literal, Optional, Union
+from typing import TypeAlias, cast
+
+if TYPE_CHECKING:
+    from collections import OrderedDict
+    from pathlib import Path
+    from coordinates import LocationProvider
+    from weather_formatter import OpenweatherColorFormatter
+    from weather_api_service import OPW_WeatherService
+    from forecast import OPW_ForecastService
+    from transport import HTTPConnectionPool
+    from resilience import Resilience
+    from rate_limit import RateLimiter
+    from persistent_cache import PersistentCachedWeatherService
+    from view import CurrentWeatherPrinter, DisplaySettings
+    from view import WatchWeatherPrinter
+    from base_types import ColorMapT
+    from colors import DrawMode, WeatherIconPainter, WeatherPainter
+    from colors import Unicode256WeatherIconPalette, Unicode256WeatherPalette
+    from history import JSONLinesWeatherStorage
 
 
 DimUnit: TypeAlias = Union[Literal["metric"], Literal["imperial"]]
 
 
-__all__ = [
+# public names without static definition, resolved by __getattr__
+_LAZY_EXPORTS = (
+        "location_provider",
         "formatter",
         "weather_service",
+        "network_weather_service",
+        "forecast_service",
         "weather_printer",
         "storage",
         "save_weather",
+        )
+
+__all__ = [
+        "Container",
+        "get_container",
+        *_LAZY_EXPORTS,
+        ]
+
+
+class Container:
+    """builds application items on demand."""
+
+    def __init__(
+            self,
+            app_config: Optional["OrderedDict[str, str]"] = None,
+            ) -> None:
+        if app_config is not None:
+            self.app_config = app_config
+
+    @cached_property
+    def app_config(self) -> "OrderedDict[str, str]":
+        from settings import load_config
+        return load_config()
+
+    # settings
+
+    @cached_property
+    def units(self) -> DimUnit:
+        return cast(DimUnit, self.app_config["OPW_DEF_UNITS"])
+
+    @cached_property
+    def lang(self) -> str:
+        return self.app_config["OPW_DEF_LANG"]
+
+    @cached_property
+    def api_key(self) -> str:
+        return self.app_config["OPW_APIKEY"]
+
+    @cached_property
+    def datetime_fmt(self) -> str:
+        return self.app_config["DATETIME_FMT"]
+
+    @cached_property
+    def http_pool_size(self) -> int:
+        return int(self._setting("HTTP_POOL_SIZE", "4"))
+
+    @cached_property
+    def http_connect_timeout(self) -> float:
+        return float(self._setting("HTTP_CONNECT_TIMEOUT", "3.0"))
+
+    @cached_property
+    def http_read_timeout(self) -> float:
+        return float(self._setting("HTTP_READ_TIMEOUT", "10.0"))
+
+    @cached_property
+    def cache_filename(self) -> str:
+        return self._setting("CACHE_FILENAME", ".weather_cache.sqlite3")
+
+    @cached_property
+    def cache_soft_ttl(self) -> float:
+        return float(self._setting("CACHE_SOFT_TTL", "600"))
+
+    @cached_property
+    def cache_hard_ttl(self) -> float:
+        return float(self._setting("CACHE_HARD_TTL", "3600"))
+
+    @cached_property
+    def location_file(self) -> Optional[str]:
+        return self.app_config.get("LOCATION_FILE")
+
+    @cached_property
+    def location_cache_filename(self) -> str:
+        return self._setting("LOCATION_CACHE_FILENAME", ".location_cache.json")
+
+    @cached_property
+    def location_cache_ttl(self) -> float:
+        return float(self._setting("LOCATION_CACHE_TTL", "900"))
+
+    @cached_property
+    def openweather_url(self) -> str:
+        """OPENWEATHER_URL setting replaces whole template, it must
+        keep {latitude} and {longitude}, e.g. for local stand-in."""
+        override = self.app_config.get("OPENWEATHER_URL")
+        if override:
+            return override
+        return (
+            "https://api.openweathermap.org/data/2.5/weather?"
+            "lat={latitude}&lon={longitude}&"
+            "appid="
+            f"{self.api_key}"
+            f"&lang={self.lang}&"
+            f"units={self.units}"
+        )
+
+    @cached_property
+    def group_url(self) -> str:
+        """bulk endpoint, {ids} is comma separated city ids;
+        OPENWEATHER_GROUP_URL setting replaces whole template."""
+        override = self.app_config.get("OPENWEATHER_GROUP_URL")
+        if override:
+            return override
+        return (
+            "https://api.openweathermap.org/data/2.5/group?"
+            "id={ids}&"
+            "appid="
+            f"{self.api_key}"
+            f"&lang={self.lang}&"
+            f"units={self.units}"
+        )
+
+    @cached_property
+    def forecast_url(self) -> str:
+        return (
+            "https://api.openweathermap.org/data/2.5/forecast?"
+            "lat={latitude}&lon={longitude}&"
+            "appid="
+            f"{self.api_key}"
+            f"&lang={self.lang}&"
+            f"units={self.units}"
+        )
+
+    def _setting(self, key: str, default: str) -> str:
+        return self.app_config.get(key, default)
+
+    def _path(self, filename: str) -> "Path":
+        from pathlib import Path
+        return Path.cwd() / filename
+
+    # items
+
+    @cached_property
+    def location_provider(self) -> "LocationProvider":
+        """env vars, then static file, then cached whereami fix."""
+        from collections import ChainMap
+        import os
+        from pathlib import Path
+        from coordinates import (
+                LocationProvider,
+                ChainLocationProvider,
+                EnvLocationProvider,
+                StaticFileLocationProvider,
+                CachedLocationProvider,
+                WhereamiLocationProvider,
+        )
+        providers: list[LocationProvider] = [
+                EnvLocationProvider(ChainMap(os.environ, self.app_config)),
         ]
+        if self.location_file:
+            providers.append(
+                    StaticFileLocationProvider(Path(self.location_file)),
+                    )
+        providers.append(
+                CachedLocationProvider(
+                    WhereamiLocationProvider(),
+                    self._path(self.location_cache_filename),
+                    self.location_cache_ttl,
+                    ),
+                )
+        return ChainLocationProvider(*providers)
+
+    @cached_property
+    def transport(self) -> "HTTPConnectionPool":
+        from transport import HTTPConnectionPool
+        return HTTPConnectionPool(
+                pool_size=self.http_pool_size,
+                connect_timeout=self.http_connect_timeout,
+                read_timeout=self.http_read_timeout,
+                )
+
+    @cached_property
+    def resilience(self) -> "Resilience":
+        from resilience import CircuitBreaker, Resilience, RetryPolicy
+        return Resilience(
+                RetryPolicy(
+                    attempts=int(self._setting("RETRY_ATTEMPTS", "3")),
+                    attempt_timeout=float(
+                        self._setting("RETRY_ATTEMPT_TIMEOUT", "5.0"),
+                        ),
+                    base_delay=float(self._setting("RETRY_BASE_DELAY", "0.2")),
+                    max_delay=float(self._setting("RETRY_MAX_DELAY", "5.0")),
+                    ),
+                CircuitBreaker(
+                    failure_threshold=int(
+                        self._setting("BREAKER_FAILURES", "5"),
+                        ),
+                    reset_timeout=float(
+                        self._setting("BREAKER_RESET_TIMEOUT", "30"),
+                        ),
+                    ),
+                )
+
+    @cached_property
+    def rate_limiter(self) -> Optional["RateLimiter"]:
+        """None if neither quota is set.
+
+        Bucket levels are kept in sqlite file (response cache file by
+        default), so quota is shared by CLI runs."""
+        from rate_limit import QuotaStore, RateLimiter
+        per_minute = self.app_config.get("OPW_CALLS_PER_MINUTE")
+        per_day = self.app_config.get("OPW_CALLS_PER_DAY")
+        if not per_minute and not per_day:
+            return None
+        quota_file = self._setting("RATE_LIMIT_FILENAME", self.cache_filename)
+        return RateLimiter(
+                per_minute=int(per_minute) if per_minute else None,
+                per_day=int(per_day) if per_day else None,
+                max_wait=float(self._setting("RATE_LIMIT_MAX_WAIT", "10")),
+                store=QuotaStore(self._path(quota_file)),
+                max_background_wait=float(
+                    self._setting("RATE_LIMIT_MAX_BACKGROUND_WAIT", "60"),
+                    ),
+                )
+
+    @cached_property
+    def network_weather_service(self) -> "OPW_WeatherService":
+        from weather_api_service import OPW_WeatherService
+        return OPW_WeatherService(
+                self.openweather_url,
+                self.units,
+                self.transport,
+                resilience=self.resilience,
+                rate_limiter=self.rate_limiter,
+                group_url=self.group_url,
+                )
+
+    @cached_property
+    def forecast_service(self) -> "OPW_ForecastService":
+        from forecast import OPW_ForecastService
+        return OPW_ForecastService(
+                self.forecast_url,
+                self.units,
+                self.transport,
+                )
+
+    @cached_property
+    def weather_service(self) -> "PersistentCachedWeatherService":
+        """stale entry is refreshed by detached process: CLI exits
+        right after printing."""
+        from persistent_cache import (
+                SQLiteResponseCache,
+                PersistentCachedWeatherService,
+                spawn_refresh_process,
+        )
+        return PersistentCachedWeatherService(
+                self.network_weather_service,
+                SQLiteResponseCache(self._path(self.cache_filename)),
+                self.lang,
+                soft_ttl=self.cache_soft_ttl,
+                hard_ttl=self.cache_hard_ttl,
+                background_refresh=spawn_refresh_process,
+                )
+
+    @cached_property
+    def weather_palette(self) -> "Unicode256WeatherPalette":
+        from colors import Unicode256WeatherPalette
+        return Unicode256WeatherPalette()
+
+    @cached_property
+    def icons_palette(self) -> "Unicode256WeatherIconPalette":
+        from colors import Unicode256WeatherIconPalette
+        return Unicode256WeatherIconPalette()
+
+    @cached_property
+    def weather_painter(self) -> "WeatherPainter":
+        from colors import WeatherPainter
+        return WeatherPainter(self.weather_palette)
+
+    @cached_property
+    def icon_painter(self) -> "WeatherIconPainter":
+        from colors import WeatherIconPainter
+        return WeatherIconPainter(self.icons_palette)
+
+    @cached_property
+    def colorisers(self) -> "ColorMapT":
+        """setup internal bus."""
+        from weather_utils import subscribe_coloriser
+        from weather_models import (
+                CelsiusTemperature,
+                FarenheitTemperature,
+                WeatherIcon,
+        )
+        colorisers: ColorMapT = {}
+        w_painter = self.weather_painter
+        subscribe_coloriser(CelsiusTemperature, w_painter, colorisers)
+        subscribe_coloriser(FarenheitTemperature, w_painter, colorisers)
+        subscribe_coloriser(WeatherIcon, self.icon_painter, colorisers)
+        return colorisers
+
+    @cached_property
+    def draw_mode(self) -> "DrawMode":
+        from colors import DrawMode
+        return DrawMode.FULLCOLOR
+
+    @cached_property
+    def formatter(self) -> "OpenweatherColorFormatter":
+        from weather_formatter import OpenweatherColorFormatter
+        return OpenweatherColorFormatter(self.colorisers, self.draw_mode)
+
+    @cached_property
+    def display_settings(self) -> "DisplaySettings":
+        from view import DisplaySettings
+        return DisplaySettings(self.datetime_fmt)
+
+    @cached_property
+    def weather_printer(self) -> "CurrentWeatherPrinter":
+        from view import CurrentWeatherPrinter
+        return CurrentWeatherPrinter(self.display_settings)
+
+    @cached_property
+    def watch_printer(self) -> "WatchWeatherPrinter":
+        from view import WatchWeatherPrinter
+        return WatchWeatherPrinter(self.display_settings)
+
+    @cached_property
+    def storage(self) -> "JSONLinesWeatherStorage":
+        from history import JSONLinesWeatherStorage
+        return JSONLinesWeatherStorage(
+                self._path(self.app_config["DB_FILENAME"]),
+                )
+
+
+_container: Optional[Container] = None
+
+# old module level names -> Container attributes
+_LAZY_NAMES = {
+    "app_config": "app_config",
+    "UNITS": "units",
+    "LANG": "lang",
+    "OPENWEATHER_API": "api_key",
+    "DEF_DATETIME_FMT": "datetime_fmt",
+    "HTTP_POOL_SIZE": "http_pool_size",
+    "HTTP_CONNECT_TIMEOUT": "http_connect_timeout",
+    "HTTP_READ_TIMEOUT": "http_read_timeout",
+    "CACHE_FILENAME": "cache_filename",
+    "CACHE_SOFT_TTL": "cache_soft_ttl",
+    "CACHE_HARD_TTL": "cache_hard_ttl",
+    "LOCATION_FILE": "location_file",
+    "LOCATION_CACHE_FILENAME": "location_cache_filename",
+    "LOCATION_CACHE_TTL": "location_cache_ttl",
+    "OPENWEATHER_URL": "openweather_url",
+    "FORECAST_URL": "forecast_url",
+    "COLORISERS": "colorisers",
+    "weather_palette": "weather_palette",
+    "icons_palette": "icons_palette",
+    "w_painter": "weather_painter",
+    "i_painter": "icon_painter",
+    "mode": "draw_mode",
+    "location_provider": "location_provider",
+    "transport": "transport",
+    "resilience": "resilience",
+    "rate_limiter": "rate_limiter",
+    "network_weather_service": "network_weather_service",
+    "forecast_service": "forecast_service",
+    "weather_service": "weather_service",
+    "formatter": "formatter",
+    "display_settings": "display_settings",
+    "weather_printer": "weather_printer",
+    "watch_printer": "watch_printer",
+    "storage": "storage",
+}
+
+
+def get_container() -> Container:
+    global _container
+    if _container is None:
+        _container = Container()
+    return _container
 
 
-app_config = load_config()
-
-COLORISERS: ColorMapT = {}
-USE_ROUNDED_COORDS = False
-UNITS: DimUnit = cast(DimUnit, app_config["OPW_DEF_UNITS"])
-OPENWEATHER_API = app_config["OPW_APIKEY"]
-DEF_DATETIME_FMT = app_config["DATETIME_FMT"]
-LANG = app_config["OPW_DEF_LANG"]
-OPENWEATHER_URL = (
-    "https://api.openweathermap.org/data/2.5/weather?"
-    "lat={latitude}&lon={longitude}&"
-    "appid="
-    f"{OPENWEATHER_API}"
-    f"&lang={LANG}&"
-    f"units={UNITS}"
-)
-
-
-# service items setup
-display_settings = DisplaySettings(DEF_DATETIME_FMT)
-weather_palette = Unicode256WeatherPalette()
-icons_palette = Unicode256WeatherIconPalette()
-w_painter = WeatherPainter(weather_palette)
-i_painter = WeatherIconPainter(icons_palette)
-
-# setup internal bus
-subscribe_coloriser(CelsiusTemperature, w_painter, COLORISERS)
-subscribe_coloriser(FarenheitTemperature, w_painter, COLORISERS)
-subscribe_coloriser(WeatherIcon, i_painter, COLORISERS)
-
-# setup storage
-storage = JSONFileWeatherStorage(Path.cwd() / app_config["DB_FILENAME"])
-
-mode = DrawMode.FULLCOLOR
-formatter = OpenweatherColorFormatter(COLORISERS, mode)
-weather_service = OPW_WeatherService(OPENWEATHER_URL, UNITS)
-weather_printer = CurrentWeatherPrinter(display_settings)
+def __getattr__(name: str) -> Any:
+    if name == "save_weather":
+        from history import save_weather
+        return save_weather
+    if name in _LAZY_NAMES:
+        return getattr(get_container(), _LAZY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
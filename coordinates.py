@@ -1,14 +1,27 @@
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
+import json
+import math
+import os
+from pathlib import Path
 from subprocess import Popen, PIPE
-from typing import Literal, Sequence, TypeAlias
+import time
+from typing import Callable, Dict, Mapping, Sequence, TypeAlias
 import re
 
 from exceptions import CantGetCoordinates
+from timing import span
 
 
-USE_ROUNDED_COORDS = False
 Coordinate: TypeAlias = float
 
+EARTH_RADIUS_M = 6_371_000.0
+
+# single pattern for both coordinates, compiled once at import
+_COORD_PATTERN = re.compile(
+        r"(?P<kind>latitude|longitude)\D*?(?P<value>-?[0-9]{1,3}\.[0-9]+)",
+        )
+
 
 @dataclass(slots=True, frozen=True)
 class Coordinates:
@@ -16,10 +29,120 @@ class Coordinates:
     longitude: Coordinate
 
 
+class LocationProvider(ABC):
+    """source of current coordinates."""
+
+    @abstractmethod
+    def get_coordinates(self) -> Coordinates:
+        """raise CantGetCoordinates if location is unknown."""
+        pass
+
+
+class WhereamiLocationProvider(LocationProvider):
+    """ask whereami utility, it forks process on every call."""
+
+    def get_coordinates(self) -> Coordinates:
+        return _get_whereami_coordinates()
+
+
+class EnvLocationProvider(LocationProvider):
+    """read coordinates from environment variables."""
+
+    def __init__(
+            self,
+            environ: Mapping[str, str] = os.environ,
+            latitude_var: str = "WEATHER_LATITUDE",
+            longitude_var: str = "WEATHER_LONGITUDE",
+            ) -> None:
+        self._environ = environ
+        self._latitude_var = latitude_var
+        self._longitude_var = longitude_var
+
+    def get_coordinates(self) -> Coordinates:
+        latitude = self._environ.get(self._latitude_var)
+        longitude = self._environ.get(self._longitude_var)
+        if latitude is None or longitude is None:
+            raise CantGetCoordinates
+        return Coordinates(
+                latitude=_parse_float_coordinate(latitude),
+                longitude=_parse_float_coordinate(longitude),
+                )
+
+
+class StaticFileLocationProvider(LocationProvider):
+    """read coordinates from JSON file {"latitude": .., "longitude": ..}."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    def get_coordinates(self) -> Coordinates:
+        return _read_coordinates_file(self._path)
+
+
+class CachedLocationProvider(LocationProvider):
+    """keep last fix of wrapped provider in file for ttl seconds.
+
+    Location barely changes between runs, so slow provider is asked
+    only when cached fix is too old."""
+
+    def __init__(
+            self,
+            provider: LocationProvider,
+            cache_file: Path,
+            ttl: float = 900.0,
+            clock: Callable[[], float] = time.time,
+            ) -> None:
+        self._provider = provider
+        self._cache_file = cache_file
+        self._ttl = ttl
+        self._clock = clock
+
+    def get_coordinates(self) -> Coordinates:
+        try:
+            age = self._clock() - self._cache_file.stat().st_mtime
+            if 0 <= age < self._ttl:
+                return _read_coordinates_file(self._cache_file)
+        except (OSError, CantGetCoordinates):
+            pass
+        coordinates = self._provider.get_coordinates()
+        self._store(coordinates)
+        return coordinates
+
+    def _store(self, coordinates: Coordinates) -> None:
+        data: Dict[str, Coordinate] = {
+            "latitude": coordinates.latitude,
+            "longitude": coordinates.longitude,
+        }
+        tmp_file = self._cache_file.with_name(f"{self._cache_file.name}.tmp")
+        try:
+            tmp_file.write_text(json.dumps(data))
+            os.replace(tmp_file, self._cache_file)
+            # mtime is fix time, clock may be mocked or shifted
+            now = self._clock()
+            os.utime(self._cache_file, (now, now))
+        except OSError:
+            # cache is optimisation only
+            pass
+
+
+class ChainLocationProvider(LocationProvider):
+    """return coordinates of first provider that knows them."""
+
+    def __init__(self, *providers: LocationProvider) -> None:
+        self._providers = providers
+
+    def get_coordinates(self) -> Coordinates:
+        for provider in self._providers:
+            try:
+                return provider.get_coordinates()
+            except CantGetCoordinates:
+                continue
+        raise CantGetCoordinates
+
+
 def get_gps_coordinates() -> Coordinates:
     """Returns current coordinates using MacBook GPS"""
-    coordinates = _get_whereami_coordinates()
-    return _round_coordinates(coordinates)
+    return _get_whereami_coordinates()
 
 
 def _get_whereami_coordinates() -> Coordinates:
@@ -29,9 +152,13 @@ def _get_whereami_coordinates() -> Coordinates:
 
 
 def _get_whereami_output() -> bytes:
-    process = Popen(["whereami", "-r"], stdout=PIPE)
-    output, err = process.communicate()
-    exit_code = process.wait()
+    with span("location.whereami"):
+        try:
+            process = Popen(["whereami", "-r"], stdout=PIPE)
+        except OSError as err:
+            raise CantGetCoordinates(err)
+        output, err = process.communicate()
+        exit_code = process.wait()
     if err is not None or exit_code != 0:
         raise CantGetCoordinates
     return output
@@ -42,31 +169,25 @@ def _parse_coordinates(whereami_output: bytes) -> Coordinates:
         output = whereami_output.decode().strip().lower().split("\n")
     except UnicodeDecodeError as err:
         raise CantGetCoordinates(err)
+    coords = _parse_coords(output)
     return Coordinates(
-        latitude=_parse_coord(output, "latitude"),
-        longitude=_parse_coord(output, "longitude")
+        latitude=coords["latitude"],
+        longitude=coords["longitude"]
     )
 
 
-def _parse_coord(
-        output: Sequence[str],
-        coord_type: Literal["latitude"] | Literal["longitude"]) -> Coordinate:
-    """fetch coord from GPS service responce using re"""
-    pattern = _create_coord_str_pattern(coord_type)
-    match_, matched_grp = None, None
+def _parse_coords(output: Sequence[str]) -> Dict[str, Coordinate]:
+    """fetch both coords from GPS service responce in one pass"""
+    coords: Dict[str, Coordinate] = {}
     for line in output:
-        match_ = pattern.match(line)
-        if match_:
-            matched_grp = match_.groupdict()
-            return _parse_float_coordinate(matched_grp[coord_type])
-    else:
-        raise CantGetCoordinates
-
-
-def _create_coord_str_pattern(coord_type: str) -> re.Pattern:
-    head = f"^(.*)?(?:(?:{coord_type}))"
-    tail = f"(.*)?(?P<{coord_type}>" + "(?:[0-9]{2}\.[0-9]{2,})).*$"  # noqa
-    return re.compile(f"{head}{tail}")
+        for match_ in _COORD_PATTERN.finditer(line):
+            coords.setdefault(
+                    match_["kind"],
+                    _parse_float_coordinate(match_["value"]),
+                    )
+        if len(coords) == 2:
+            return coords
+    raise CantGetCoordinates
 
 
 def _parse_float_coordinate(value: str) -> Coordinate:
@@ -76,11 +197,34 @@ def _parse_float_coordinate(value: str) -> Coordinate:
         raise CantGetCoordinates
 
 
-def _round_coordinates(coordinates: Coordinates) -> Coordinates:
-    if not USE_ROUNDED_COORDS:
-        return coordinates
+def _read_coordinates_file(path: Path) -> Coordinates:
+    try:
+        data = json.loads(path.read_text())
+        return Coordinates(
+                latitude=float(data["latitude"]),
+                longitude=float(data["longitude"]),
+                )
+    except (OSError, ValueError, KeyError, TypeError) as err:
+        raise CantGetCoordinates(err)
+
+
+def distance_m(first: Coordinates, second: Coordinates) -> float:
+    """great-circle distance in meters (haversine)."""
+    lat1 = math.radians(first.latitude)
+    lat2 = math.radians(second.latitude)
+    d_lat = lat2 - lat1
+    d_lon = math.radians(second.longitude - first.longitude)
+    h = (
+        math.sin(d_lat / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin(d_lon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+def round_coordinates(coordinates: Coordinates, precision: int) -> Coordinates:
+    """quantize coordinates to precision digits after point."""
     return Coordinates(*map(
-        lambda c: round(c, 3),
+        lambda c: round(c, precision),
         [coordinates.latitude, coordinates.longitude]
     ))
 
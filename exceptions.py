@@ -1,3 +1,6 @@
+from typing import Any, Dict, Optional, Sequence
+
+
 class CantGetCoordinates(Exception):
     """Program can't get current GPS coordinates"""
 
@@ -6,5 +9,47 @@ class ApiServiceError(Exception):
     """Program can't get current weather"""
 
 
+class TransportError(ApiServiceError):
+    """HTTP transport failed: connection, timeout or bad status.
+
+    transient is False for errors repeating the request won't fix,
+    such as unsupported url."""
+
+    def __init__(
+            self,
+            *args: object,
+            status: Optional[int] = None,
+            transient: bool = True,
+            ) -> None:
+        super().__init__(*args)
+        self.status = status
+        self.transient = transient
+
+
+class CircuitOpenError(ApiServiceError):
+    """Weather service is not asked: too many recent failures."""
+
+
+class QuotaExceededError(ApiServiceError):
+    """Client side API call quota does not allow call now."""
+
+
+class GroupFetchError(ApiServiceError):
+    """Some batches of bulk lookup failed.
+
+    weathers keeps models of batches that succeeded, failed_ids are
+    city ids that got no answer."""
+
+    def __init__(
+            self,
+            *args: object,
+            weathers: Optional[Dict[int, Any]] = None,
+            failed_ids: Sequence[int] = (),
+            ) -> None:
+        super().__init__(*args)
+        self.weathers = {} if weathers is None else weathers
+        self.failed_ids = list(failed_ids)
+
+
 class StorageError(Exception):
     """Program can`t fetch or store data"""
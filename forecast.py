@@ -0,0 +1,295 @@
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+import json
+from pathlib import Path
+import re
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+from typing import Tuple, Type
+
+from base_types import LiteralT
+from coordinates import Coordinates
+from exceptions import ApiServiceError
+from transport import HTTPConnectionPool
+from weather_api_service import DimSystemT
+from weather_formatter import OpenweatherColorFormatter
+from weather_models import (
+        BaseWeatherTemperature,
+        CelsiusTemperature,
+        FarenheitTemperature,
+        WeatherDescription,
+)
+from weather_utils import TemperatureScaleKind
+
+try:
+    import numpy as np  # type: ignore[import]
+except ImportError:
+    np = None
+
+
+__all__ = [
+        "DailySummary",
+        "ForecastSeries",
+        "OPW_ForecastService",
+        "format_forecast_row",
+        "format_daily_rows",
+        ]
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+@dataclass(slots=True, frozen=True)
+class DailySummary:
+    day: date
+    min: float
+    max: float
+    mean: float
+    condition: WeatherDescription
+
+
+@dataclass(slots=True)
+class ForecastSeries:
+    """forecast as parallel arrays, not as list of models.
+
+    conditions keeps codes of condition_table items, utc_offset is
+    shift of city local time from UTC in seconds."""
+    city: str
+    scale: TemperatureScaleKind
+    utc_offset: int = 0
+    timestamps: array = field(default_factory=lambda: array("d"))
+    temperatures: array = field(default_factory=lambda: array("d"))
+    conditions: array = field(default_factory=lambda: array("H"))
+    condition_table: List[WeatherDescription] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def description_at(self, pos: int) -> WeatherDescription:
+        return self.condition_table[self.conditions[pos]]
+
+    def daily_summary(self) -> List[DailySummary]:
+        """min / max / mean temperature and main condition per day
+        of the city, whatever timezone host is in."""
+        if not len(self):
+            return []
+        days = [
+            datetime.fromtimestamp(ts + self.utc_offset, timezone.utc).date()
+            for ts in self.timestamps
+        ]
+        day_ids: Dict[date, int] = {}
+        ids = [day_ids.setdefault(day, len(day_ids)) for day in days]
+        if np is not None:
+            mins, maxs, means = self._rollup_numpy(ids, len(day_ids))
+        else:
+            mins, maxs, means = self._rollup(ids, len(day_ids))
+        counters = [Counter() for _ in day_ids]
+        for day_id, code in zip(ids, self.conditions):
+            counters[day_id][code] += 1
+        return [
+            DailySummary(
+                day=day,
+                min=mins[day_id],
+                max=maxs[day_id],
+                mean=means[day_id],
+                condition=self.condition_table[
+                    counters[day_id].most_common(1)[0][0]
+                    ],
+                )
+            for day, day_id in day_ids.items()
+        ]
+
+    def _rollup_numpy(
+            self,
+            ids: List[int],
+            size: int,
+            ) -> Tuple[List[float], List[float], List[float]]:
+        group_ids = np.asarray(ids, dtype=np.intp)
+        values = np.frombuffer(self.temperatures, dtype=np.float64)
+        counts = np.bincount(group_ids, minlength=size)
+        means = np.bincount(group_ids, weights=values, minlength=size) / counts
+        mins = np.full(size, np.inf)
+        maxs = np.full(size, -np.inf)
+        np.minimum.at(mins, group_ids, values)
+        np.maximum.at(maxs, group_ids, values)
+        return mins.tolist(), maxs.tolist(), means.tolist()
+
+    def _rollup(
+            self,
+            ids: List[int],
+            size: int,
+            ) -> Tuple[List[float], List[float], List[float]]:
+        mins = [float("inf")] * size
+        maxs = [float("-inf")] * size
+        totals = [0.0] * size
+        counts = [0] * size
+        for day_id, value in zip(ids, self.temperatures):
+            mins[day_id] = min(mins[day_id], value)
+            maxs[day_id] = max(maxs[day_id], value)
+            totals[day_id] += value
+            counts[day_id] += 1
+        means = [total / count for total, count in zip(totals, counts)]
+        return mins, maxs, means
+
+
+class OPW_ForecastService:
+    """OpenWeather 5 day / 3 hour forecast."""
+
+    def __init__(
+            self,
+            url: str,
+            units: DimSystemT,
+            transport: Optional[HTTPConnectionPool] = None,
+            ) -> None:
+        self._url = url
+        if units == "metric":
+            self._tmpr_scale = TemperatureScaleKind.CELSIUS
+        else:
+            self._tmpr_scale = TemperatureScaleKind.FARENHEIT
+        if transport is None:
+            transport = HTTPConnectionPool()
+        self._transport = transport
+
+    def get_forecast(self, coordinates: Coordinates) -> ForecastSeries:
+        url = self._url.format(
+                latitude=coordinates.latitude,
+                longitude=coordinates.longitude,
+                )
+        return self.parse_forecast(self._transport.get(url))
+
+    def parse_forecast(self, resp: LiteralT) -> ForecastSeries:
+        """fill arrays item by item, whole document is never built."""
+        if isinstance(resp, bytes):
+            try:
+                resp = resp.decode()
+            except UnicodeDecodeError as err:
+                raise ApiServiceError(err)
+        series = ForecastSeries(city="", scale=self._tmpr_scale)
+        codes: Dict[Tuple[str, str], int] = {}
+        try:
+            rest = _scan_document(
+                    resp,
+                    "list",
+                    lambda item: self._add_item(series, codes, item),
+                    )
+            series.city = sys.intern(rest["city"]["name"])
+            series.utc_offset = int(rest["city"].get("timezone", 0))
+        except (ValueError, KeyError, IndexError, TypeError) as err:
+            raise ApiServiceError(err)
+        return series
+
+    def _add_item(
+            self,
+            series: ForecastSeries,
+            codes: Dict[Tuple[str, str], int],
+            item: Mapping[str, Any],
+            ) -> None:
+        weather = item["weather"][0]
+        key = (weather["main"], weather["description"])
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(series.condition_table)
+            series.condition_table.append(WeatherDescription(*key))
+        series.timestamps.append(item["dt"])
+        series.temperatures.append(item["main"]["temp"])
+        series.conditions.append(code)
+
+
+def _skip_ws(doc: str, pos: int) -> int:
+    match_ = _WHITESPACE.match(doc, pos)
+    return match_.end() if match_ else pos
+
+
+def _expect(doc: str, pos: int, char: str) -> int:
+    if doc[pos] != char:
+        raise ValueError(f"expected {char!r} at {pos}")
+    return _skip_ws(doc, pos + 1)
+
+
+def _scan_document(
+        doc: str,
+        stream_key: str,
+        on_item: Callable[[Any], None],
+        ) -> Dict[str, Any]:
+    """decode top level object, items of stream_key array are passed
+    to on_item one by one instead of being collected."""
+    rest: Dict[str, Any] = {}
+    pos = _expect(doc, _skip_ws(doc, 0), "{")
+    if doc[pos] == "}":
+        return rest
+    while True:
+        key, pos = _DECODER.raw_decode(doc, pos)
+        pos = _expect(doc, _skip_ws(doc, pos), ":")
+        if key == stream_key:
+            pos = _scan_array(doc, pos, on_item)
+        else:
+            rest[key], pos = _DECODER.raw_decode(doc, pos)
+        pos = _skip_ws(doc, pos)
+        if doc[pos] == "}":
+            return rest
+        pos = _expect(doc, pos, ",")
+
+
+def _scan_array(doc: str, pos: int, on_item: Callable[[Any], None]) -> int:
+    pos = _expect(doc, pos, "[")
+    if doc[pos] == "]":
+        return pos + 1
+    while True:
+        item, pos = _DECODER.raw_decode(doc, pos)
+        on_item(item)
+        pos = _skip_ws(doc, pos)
+        if doc[pos] == "]":
+            return pos + 1
+        pos = _expect(doc, pos, ",")
+
+
+def _temperature_cls(
+        scale: TemperatureScaleKind,
+        ) -> Type[BaseWeatherTemperature]:
+    if scale is TemperatureScaleKind.CELSIUS:
+        return CelsiusTemperature
+    return FarenheitTemperature
+
+
+def format_forecast_row(
+        series: ForecastSeries,
+        formatter: OpenweatherColorFormatter,
+        step: int = 1,
+        ) -> str:
+    """colorised temperatures of series in one line."""
+    temperature = _temperature_cls(series.scale)
+    return formatter.format_row(
+            temperature.of(round(value))
+            for value in series.temperatures[::step]
+            )
+
+
+def format_daily_rows(
+        series: ForecastSeries,
+        formatter: OpenweatherColorFormatter,
+        datetime_fmt: str = "%a %d.%m",
+        ) -> Iterator[str]:
+    """one colorised line per day: min, max and condition icon."""
+    temperature = _temperature_cls(series.scale)
+    for summary in series.daily_summary():
+        row = formatter.format_row((
+            temperature.of(round(summary.min)),
+            temperature.of(round(summary.max)),
+            formatter.icon_for(summary.condition),
+            ))
+        yield f"{summary.day.strftime(datetime_fmt)}  {row}"
+
+
+if __name__ == "__main__":
+    from config import get_container
+    fixture = Path(__file__).parent / "fixtures" / "forecast_5d3h.json"
+    app = get_container()
+    forecast = OPW_ForecastService("", app.units).parse_forecast(
+            fixture.read_bytes(),
+            )
+    print(forecast.city, format_forecast_row(forecast, app.formatter, step=2))
+    for line in format_daily_rows(forecast, app.formatter):
+        print(line)
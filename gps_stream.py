@@ -0,0 +1,181 @@
+from functools import reduce
+from operator import xor
+import os
+from pathlib import Path
+import stat
+import time
+from typing import Callable, Iterable, Iterator, Optional, Protocol, Tuple
+
+from coordinates import Coordinates, LocationProvider, distance_m
+from exceptions import CantGetCoordinates
+from weather_models import WeatherModel
+
+
+__all__ = [
+        "NmeaLocationProvider",
+        "parse_nmea_sentence",
+        "tail_lines",
+        "stream_coordinates",
+        "debounce_coordinates",
+        "follow_weather",
+        ]
+
+
+class _WeatherService(Protocol):
+    def get_weather(self, coordinates: Coordinates) -> WeatherModel: ...
+
+
+def parse_nmea_sentence(sentence: str) -> Optional[Coordinates]:
+    """return fix from GGA or RMC sentence, None for anything else.
+
+    Sentences with bad checksum or without valid fix are skipped."""
+    sentence = sentence.strip()
+    if not sentence.startswith("$"):
+        return None
+    body, _, checksum = sentence[1:].partition("*")
+    if checksum and not _checksum_ok(body, checksum):
+        return None
+    fields = body.split(",")
+    kind = fields[0][2:]
+    try:
+        if kind == "GGA" and fields[6] not in ("", "0"):
+            lat, lat_hemi, lon, lon_hemi = fields[2:6]
+        elif kind == "RMC" and fields[2] == "A":
+            lat, lat_hemi, lon, lon_hemi = fields[3:7]
+        else:
+            return None
+        return Coordinates(
+                latitude=_parse_nmea_coordinate(lat, lat_hemi, 2),
+                longitude=_parse_nmea_coordinate(lon, lon_hemi, 3),
+                )
+    except (IndexError, ValueError):
+        return None
+
+
+def _checksum_ok(body: str, checksum: str) -> bool:
+    try:
+        expected = int(checksum[:2], 16)
+    except ValueError:
+        return False
+    return reduce(xor, body.encode("ascii", "replace"), 0) == expected
+
+
+def _parse_nmea_coordinate(value: str, hemisphere: str, deg_len: int) -> float:
+    """convert (d)ddmm.mmmm to signed decimal degrees."""
+    degrees = int(value[:deg_len]) + float(value[deg_len:]) / 60
+    return -degrees if hemisphere in ("S", "W") else degrees
+
+
+def tail_lines(
+        path: Path,
+        follow: bool = True,
+        poll_interval: float = 0.5,
+        sleep: Callable[[float], None] = time.sleep,
+        ) -> Iterator[str]:
+    """yield complete lines of file, like tail -F.
+
+    Followed regular file is read from its end, so recorded history
+    is not replayed; it is read again from start when it is truncated
+    or replaced (rotated). FIFO is reopened when writer goes away;
+    partial line is kept until its end arrives."""
+    is_fifo = stat.S_ISFIFO(os.stat(path).st_mode)
+    skip_history = follow and not is_fifo
+    pending = b""
+    while True:
+        with open(path, "rb") as f:
+            if skip_history:
+                f.seek(0, os.SEEK_END)
+                skip_history = False
+            while True:
+                chunk = f.readline()
+                if chunk:
+                    pending += chunk
+                    if pending.endswith(b"\n"):
+                        yield _decode_line(pending)
+                        pending = b""
+                    continue
+                if not follow:
+                    if pending:
+                        yield _decode_line(pending)
+                    return
+                if is_fifo:
+                    break
+                if _is_replaced(path, f.fileno()):
+                    pending = b""
+                    break
+                if os.fstat(f.fileno()).st_size < f.tell():
+                    # truncated in place
+                    f.seek(0)
+                    pending = b""
+                    continue
+                sleep(poll_interval)
+
+
+def _decode_line(raw: bytes) -> str:
+    line = raw.decode(errors="replace")
+    if line.endswith("\r\n"):
+        line = line[:-2] + "\n"
+    return line
+
+
+def _is_replaced(path: Path, fd: int) -> bool:
+    """other file is at path now; missing path means rotation is not
+    finished yet, so current file is still read."""
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev)
+
+
+def stream_coordinates(
+        path: Path,
+        follow: bool = True,
+        poll_interval: float = 0.5,
+        ) -> Iterator[Coordinates]:
+    """fixes from NMEA log file or GPS device FIFO."""
+    for line in tail_lines(path, follow, poll_interval):
+        coordinates = parse_nmea_sentence(line)
+        if coordinates is not None:
+            yield coordinates
+
+
+def debounce_coordinates(
+        coordinates: Iterable[Coordinates],
+        min_distance: float = 500.0,
+        ) -> Iterator[Coordinates]:
+    """pass fix only if it moved min_distance meters from last passed."""
+    last: Optional[Coordinates] = None
+    for current in coordinates:
+        if last is None or distance_m(last, current) >= min_distance:
+            last = current
+            yield current
+
+
+def follow_weather(
+        service: _WeatherService,
+        coordinates: Iterable[Coordinates],
+        min_distance: float = 500.0,
+        ) -> Iterator[Tuple[Coordinates, WeatherModel]]:
+    """ask weather only for fixes that moved far enough."""
+    for current in debounce_coordinates(coordinates, min_distance):
+        yield current, service.get_weather(current)
+
+
+class NmeaLocationProvider(LocationProvider):
+    """last valid fix found in NMEA log file."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    def get_coordinates(self) -> Coordinates:
+        last: Optional[Coordinates] = None
+        try:
+            for last in stream_coordinates(self._path, follow=False):
+                pass
+        except OSError as err:
+            raise CantGetCoordinates(err)
+        if last is None:
+            raise CantGetCoordinates
+        return last
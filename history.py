@@ -1,12 +1,27 @@
 from datetime import datetime
 import json
 from pathlib import Path
+import sqlite3
+import struct
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
 from typing import TypedDict, Protocol
 
 from weather_models import WeatherModel
 from weather_formatter import format_weather
 from exceptions import StorageError
 
+try:
+    import fcntl
+except ImportError:
+    # not POSIX, appends of concurrent processes are not serialized
+    fcntl = None  # type: ignore[assignment]
+
+
+def _lock_file(f: BinaryIO) -> None:
+    """exclusive lock of whole file, released when file is closed."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
 
 class WeatherStorage(Protocol):
     """Interface for any storage saving weather"""
@@ -34,37 +49,318 @@ class HistoryRecord(TypedDict):
     weather: str
 
 
-class JSONFileWeatherStorage:
-    """Store weather in JSON file"""
+class JSONLinesWeatherStorage:
+    """Store weather in JSON Lines file, one record per line.
+
+    Sidecar index keeps (timestamp, byte offset) pairs of fixed width,
+    so range queries seek straight to first matching record. Writers
+    hold lock of data file while they append record and its index
+    entry, so processes sharing history never mix up offsets."""
+
+    _index_entry = struct.Struct("<dQ")
+
     def __init__(self, jsonfile: Path) -> None:
         self._jsonfile = jsonfile
+        self._indexfile = jsonfile.with_name(f"{jsonfile.name}.idx")
+        self._last_ts = 0.0
         self._init_storage()
 
     def save(self, weather: WeatherModel) -> None:
+        now = datetime.now()
         history: HistoryRecord = {
-            "date": str(datetime.now()),
+            "date": str(now),
             "weather": format_weather(weather)
         }
-        self._write(history)
+        self._write(history, now.timestamp())
+
+    def read_range(
+            self,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            ) -> Iterator[HistoryRecord]:
+        """yield records saved in [start, end] interval."""
+        try:
+            with open(self._indexfile, "rb") as idx:
+                index = idx.read()
+            count = len(index) // self._index_entry.size
+            low = 0 if start is None else self._bisect(index, count, start)
+            if low >= count:
+                return
+            end_ts = None if end is None else end.timestamp()
+            with open(self._jsonfile, "rb") as f:
+                for pos in range(low, count):
+                    ts, offset = self._index_entry.unpack_from(
+                            index,
+                            pos * self._index_entry.size,
+                            )
+                    if end_ts is not None and ts > end_ts:
+                        return
+                    # unindexed lines (torn writes) may lie between records
+                    if f.tell() != offset:
+                        f.seek(offset)
+                    yield json.loads(f.readline())
+        except (OSError, ValueError) as err:
+            raise StorageError(err) from err
 
     def _init_storage(self) -> None:
-        if not self._jsonfile.exists():
-            self._jsonfile.write_text("[Metadata section...]")
+        try:
+            with open(self._jsonfile, "ab+") as f:
+                _lock_file(f)
+                self._end_line(f)
+                f.flush()
+                self._sync_index()
+        except OSError as err:
+            raise StorageError(err) from err
+
+    def _end_line(self, f: BinaryIO) -> int:
+        """never glue record to torn or foreign content, return size."""
+        size = f.seek(0, 2)
+        if size:
+            f.seek(-1, 2)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+                size += 1
+        return size
+
+    def _sync_index(self) -> None:
+        """index records written after last indexed one.
+
+        Needed after crash between data and index writes or for file
+        written without index at all."""
+        with open(self._indexfile, "ab+") as idx:
+            last = self._read_tail(idx)
+            with open(self._jsonfile, "rb") as f:
+                if last is not None:
+                    f.seek(last)
+                    f.readline()
+                self._index_lines(f, idx)
+
+    def _read_tail(self, idx: BinaryIO) -> Optional[int]:
+        """drop torn index entry, take last timestamp written by any
+        process, return offset of last indexed record."""
+        size = idx.seek(0, 2)
+        valid_size = size - size % self._index_entry.size
+        if valid_size != size:
+            idx.truncate(valid_size)
+        if not valid_size:
+            return None
+        idx.seek(valid_size - self._index_entry.size)
+        ts, offset = self._index_entry.unpack(
+                idx.read(self._index_entry.size),
+                )
+        self._last_ts = max(ts, self._last_ts)
+        return offset
+
+    def _index_lines(self, data: BinaryIO, idx: BinaryIO) -> None:
+        while True:
+            offset = data.tell()
+            line = data.readline()
+            if not line:
+                return
+            try:
+                record = json.loads(line)
+                ts = datetime.fromisoformat(record["date"]).timestamp()
+            except (ValueError, KeyError, TypeError):
+                # not a record, e.g. legacy JSON file content
+                continue
+            idx.write(self._pack(ts, offset))
+
+    def _pack(self, ts: float, offset: int) -> bytes:
+        """keep index sorted even if clock goes back."""
+        self._last_ts = max(ts, self._last_ts)
+        return self._index_entry.pack(self._last_ts, offset)
+
+    def _bisect(self, index: bytes, count: int, start: datetime) -> int:
+        start_ts = start.timestamp()
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            ts, _ = self._index_entry.unpack_from(
+                    index,
+                    middle * self._index_entry.size,
+                    )
+            if ts < start_ts:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _write(self, history: HistoryRecord, ts: float) -> None:
+        line = json.dumps(history, ensure_ascii=False) + "\n"
+        try:
+            with open(self._jsonfile, "ab+") as f:
+                # offset is taken and index appended under one lock
+                _lock_file(f)
+                offset = self._end_line(f)
+                f.write(line.encode())
+                f.flush()
+                with open(self._indexfile, "ab+") as idx:
+                    self._read_tail(idx)
+                    idx.write(self._pack(ts, offset))
+        except OSError as err:
+            raise StorageError from err
 
-    def _read_history(self) -> list[HistoryRecord]:
+
+class Observation(NamedTuple):
+    """structured weather record, as stored by typed storages."""
+    city: str
+    temperature: float
+    scale: str
+    main: str
+    description: str
+    sunrise: datetime
+    sunset: datetime
+    observed_at: datetime
+
+
+def make_observation(weather: WeatherModel) -> Observation:
+    city = weather.city
+    if isinstance(city, bytes):
+        city = city.decode()
+    observed_at = weather.observed_at
+    if observed_at is None:
+        observed_at = datetime.now()
+    return Observation(
+            city=city,
+            temperature=weather.temperature.degrees,
+            scale=weather.temperature.scale_kind.value,
+            main=weather.weather_type.main,
+            description=weather.weather_type.description,
+            sunrise=weather.sunrise,
+            sunset=weather.sunset,
+            observed_at=observed_at,
+            )
+
+
+class ObservationSource(Protocol):
+    """Interface for storage able to read structured history.
+
+    Records must be yielded in observed_at order."""
+    def iter_observations(
+            self,
+            city: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            ) -> Iterator[Observation]:
+        raise NotImplementedError
+
+
+class SQLiteWeatherStorage:
+    """Store structured weather in sqlite database.
+
+    Times are kept as unix timestamps in REAL columns."""
+
+    _schema = (
+        """
+        CREATE TABLE IF NOT EXISTS observations (
+            id INTEGER PRIMARY KEY,
+            city TEXT NOT NULL,
+            temperature REAL NOT NULL,
+            scale TEXT NOT NULL,
+            main TEXT NOT NULL,
+            description TEXT NOT NULL,
+            sunrise REAL NOT NULL,
+            sunset REAL NOT NULL,
+            observed_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS observations_city_observed_at
+        ON observations (city, observed_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS observations_observed_at
+        ON observations (observed_at)
+        """,
+    )
+    _insert = (
+        "INSERT INTO observations (city, temperature, scale, main, "
+        "description, sunrise, sunset, observed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+
+    def __init__(self, dbfile: Path) -> None:
+        self._dbfile = dbfile
+        self._conn = self._connect()
+
+    def save(self, weather: WeatherModel) -> None:
+        self.save_many((weather, ))
+
+    def save_many(self, weathers: Iterable[WeatherModel]) -> None:
+        """insert all records in one transaction."""
+        rows = (self._to_row(make_observation(w)) for w in weathers)
         try:
-            with open(self._jsonfile, "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            raise StorageError
+            with self._conn:
+                self._conn.executemany(self._insert, rows)
+        except sqlite3.Error as err:
+            raise StorageError(err) from err
 
-    def _write(self, history: HistoryRecord) -> None:
-        """If we would have a+ or a mode we`ll have err."""
+    def iter_observations(
+            self,
+            city: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            ) -> Iterator[Observation]:
+        """stream records in observed_at order, cursor fetches lazily."""
+        conditions, params = [], []
+        if city is not None:
+            conditions.append("city = ?")
+            params.append(city)
+        if start is not None:
+            conditions.append("observed_at >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            conditions.append("observed_at <= ?")
+            params.append(end.timestamp())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (
+            "SELECT city, temperature, scale, main, description, "
+            "sunrise, sunset, observed_at FROM observations "
+            f"{where} ORDER BY observed_at"
+        )
         try:
-            with open(self._jsonfile, "a+") as f:
-                json.dump(history, f, ensure_ascii=False, indent=4)
-        except FileNotFoundError:
-            raise StorageError
+            for row in self._conn.execute(query, params):
+                yield self._from_row(row)
+        except sqlite3.Error as err:
+            raise StorageError(err) from err
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            conn = sqlite3.connect(self._dbfile, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: fsync on checkpoint, not on every commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                for statement in self._schema:
+                    conn.execute(statement)
+        except sqlite3.Error as err:
+            raise StorageError(err) from err
+        return conn
+
+    @staticmethod
+    def _from_row(row: tuple) -> Observation:
+        city, temperature, scale, main, description, *times = row
+        sunrise, sunset, observed_at = map(datetime.fromtimestamp, times)
+        return Observation(
+            city, temperature, scale, main, description,
+            sunrise, sunset, observed_at,
+        )
+
+    @staticmethod
+    def _to_row(observation: Observation) -> tuple:
+        return (
+            observation.city,
+            observation.temperature,
+            observation.scale,
+            observation.main,
+            observation.description,
+            observation.sunrise.timestamp(),
+            observation.sunset.timestamp(),
+            observation.observed_at.timestamp(),
+        )
 
 
 def save_weather(weather: WeatherModel, storage: WeatherStorage) -> None:
@@ -0,0 +1,209 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from history import Observation, ObservationSource
+from weather_utils import TemperatureScaleKind
+
+try:
+    import numpy as np  # type: ignore[import]
+except ImportError:
+    np = None
+
+
+__all__ = [
+        "Bucket",
+        "BucketStats",
+        "HistoryQueryEngine",
+        ]
+
+
+_BucketKeyT = Tuple[int, str]
+
+
+class Bucket(str, Enum):
+    HOUR: str = "hour"
+    DAY: str = "day"
+
+
+@dataclass(slots=True)
+class BucketStats:
+    """aggregates of one city observations in one time bucket."""
+    city: str
+    start: datetime
+    count: int = 0
+    min: float = float("inf")
+    max: float = float("-inf")
+    total: float = 0.0
+    conditions: Counter = field(default_factory=Counter)
+
+    @property
+    def mean(self) -> float:
+        if not self.count:
+            return float("nan")
+        return self.total / self.count
+
+    def merge(
+            self,
+            count: int,
+            min_: float,
+            max_: float,
+            total: float,
+            ) -> None:
+        self.count += count
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+        self.total += total
+
+
+def _bucket_key(moment: datetime, bucket: Bucket) -> int:
+    """local time bucket number, observations keep naive local time."""
+    if bucket is Bucket.DAY:
+        return moment.toordinal()
+    return moment.toordinal() * 24 + moment.hour
+
+
+def _bucket_start(key: int, bucket: Bucket) -> datetime:
+    if bucket is Bucket.DAY:
+        return datetime.fromordinal(key)
+    day, hour = divmod(key, 24)
+    return datetime.fromordinal(day) + timedelta(hours=hour)
+
+
+def _convert(value: float, src: str, dst: TemperatureScaleKind) -> float:
+    if src == dst.value:
+        return value
+    if dst is TemperatureScaleKind.CELSIUS:
+        return (value - 32) * 5 / 9
+    return value * 9 / 5 + 32
+
+
+class HistoryQueryEngine:
+    """Filters and aggregates over stored observations.
+
+    Records are pulled from source in chunks, so memory depends
+    on chunk size and count of open buckets, not on history size.
+    Chunk reductions are vectorized when NumPy is installed."""
+
+    def __init__(
+            self,
+            source: ObservationSource,
+            chunk_size: int = 4096,
+            use_numpy: bool = True,
+            ) -> None:
+        self._source = source
+        self._chunk_size = chunk_size
+        self._use_numpy = use_numpy and np is not None
+
+    def select(
+            self,
+            city: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            ) -> Iterator[Observation]:
+        return self._source.iter_observations(city, start, end)
+
+    def aggregate(
+            self,
+            bucket: Bucket = Bucket.HOUR,
+            city: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            scale: TemperatureScaleKind = TemperatureScaleKind.CELSIUS,
+            ) -> Iterator[BucketStats]:
+        """yield per city stats of each bucket in time order.
+
+        Temperatures are converted to requested scale first."""
+        opened: Dict[_BucketKeyT, BucketStats] = {}
+        for chunk in self._chunks(self.select(city, start, end)):
+            keys = [
+                (_bucket_key(obs.observed_at, bucket), obs.city)
+                for obs in chunk
+            ]
+            temps = [
+                _convert(obs.temperature, obs.scale, scale)
+                for obs in chunk
+            ]
+            for key, obs in zip(keys, chunk):
+                self._stats_for(opened, key, bucket).conditions[obs.main] += 1
+            self._reduce(opened, keys, temps, bucket)
+            # source is time ordered, so earlier buckets are complete
+            yield from self._flush(opened, keys[-1][0])
+        yield from self._flush(opened, None)
+
+    def _chunks(
+            self,
+            observations: Iterable[Observation],
+            ) -> Iterator[List[Observation]]:
+        iterator = iter(observations)
+        while chunk := list(islice(iterator, self._chunk_size)):
+            yield chunk
+
+    def _reduce(
+            self,
+            opened: Dict[_BucketKeyT, BucketStats],
+            keys: List[_BucketKeyT],
+            temps: List[float],
+            bucket: Bucket,
+            ) -> None:
+        if self._use_numpy:
+            self._reduce_numpy(opened, keys, temps, bucket)
+            return
+        for key, temp in zip(keys, temps):
+            self._stats_for(opened, key, bucket).merge(1, temp, temp, temp)
+
+    def _reduce_numpy(
+            self,
+            opened: Dict[_BucketKeyT, BucketStats],
+            keys: List[_BucketKeyT],
+            temps: List[float],
+            bucket: Bucket,
+            ) -> None:
+        groups: Dict[_BucketKeyT, int] = {}
+        group_ids = np.fromiter(
+                (groups.setdefault(key, len(groups)) for key in keys),
+                dtype=np.intp,
+                count=len(keys),
+                )
+        values = np.asarray(temps, dtype=np.float64)
+        size = len(groups)
+        counts = np.bincount(group_ids, minlength=size)
+        totals = np.bincount(group_ids, weights=values, minlength=size)
+        mins = np.full(size, np.inf)
+        maxs = np.full(size, -np.inf)
+        np.minimum.at(mins, group_ids, values)
+        np.maximum.at(maxs, group_ids, values)
+        for key, pos in groups.items():
+            self._stats_for(opened, key, bucket).merge(
+                    int(counts[pos]),
+                    float(mins[pos]),
+                    float(maxs[pos]),
+                    float(totals[pos]),
+                    )
+
+    def _stats_for(
+            self,
+            opened: Dict[_BucketKeyT, BucketStats],
+            key: _BucketKeyT,
+            bucket: Bucket,
+            ) -> BucketStats:
+        stats = opened.get(key)
+        if stats is None:
+            stats = BucketStats(key[1], _bucket_start(key[0], bucket))
+            opened[key] = stats
+        return stats
+
+    def _flush(
+            self,
+            opened: Dict[_BucketKeyT, BucketStats],
+            before: Optional[int],
+            ) -> Iterator[BucketStats]:
+        ready = sorted(
+                key for key in opened
+                if before is None or key[0] < before
+                )
+        for key in ready:
+            yield opened.pop(key)
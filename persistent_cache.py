@@ -0,0 +1,318 @@
+from dataclasses import dataclass
+from pathlib import Path
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Set
+
+from coordinates import Coordinates
+from exceptions import ApiServiceError, CircuitOpenError
+from exceptions import QuotaExceededError, StorageError
+from weather_api_service import ExternalWeatherService
+from weather_cache import CacheKey, make_cache_key, DEFAULT_PRECISION
+from weather_models import WeatherModel
+from base_types import LiteralT
+from rate_limit import Priority, call_priority
+from timing import span
+
+
+__all__ = [
+        "CachedResponse",
+        "SQLiteResponseCache",
+        "PersistentCachedWeatherService",
+        "spawn_refresh_process",
+        ]
+
+
+ClockT = Callable[[], float]
+RefreshT = Callable[[Coordinates], None]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    body BLOB NOT NULL
+)
+"""
+
+# key is being refreshed by some process until expires_at
+_LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refresh_leases (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class CachedResponse:
+    body: bytes
+    fetched_at: float
+
+
+class SQLiteResponseCache:
+    """raw service responses in sqlite file, shared between processes.
+
+    WAL journal lets concurrent CLI runs read while one of them writes.
+    Refresh leases tell processes which stale entries are already being
+    refreshed; stored response ends lease of its key."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._local = threading.local()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            row = self._connection().execute(
+                    "SELECT body, fetched_at FROM responses WHERE key = ?",
+                    (key, ),
+                    ).fetchone()
+        except sqlite3.Error as err:
+            raise StorageError(err) from err
+        if row is None:
+            return None
+        return CachedResponse(bytes(row[0]), row[1])
+
+    def put(self, key: str, body: LiteralT, fetched_at: float) -> None:
+        if isinstance(body, str):
+            body = body.encode()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                        (key, fetched_at, body),
+                        )
+                conn.execute(
+                        "DELETE FROM refresh_leases WHERE key = ?",
+                        (key, ),
+                        )
+        except sqlite3.Error as err:
+            raise StorageError(err) from err
+
+    def take_lease(self, key: str, now: float, ttl: float) -> bool:
+        """lease key for refresh till now + ttl, False if other lease
+        of key is still live."""
+        try:
+            with self._connection() as conn:
+                cursor = conn.execute(
+                        "INSERT INTO refresh_leases VALUES (?, ?)"
+                        " ON CONFLICT (key) DO UPDATE"
+                        " SET expires_at = excluded.expires_at"
+                        " WHERE expires_at <= ?",
+                        (key, now + ttl, now),
+                        )
+        except sqlite3.Error as err:
+            raise StorageError(err) from err
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """sqlite connection can`t be shared between threads."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = sqlite3.connect(self._path, timeout=5.0)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(_SCHEMA)
+                conn.execute(_LEASE_SCHEMA)
+            except sqlite3.Error as err:
+                raise StorageError(err) from err
+            self._local.conn = conn
+        return conn
+
+
+class PersistentCachedWeatherService:
+    """stale-while-revalidate cache in front of ExternalWeatherService.
+
+    Fresh entry (younger than soft_ttl) is returned as is. Stale entry
+    (younger than hard_ttl) is returned too, but refreshed in background:
+    by background_refresh(coordinates) if it is given, else in daemon
+    thread, so process exit never waits for it. Refresh is started only
+    by process which takes lease of entry for lease_ttl seconds; failed
+    refresh is not repeated until lease expires. Older, missing or
+    broken entry is fetched synchronously; while service circuit is
+    open even expired entry is returned."""
+
+    def __init__(
+            self,
+            service: ExternalWeatherService,
+            cache: SQLiteResponseCache,
+            lang: str,
+            soft_ttl: float = 600.0,
+            hard_ttl: float = 3600.0,
+            precision: int = DEFAULT_PRECISION,
+            clock: ClockT = time.time,
+            background_refresh: Optional[RefreshT] = None,
+            lease_ttl: float = 120.0,
+            ) -> None:
+        self._service = service
+        self._cache = cache
+        self._lang = lang
+        self._soft_ttl = soft_ttl
+        self._hard_ttl = hard_ttl
+        self._precision = precision
+        self._clock = clock
+        self._background_refresh = background_refresh
+        self._lease_ttl = lease_ttl
+        self._refreshing: Set[str] = set()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def get_weather(self, coordinates: Coordinates) -> WeatherModel:
+        key = self._cache_key(coordinates)
+        entry = self._lookup(key)
+        cached = None if entry is None else self._parse_cached(entry)
+        if entry is not None and cached is not None:
+            age = self._clock() - entry.fetched_at
+            if age < self._soft_ttl:
+                return cached
+            if age < self._hard_ttl:
+                self._refresh_in_background(key, coordinates)
+                return cached
+            try:
+                return self._fetch(key, coordinates)
+            except CircuitOpenError:
+                return cached
+        return self._fetch(key, coordinates)
+
+    def refresh(self, coordinates: Coordinates) -> WeatherModel:
+        """bypass cache reading, but store fresh response."""
+        return self._fetch(self._cache_key(coordinates), coordinates)
+
+    def wait_refreshes(self, timeout: Optional[float] = None) -> None:
+        """join background refresh threads, exit does not wait them."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def _cache_key(self, coordinates: Coordinates) -> str:
+        key: CacheKey = make_cache_key(
+                coordinates,
+                self._service.units,
+                self._lang,
+                self._precision,
+                )
+        return "|".join(map(str, key))
+
+    def _lookup(self, key: str) -> Optional[CachedResponse]:
+        try:
+            with span("cache.lookup"):
+                return self._cache.get(key)
+        except StorageError:
+            # broken cache must not break weather fetching
+            return None
+
+    def _parse_cached(self, entry: CachedResponse) -> Optional[WeatherModel]:
+        try:
+            return self._service.parse_weather(entry.body)
+        except ApiServiceError:
+            # corrupt entry is a miss, fresh response replaces it
+            return None
+
+    def _fetch(self, key: str, coordinates: Coordinates) -> WeatherModel:
+        fetched_at = self._clock()
+        response = self._service.get_raw_weather(coordinates)
+        weather = self._service.parse_weather(response)
+        try:
+            with span("cache.store"):
+                self._cache.put(key, response, fetched_at)
+        except StorageError:
+            pass
+        return weather
+
+    def _refresh_in_background(
+            self,
+            key: str,
+            coordinates: Coordinates,
+            ) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+        # lease is taken atomically, only one caller gets through
+        if not self._take_lease(key):
+            return
+        if self._background_refresh is not None:
+            # hook refresh is not tracked here, lease guards it
+            self._background_refresh(coordinates)
+            return
+        thread = threading.Thread(
+                target=self._background_fetch,
+                args=(key, coordinates),
+                name=f"weather-refresh-{key}",
+                daemon=True,
+                )
+        with self._lock:
+            self._refreshing.add(key)
+            self._threads.append(thread)
+        thread.start()
+
+    def _take_lease(self, key: str) -> bool:
+        """False if other process refreshes key or cache is broken."""
+        try:
+            return self._cache.take_lease(
+                    key,
+                    self._clock(),
+                    self._lease_ttl,
+                    )
+        except StorageError:
+            return False
+
+    def _background_fetch(self, key: str, coordinates: Coordinates) -> None:
+        try:
+            # user already sees stale entry, quota goes to lookups first
+            with call_priority(Priority.BACKGROUND):
+                self._fetch(key, coordinates)
+        except ApiServiceError:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+def spawn_refresh_process(coordinates: Coordinates) -> None:
+    """refresh cache entry in detached process.
+
+    One-shot CLI returns stale weather and exits at once, refresh
+    outlives it. Child builds service from .env of current directory."""
+    import subprocess
+    subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(__file__).resolve()),
+                "--refresh",
+                repr(coordinates.latitude),
+                repr(coordinates.longitude),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            )
+
+
+def _refresh_main(argv: List[str]) -> None:
+    from config import get_container
+    if len(argv) != 3 or argv[0] != "--refresh":
+        sys.exit("usage: persistent_cache.py --refresh LATITUDE LONGITUDE")
+    coordinates = Coordinates(float(argv[1]), float(argv[2]))
+    try:
+        # wait for quota is bounded, see RATE_LIMIT_MAX_BACKGROUND_WAIT
+        with call_priority(Priority.BACKGROUND):
+            get_container().weather_service.refresh(coordinates)
+    except QuotaExceededError:
+        # quota is spent, lease keeps others off till it expires
+        return
+    except (ApiServiceError, StorageError):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    _refresh_main(sys.argv[1:])
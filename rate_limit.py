@@ -0,0 +1,346 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+import heapq
+import itertools
+import math
+from pathlib import Path
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from exceptions import QuotaExceededError
+
+
+__all__ = [
+        "Priority",
+        "TokenBucket",
+        "QuotaStore",
+        "RateLimitStats",
+        "RateLimiter",
+        "call_priority",
+        "current_priority",
+        ]
+
+
+class Priority(IntEnum):
+    """lower value goes first."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_PRIORITY: ContextVar[Priority] = ContextVar(
+        "weather_call_priority",
+        default=Priority.INTERACTIVE,
+        )
+
+
+def current_priority() -> Priority:
+    return _PRIORITY.get()
+
+
+@contextmanager
+def call_priority(priority: Priority) -> Iterator[None]:
+    """API calls made inside block (same thread or task) get priority."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class TokenBucket:
+    """capacity tokens at most, refilled continuously at rate per second.
+
+    Not thread safe, RateLimiter guards it."""
+
+    def __init__(
+            self,
+            capacity: float,
+            rate: float,
+            clock: Callable[[], float] = time.monotonic,
+            ) -> None:
+        if capacity < 1 or rate <= 0:
+            raise ValueError("capacity must be >= 1 and rate positive")
+        self._capacity = capacity
+        self._rate = rate
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def limit(self, tokens: float) -> None:
+        """no more than tokens left, e.g. spent by other processes."""
+        self._refill()
+        self._tokens = min(self._tokens, tokens)
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """seconds until amount of tokens is available, 0 if it is now."""
+        self._refill()
+        missing = amount - self._tokens
+        return 0.0 if missing <= 0 else missing / self._rate
+
+    def take(self, amount: float = 1.0) -> None:
+        self._refill()
+        self._tokens -= amount
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+                self._capacity,
+                self._tokens + (now - self._updated) * self._rate,
+                )
+        self._updated = now
+
+
+# seconds to wait for write lock of quota file held by other process
+_STORE_BUSY_TIMEOUT = 5.0
+
+_QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class QuotaStore:
+    """bucket levels in sqlite file, so quota holds across CLI runs.
+
+    Every grant decision is made in one write transaction: levels
+    written by other processes are applied first, then result is
+    stored. If file can't be used, limiter goes on with own buckets."""
+
+    def __init__(
+            self,
+            path: Path,
+            clock: Callable[[], float] = time.time,
+            ) -> None:
+        self._path = path
+        self._clock = clock
+
+    def exchange(
+            self,
+            buckets: Mapping[str, TokenBucket],
+            decide: Callable[[], float],
+            timeout: Optional[float] = None,
+            ) -> float:
+        """run decide() on buckets synced with file, store them after.
+
+        File locked by other process longer than timeout seconds
+        counts as unusable."""
+        import sqlite3
+        busy_timeout = _STORE_BUSY_TIMEOUT
+        if timeout is not None:
+            busy_timeout = max(0.0, min(timeout, busy_timeout))
+        try:
+            conn = sqlite3.connect(
+                    self._path,
+                    timeout=busy_timeout,
+                    isolation_level=None,
+                    )
+        except sqlite3.Error:
+            return decide()
+        try:
+            conn.execute(_QUOTA_SCHEMA)
+            conn.execute("BEGIN IMMEDIATE")
+            now = self._clock()
+            for name, tokens, updated_at in conn.execute(
+                    "SELECT name, tokens, updated_at FROM rate_limit_buckets",
+                    ):
+                bucket = buckets.get(name)
+                if bucket is not None:
+                    elapsed = max(0.0, now - updated_at)
+                    bucket.limit(tokens + elapsed * bucket.rate)
+            result = decide()
+            conn.executemany(
+                    "INSERT OR REPLACE INTO rate_limit_buckets"
+                    " VALUES (?, ?, ?)",
+                    [(name, bucket.tokens, now)
+                     for name, bucket in buckets.items()],
+                    )
+            conn.execute("COMMIT")
+            return result
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return decide()
+        finally:
+            conn.close()
+
+
+@dataclass(slots=True)
+class RateLimitStats:
+    granted: int = 0
+    # background calls that had to wait
+    deferred: int = 0
+    # calls failed with QuotaExceededError: out of time or cancelled
+    rejected: int = 0
+
+
+class RateLimiter:
+    """client side quota: calls per minute and per day.
+
+    Callers wait in priority queue; head of queue gets next token.
+    Interactive call that would wait longer than max_wait fails with
+    QuotaExceededError, background one longer than max_background_wait
+    (no limit if None). Without store quota is counted by this
+    process only; store is asked outside of lock, so slow quota file
+    never holds up callers waiting for their turn."""
+
+    def __init__(
+            self,
+            per_minute: Optional[int] = None,
+            per_day: Optional[int] = None,
+            max_wait: float = 10.0,
+            clock: Callable[[], float] = time.monotonic,
+            store: Optional[QuotaStore] = None,
+            max_background_wait: Optional[float] = None,
+            ) -> None:
+        self._buckets: Dict[str, TokenBucket] = {}
+        if per_minute is not None:
+            self._buckets["minute"] = TokenBucket(
+                    per_minute,
+                    per_minute / 60,
+                    clock,
+                    )
+        if per_day is not None:
+            self._buckets["day"] = TokenBucket(per_day, per_day / 86400, clock)
+        self._store = store
+        self._max_wait = max_wait
+        self._max_background_wait = max_background_wait
+        self._clock = clock
+        self._waiting: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        # set while queue head exchanges buckets with store
+        self._taking = False
+        self._cond = threading.Condition()
+        self._stats = RateLimitStats()
+
+    @property
+    def stats(self) -> RateLimitStats:
+        return self._stats
+
+    def acquire(
+            self,
+            priority: Optional[Priority] = None,
+            timeout: Optional[float] = None,
+            cancelled: Optional[threading.Event] = None,
+            ) -> None:
+        """block until call may be made, priority of context by default.
+
+        Wait is bounded by timeout seconds, by max_wait or
+        max_background_wait of priority if timeout is not given.
+        QuotaExceededError is raised when it runs out or when cancelled
+        is set (see wake)."""
+        if priority is None:
+            priority = current_priority()
+        if timeout is None:
+            timeout = self._max_background_wait
+            if priority is Priority.INTERACTIVE:
+                timeout = self._max_wait
+        deadline = None if timeout is None else self._clock() + timeout
+        entry = (int(priority), next(self._seq))
+        # when buckets should have token again
+        ready_at = self._clock()
+        deferred = False
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+        try:
+            while True:
+                with self._cond:
+                    self._wait_turn(entry, ready_at, deadline, cancelled)
+                try:
+                    wait = self._try_take(deadline, cancelled)
+                finally:
+                    with self._cond:
+                        self._taking = False
+                        self._cond.notify_all()
+                if wait <= 0:
+                    with self._cond:
+                        self._stats.granted += 1
+                    return
+                if priority is Priority.BACKGROUND and not deferred:
+                    deferred = True
+                    with self._cond:
+                        self._stats.deferred += 1
+                ready_at = self._clock() + wait
+        finally:
+            with self._cond:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def wake(self) -> None:
+        """make waiters check their cancelled flags at once."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _wait_turn(
+            self,
+            entry: Tuple[int, int],
+            ready_at: float,
+            deadline: Optional[float],
+            cancelled: Optional[threading.Event],
+            ) -> None:
+        """wait under lock until entry may try to take token."""
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                raise self._reject("API call is cancelled")
+            now = self._clock()
+            if (now >= ready_at and not self._taking
+                    and self._waiting[0] == entry):
+                self._taking = True
+                return
+            if deadline is not None and (now >= deadline
+                                         or ready_at > deadline):
+                raise self._reject("API call quota is exhausted")
+            timeout = None
+            if ready_at > now:
+                timeout = ready_at - now
+            if deadline is not None:
+                left = deadline - now
+                timeout = left if timeout is None else min(timeout, left)
+            self._cond.wait(timeout)
+
+    def _reject(self, message: str) -> QuotaExceededError:
+        self._stats.rejected += 1
+        return QuotaExceededError(message)
+
+    def _try_take(
+            self,
+            deadline: Optional[float],
+            cancelled: Optional[threading.Event],
+            ) -> float:
+        """take token if there is one, else return seconds to wait."""
+        def decide() -> float:
+            # caller gave up meanwhile, token stays in bucket
+            if cancelled is not None and cancelled.is_set():
+                return math.inf
+            return self._take_if_ready()
+        if self._store is None:
+            return decide()
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - self._clock()
+        return self._store.exchange(self._buckets, decide, timeout)
+
+    def _take_if_ready(self) -> float:
+        wait = max(
+                (bucket.wait_time() for bucket in self._buckets.values()),
+                default=0.0,
+                )
+        if wait <= 0:
+            for bucket in self._buckets.values():
+                bucket.take()
+        return wait
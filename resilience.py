@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from enum import Enum
+import random
+import threading
+import time
+from typing import Callable, FrozenSet, Optional, TypeVar
+
+from exceptions import ApiServiceError, CircuitOpenError, TransportError
+
+
+__all__ = [
+        "RetryPolicy",
+        "BreakerState",
+        "CircuitBreaker",
+        "ResilienceStats",
+        "Resilience",
+        ]
+
+
+_T = TypeVar("_T")
+
+# rate limit and upstream troubles, worth asking again
+RETRYABLE_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(slots=True, frozen=True)
+class RetryPolicy:
+    """attempts limit, timeout and backoff bounds, seconds.
+
+    attempt_timeout bounds every socket operation of attempt (connect,
+    each read), it is not deadline of attempt as a whole."""
+    attempts: int = 3
+    attempt_timeout: float = 5.0
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    retry_statuses: FrozenSet[int] = RETRYABLE_STATUSES
+
+    def backoff(self, retry: int, rnd: Callable[[], float]) -> float:
+        """full jitter: uniform in [0, base * 2 ** retry], capped."""
+        return rnd() * min(self.max_delay, self.base_delay * 2 ** retry)
+
+    def is_retryable(self, err: ApiServiceError) -> bool:
+        """network failures and listed statuses; bad responses and
+        permanent transport errors are not."""
+        if not isinstance(err, TransportError) or not err.transient:
+            return False
+        return err.status is None or err.status in self.retry_statuses
+
+
+class BreakerState(str, Enum):
+    CLOSED: str = "closed"
+    OPEN: str = "open"
+    HALF_OPEN: str = "half_open"
+
+
+class CircuitBreaker:
+    """stop asking service after failure_threshold failures in a row.
+
+    After reset_timeout one probe call is let through (half open):
+    its success closes circuit, failure opens it again."""
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30.0,
+            clock: Callable[[], float] = time.monotonic,
+            ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            open_for = self._clock() - self._opened_at
+            if (self._state is BreakerState.OPEN
+                    and open_for >= self._reset_timeout):
+                return BreakerState.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """may call go to service now."""
+        with self._lock:
+            if self._state is BreakerState.CLOSED:
+                return True
+            if self._state is BreakerState.OPEN:
+                if self._clock() - self._opened_at < self._reset_timeout:
+                    return False
+                self._state = BreakerState.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = BreakerState.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (self._state is BreakerState.HALF_OPEN
+                    or self._failures >= self._failure_threshold):
+                self._state = BreakerState.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def record_ignored(self) -> None:
+        """call ended without telling anything about service health."""
+        with self._lock:
+            self._probing = False
+
+
+@dataclass(slots=True)
+class ResilienceStats:
+    calls: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failures: int = 0
+    short_circuited: int = 0
+
+
+class Resilience:
+    """retries with jittered exponential backoff behind circuit breaker."""
+
+    def __init__(
+            self,
+            policy: RetryPolicy = RetryPolicy(),
+            breaker: Optional[CircuitBreaker] = None,
+            sleep: Callable[[float], None] = time.sleep,
+            rnd: Callable[[], float] = random.random,
+            ) -> None:
+        self._policy = policy
+        self._breaker = CircuitBreaker() if breaker is None else breaker
+        self._sleep = sleep
+        self._rnd = rnd
+        self._stats = ResilienceStats()
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> ResilienceStats:
+        return self._stats
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self._breaker
+
+    def call(self, attempt: Callable[[float], _T]) -> _T:
+        """run attempt(timeout) until it succeeds or retries run out.
+
+        Raise CircuitOpenError without calling when circuit is open."""
+        self._count("calls")
+        retry = 0
+        while True:
+            if not self._breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError
+            self._count("attempts")
+            try:
+                result = attempt(self._policy.attempt_timeout)
+            except ApiServiceError as err:
+                if not self._policy.is_retryable(err):
+                    self._breaker.record_ignored()
+                    self._count("failures")
+                    raise
+                self._breaker.record_failure()
+                if retry + 1 >= self._policy.attempts:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self._sleep(self._policy.backoff(retry, self._rnd))
+                retry += 1
+                continue
+            except BaseException:
+                # bug or interrupt, half open probe must not stay taken
+                self._breaker.record_ignored()
+                raise
+            self._breaker.record_success()
+            return result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self._stats, name, getattr(self._stats, name) + 1)
@@ -7,6 +7,7 @@ from typing import TypeVar
 from typing import TypeAlias
 from typing import Final
 from collections import OrderedDict
+import re
 
 
 _ReturnType = TypeVar("_ReturnType", Mapping[str, str], Path)
@@ -14,6 +15,9 @@ _P: TypeAlias = Union[int, Union[str, bytes, PathLike[str], PathLike[bytes]]]
 
 NO_PATH: Final[str] = ""
 
+# comment after value, as python-dotenv reads it: "KEY=value  # note"
+_INLINE_COMMENT = re.compile(r"\s+#.*$")
+
 
 class PathError(Exception):
     """Base error if .env path not exists."""
@@ -39,7 +43,8 @@ def _dotenv_mock() -> Callable[..., _ReturnType]:
                     if not line or line.startswith("#"):
                         continue
                     key, value = line.split("=", 1)
-                    config[key] = value
+                    value = _INLINE_COMMENT.sub("", value.strip())
+                    config[key.strip()] = value
             return config
         except FileNotFoundError:
             raise PathError(f"Path '{dotenv_path!r}' not exists.")
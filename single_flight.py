@@ -0,0 +1,154 @@
+import asyncio
+from dataclasses import dataclass
+import threading
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional
+from typing import TypeVar
+
+from coordinates import Coordinates, round_coordinates
+from weather_api_service import DimSystemT, ExternalWeatherService
+from weather_cache import DEFAULT_PRECISION
+from weather_models import WeatherModel
+
+
+__all__ = [
+        "FlightStats",
+        "SingleFlight",
+        "AsyncSingleFlight",
+        "CoalescingWeatherService",
+        "flight_key",
+        ]
+
+
+_T = TypeVar("_T")
+
+
+@dataclass(slots=True)
+class FlightStats:
+    calls: int = 0
+    executed: int = 0
+    collapsed: int = 0
+
+
+def flight_key(
+        service: ExternalWeatherService,
+        coordinates: Coordinates,
+        precision: int = DEFAULT_PRECISION,
+        ) -> str:
+    """request URL for quantized coordinates.
+
+    URL carries units and language too, so calls equal by key would
+    ask service exactly the same."""
+    return service.weather_url(round_coordinates(coordinates, precision))
+
+
+class _Call(Generic[_T]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[_T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[_T]):
+    """threads asking same key at once share one call.
+
+    First caller runs function, the others wait and get its result
+    or its exception. Nothing is kept after call is over."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call[_T]] = {}
+        self._lock = threading.Lock()
+        self._stats = FlightStats()
+
+    @property
+    def stats(self) -> FlightStats:
+        return self._stats
+
+    def do(self, key: Hashable, func: Callable[[], _T]) -> _T:
+        with self._lock:
+            self._stats.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._stats.executed += 1
+            else:
+                self._stats.collapsed += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result  # type: ignore[return-value]
+        try:
+            call.result = func()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight(Generic[_T]):
+    """asyncio tasks asking same key at once await one task.
+
+    Shared task is shielded: cancelled waiter does not cancel it
+    for the others."""
+
+    def __init__(self) -> None:
+        self._tasks: Dict[Hashable, "asyncio.Future[_T]"] = {}
+        self._stats = FlightStats()
+
+    @property
+    def stats(self) -> FlightStats:
+        return self._stats
+
+    async def do(
+            self,
+            key: Hashable,
+            func: Callable[[], Awaitable[_T]],
+            ) -> _T:
+        self._stats.calls += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self._stats.executed += 1
+        else:
+            self._stats.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Future[_T]") -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+
+class CoalescingWeatherService:
+    """concurrent lookups of one place share one request."""
+
+    def __init__(
+            self,
+            service: ExternalWeatherService,
+            precision: int = DEFAULT_PRECISION,
+            ) -> None:
+        self._service = service
+        self._precision = precision
+        self._flights: SingleFlight[WeatherModel] = SingleFlight()
+
+    @property
+    def units(self) -> DimSystemT:
+        return self._service.units
+
+    @property
+    def stats(self) -> FlightStats:
+        return self._flights.stats
+
+    def get_weather(self, coordinates: Coordinates) -> WeatherModel:
+        return self._flights.do(
+                flight_key(self._service, coordinates, self._precision),
+                lambda: self._service.get_weather(coordinates),
+                )
@@ -0,0 +1,232 @@
+from collections import deque
+from dataclasses import dataclass
+import math
+import threading
+import time
+from typing import Callable, Deque, Dict, Generic, Iterable, List, Optional
+from typing import Set, Tuple, TypeVar
+
+from coordinates import EARTH_RADIUS_M, Coordinates
+from weather_api_service import DimSystemT, ExternalWeatherService
+from weather_models import WeatherModel
+
+
+__all__ = [
+        "SpatialIndex",
+        "SpatialCacheStats",
+        "SpatialCachedWeatherService",
+        ]
+
+
+_V = TypeVar("_V")
+_CellT = Tuple[int, int]
+
+# meters in one degree of latitude
+_M_PER_DEGREE = 111_320.0
+
+
+class _Entry(Generic[_V]):
+    __slots__ = (
+            "coordinates", "value", "added_at", "cell",
+            "lat", "lon", "cos_lat",
+            )
+
+    def __init__(
+            self,
+            coordinates: Coordinates,
+            value: _V,
+            added_at: float,
+            cell: _CellT,
+            ) -> None:
+        self.coordinates = coordinates
+        self.value = value
+        self.added_at = added_at
+        self.cell = cell
+        # radians, kept for haversine in queries
+        self.lat = math.radians(coordinates.latitude)
+        self.lon = math.radians(coordinates.longitude)
+        self.cos_lat = math.cos(self.lat)
+
+
+class SpatialIndex(Generic[_V]):
+    """points on uniform grid of cell_size meters (by latitude).
+
+    Radius query looks only at cells the circle can touch; when circle
+    covers whole latitude row (near the poles) only occupied cells of
+    the row are visited. Points are expected to be added in time order,
+    so expiry pops them from the oldest end. Not thread safe."""
+
+    def __init__(self, cell_size: float = 500.0) -> None:
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self._cell_deg = cell_size / _M_PER_DEGREE
+        self._lon_cells = math.ceil(360 / self._cell_deg)
+        self._cells: Dict[_CellT, List[_Entry[_V]]] = {}
+        # latitude row -> its occupied longitude cells
+        self._rows: Dict[int, Set[int]] = {}
+        self._by_age: Deque[_Entry[_V]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._by_age)
+
+    def insert(self, coordinates: Coordinates, value: _V, at: float) -> None:
+        cell = self._cell_of(coordinates)
+        entry = _Entry(coordinates, value, at, cell)
+        entries = self._cells.get(cell)
+        if entries is None:
+            entries = self._cells[cell] = []
+            self._rows.setdefault(cell[0], set()).add(cell[1])
+        entries.append(entry)
+        self._by_age.append(entry)
+
+    def expire(self, before: float) -> int:
+        """drop points added before given time, return their count."""
+        dropped = 0
+        while self._by_age and self._by_age[0].added_at < before:
+            self._drop_oldest()
+            dropped += 1
+        return dropped
+
+    def trim(self, max_size: int) -> int:
+        """drop oldest points above max_size, return their count."""
+        dropped = 0
+        while len(self._by_age) > max_size:
+            self._drop_oldest()
+            dropped += 1
+        return dropped
+
+    def nearest(
+            self,
+            coordinates: Coordinates,
+            radius: float,
+            ) -> Optional[Tuple[float, Coordinates, _V]]:
+        """closest point within radius meters: distance, place, value."""
+        # haversine term grows with distance, asin only for the best one
+        lat = math.radians(coordinates.latitude)
+        lon = math.radians(coordinates.longitude)
+        cos_lat = math.cos(lat)
+        best: Optional[_Entry[_V]] = None
+        best_h = math.sin(min(math.pi, radius / EARTH_RADIUS_M) / 2) ** 2
+        sin = math.sin
+        for cell in self._cells_around(coordinates, radius):
+            for entry in self._cells.get(cell, ()):
+                h = (
+                    sin((entry.lat - lat) / 2) ** 2
+                    + cos_lat * entry.cos_lat * sin((entry.lon - lon) / 2) ** 2
+                )
+                if h <= best_h:
+                    best, best_h = entry, h
+        if best is None:
+            return None
+        distance = 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(best_h)))
+        return distance, best.coordinates, best.value
+
+    def _drop_oldest(self) -> None:
+        entry = self._by_age.popleft()
+        entries = self._cells[entry.cell]
+        entries.remove(entry)
+        if not entries:
+            del self._cells[entry.cell]
+            lat_cell, lon_cell = entry.cell
+            row = self._rows[lat_cell]
+            row.discard(lon_cell)
+            if not row:
+                del self._rows[lat_cell]
+
+    def _cell_of(self, coordinates: Coordinates) -> _CellT:
+        return (
+            math.floor(coordinates.latitude / self._cell_deg),
+            math.floor(coordinates.longitude / self._cell_deg)
+            % self._lon_cells,
+        )
+
+    def _cells_around(
+            self,
+            coordinates: Coordinates,
+            radius: float,
+            ) -> List[_CellT]:
+        lat_cell, lon_cell = self._cell_of(coordinates)
+        lat_span = math.ceil(radius / _M_PER_DEGREE / self._cell_deg)
+        # degree of longitude shrinks to the poles
+        edge_lat = abs(coordinates.latitude) + (lat_span + 1) * self._cell_deg
+        lon_range: Optional[range] = None
+        if edge_lat < 90:
+            edge_cos = math.cos(math.radians(edge_lat))
+            lon_deg = radius / (_M_PER_DEGREE * edge_cos)
+            lon_span = math.ceil(lon_deg / self._cell_deg)
+            if 2 * lon_span + 1 < self._lon_cells:
+                lon_range = range(lon_cell - lon_span, lon_cell + lon_span + 1)
+        cells: List[_CellT] = []
+        for row in range(lat_cell - lat_span, lat_cell + lat_span + 1):
+            lons: Iterable[int]
+            if lon_range is not None:
+                lons = (lon % self._lon_cells for lon in lon_range)
+            else:
+                # whole row, tens of thousands cells are mostly empty
+                lons = self._rows.get(row, ())
+            cells.extend((row, lon) for lon in lons)
+        return cells
+
+
+@dataclass(slots=True)
+class SpatialCacheStats:
+    # lookups answered by nearby observation, API calls saved
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evicted: int = 0
+
+    @property
+    def saved_calls(self) -> int:
+        return self.hits
+
+
+class SpatialCachedWeatherService:
+    """answer lookup with fresh observation of a place nearby.
+
+    Observation younger than max_age seconds within radius meters
+    is returned instead of asking service."""
+
+    def __init__(
+            self,
+            service: ExternalWeatherService,
+            radius: float = 500.0,
+            max_age: float = 600.0,
+            max_entries: int = 50_000,
+            clock: Callable[[], float] = time.monotonic,
+            ) -> None:
+        self._service = service
+        self._radius = radius
+        self._max_age = max_age
+        self._max_entries = max_entries
+        self._clock = clock
+        self._index: SpatialIndex[WeatherModel] = SpatialIndex(radius)
+        self._lock = threading.Lock()
+        self._stats = SpatialCacheStats()
+
+    @property
+    def units(self) -> DimSystemT:
+        return self._service.units
+
+    @property
+    def stats(self) -> SpatialCacheStats:
+        return self._stats
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_weather(self, coordinates: Coordinates) -> WeatherModel:
+        with self._lock:
+            self._stats.expired += self._index.expire(
+                    self._clock() - self._max_age,
+                    )
+            found = self._index.nearest(coordinates, self._radius)
+            if found is not None:
+                self._stats.hits += 1
+                return found[2]
+            self._stats.misses += 1
+        weather = self._service.get_weather(coordinates)
+        with self._lock:
+            self._index.insert(coordinates, weather, self._clock())
+            self._stats.evicted += self._index.trim(self._max_entries)
+        return weather
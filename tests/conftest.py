@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import random
+import sys
+from typing import List
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ROOT / "fixtures"
+
+# modules live in repository root, not in a package
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from weather_api_service import OPW_WeatherService  # noqa: E402
+from weather_models import CelsiusTemperature  # noqa: E402
+from weather_models import FarenheitTemperature  # noqa: E402
+from weather_models import WeatherDescription, WeatherModel  # noqa: E402
+
+
+def fixture_path(name: str) -> Path:
+    return FIXTURES / name
+
+
+@pytest.fixture
+def weather_model() -> WeatherModel:
+    service = OPW_WeatherService(
+            "http://localhost/{latitude}/{longitude}",
+            "metric",
+            )
+    with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+        return service.parse_weather(f.readline())
+
+
+def make_weathers(count: int, seed: int = 1) -> List[WeatherModel]:
+    """observations of few cities, one per 20 minutes, mixed scales."""
+    rnd = random.Random(seed)
+    cities = ["Moscow", "Kazan", "Tver"]
+    conditions = [
+        WeatherDescription("Clear", "ясно"),
+        WeatherDescription("Rain", "дождь"),
+        WeatherDescription("Snow", "снег"),
+    ]
+    start = datetime(2024, 1, 15, 0, 0)
+    weathers = []
+    for i in range(count):
+        observed_at = start + timedelta(minutes=20 * i)
+        if rnd.random() < 0.8:
+            temperature = CelsiusTemperature.of(rnd.randint(-30, 30))
+        else:
+            temperature = FarenheitTemperature.of(rnd.randint(-20, 90))
+        weathers.append(WeatherModel(
+            temperature=temperature,
+            weather_type=rnd.choice(conditions),
+            sunrise=observed_at.replace(hour=8, minute=30),
+            sunset=observed_at.replace(hour=16, minute=45),
+            city=rnd.choice(cities),
+            observed_at=observed_at,
+        ))
+    return weathers
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from async_transport import AsyncHTTPConnectionPool
+from async_weather_service import AsyncWeatherService
+from coordinates import Coordinates
+from exceptions import ApiServiceError, TransportError
+from weather_api_service import OPW_WeatherService
+
+from conftest import fixture_path
+
+
+class BrokenForNorth(OPW_WeatherService):
+    """parser which lets raw errors out, as custom services may."""
+
+    def parse_weather(self, resp):
+        if b'"north"' in resp:
+            raise KeyError("main")
+        return super().parse_weather(resp)
+
+
+class FixtureClient:
+    def __init__(self) -> None:
+        with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+            self._body = f.readline()
+
+    async def get(self, url: str) -> bytes:
+        if "/80" in url:
+            return b'{"north": true}'
+        return self._body
+
+    async def close(self) -> None:
+        pass
+
+
+def test_broken_response_fails_only_its_lookup():
+    service = BrokenForNorth(
+            "http://localhost/{latitude}/{longitude}",
+            "metric",
+            )
+    async_service = AsyncWeatherService(service, client=FixtureClient())
+    places = [Coordinates(55.0, 37.0), Coordinates(80.0, 37.0)]
+
+    async def collect():
+        return [r async for r in async_service.get_weather_many(places)]
+
+    results = {r.coordinates.latitude: r for r in asyncio.run(collect())}
+
+    assert results[55.0].ok
+    assert isinstance(results[80.0].error, ApiServiceError)
+
+
+async def serve(handler):
+    closed = asyncio.Event()
+
+    async def on_client(reader, writer):
+        await handler(writer)
+        # wait until client drops connection
+        await reader.read()
+        closed.set()
+        writer.close()
+
+    server = await asyncio.start_server(on_client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/", closed
+
+
+def test_connection_closed_on_overlong_line():
+    async def huge_status_line(writer):
+        writer.write(b"HTTP/1.1 200 " + b"x" * (1 << 17))
+        await writer.drain()
+
+    async def scenario():
+        server, url, closed = await serve(huge_status_line)
+        pool = AsyncHTTPConnectionPool()
+        async with server:
+            with pytest.raises(TransportError):
+                await pool.get(url)
+            await asyncio.wait_for(closed.wait(), 2)
+        assert not any(pool._idle.values())
+
+    asyncio.run(scenario())
+
+
+def test_connection_closed_on_cancel():
+    async def no_answer(writer):
+        pass
+
+    async def scenario():
+        server, url, closed = await serve(no_answer)
+        pool = AsyncHTTPConnectionPool()
+        async with server:
+            task = asyncio.ensure_future(pool.get(url))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.wait_for(closed.wait(), 2)
+        assert not any(pool._idle.values())
+
+    asyncio.run(scenario())
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.mark.parametrize("interval", ["0", "-5", "nan", "inf", "soon"])
+def test_watch_interval_must_be_positive(tmp_path, interval):
+    result = subprocess.run(
+            [sys.executable, str(ROOT / "weather"), f"--watch={interval}"],
+            cwd=tmp_path,
+            capture_output=True,
+            text=True,
+            )
+
+    assert result.returncode == 2
+    assert "--watch" in result.stderr
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+import pytest
+
+import config
+
+# names module exposed before it became lazy composition root
+OLD_NAMES = [
+    "app_config", "COLORISERS", "UNITS", "OPENWEATHER_API",
+    "DEF_DATETIME_FMT", "LANG", "HTTP_POOL_SIZE", "HTTP_CONNECT_TIMEOUT",
+    "HTTP_READ_TIMEOUT", "CACHE_FILENAME", "CACHE_SOFT_TTL",
+    "CACHE_HARD_TTL", "LOCATION_FILE", "LOCATION_CACHE_FILENAME",
+    "LOCATION_CACHE_TTL", "OPENWEATHER_URL", "location_provider",
+    "display_settings", "weather_palette", "icons_palette", "w_painter",
+    "i_painter", "storage", "mode", "formatter", "transport",
+    "network_weather_service", "weather_service", "weather_printer",
+    "save_weather",
+]
+
+
+@pytest.fixture
+def container(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    app = config.Container(OrderedDict(
+        OPW_APIKEY="secret",
+        OPW_DEF_UNITS="metric",
+        OPW_DEF_LANG="ru",
+        DATETIME_FMT="%H:%M",
+        DB_FILENAME="history.jsonl",
+        HTTP_POOL_SIZE="2",
+    ))
+    monkeypatch.setattr(config, "_container", app)
+    return app
+
+
+@pytest.mark.parametrize("name", OLD_NAMES)
+def test_old_module_names_resolve(container, name):
+    # AttributeError if name is lost
+    getattr(config, name)
+
+
+def test_old_settings_values(container):
+    assert config.OPENWEATHER_API == "secret"
+    assert config.DEF_DATETIME_FMT == "%H:%M"
+    assert config.HTTP_POOL_SIZE == 2
+    assert config.CACHE_SOFT_TTL == 600.0
+    assert "appid=secret" in config.OPENWEATHER_URL
+    assert config.COLORISERS is container.colorisers
+    assert config.formatter is container.formatter
+
+
+def test_all_names_resolve(container):
+    for name in config.__all__:
+        getattr(config, name)
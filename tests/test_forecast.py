@@ -0,0 +1,94 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import json
+import time
+
+import pytest
+
+import forecast
+from forecast import OPW_ForecastService
+from weather_models import WeatherDescription
+from weather_utils import TemperatureScaleKind
+
+from conftest import fixture_path
+
+
+@pytest.fixture
+def document():
+    with open(fixture_path("forecast_5d3h.json"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def series(document):
+    return OPW_ForecastService("", "metric").parse_forecast(document)
+
+
+def expected_days(document):
+    data = json.loads(document)
+    shift = timedelta(seconds=data["city"]["timezone"])
+    days = defaultdict(list)
+    for item in data["list"]:
+        moment = datetime.fromtimestamp(item["dt"], timezone.utc) + shift
+        days[moment.date()].append(item["main"]["temp"])
+    return days
+
+
+def test_parse_series(document, series):
+    data = json.loads(document)
+
+    assert series.city == "Moscow"
+    assert series.scale is TemperatureScaleKind.CELSIUS
+    assert series.utc_offset == data["city"]["timezone"]
+    assert len(series) == len(data["list"])
+    assert list(series.timestamps) == [item["dt"] for item in data["list"]]
+    assert list(series.temperatures) == [
+        item["main"]["temp"] for item in data["list"]
+    ]
+    assert [series.description_at(pos) for pos in range(len(series))] == [
+        WeatherDescription(
+            item["weather"][0]["main"],
+            item["weather"][0]["description"],
+            )
+        for item in data["list"]
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_daily_summary(monkeypatch, document, series, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(forecast, "np", None)
+    days = expected_days(document)
+
+    summaries = series.daily_summary()
+
+    assert [summary.day for summary in summaries] == list(days)
+    for summary in summaries:
+        temperatures = days[summary.day]
+        assert summary.min == min(temperatures)
+        assert summary.max == max(temperatures)
+        assert summary.mean == pytest.approx(
+                sum(temperatures) / len(temperatures),
+                )
+
+
+@pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset")
+def test_daily_summary_ignores_host_timezone(monkeypatch, series):
+    expected = series.daily_summary()
+    try:
+        for tz in ("America/Los_Angeles", "Asia/Tokyo"):
+            monkeypatch.setenv("TZ", tz)
+            time.tzset()
+            assert series.daily_summary() == expected
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_broken_document_raises_api_error(document):
+    from exceptions import ApiServiceError
+
+    with pytest.raises(ApiServiceError):
+        OPW_ForecastService("", "metric").parse_forecast(document[:-40])
@@ -0,0 +1,77 @@
+import os
+
+from gps_stream import parse_nmea_sentence, tail_lines
+
+GGA = "GPGGA,123519,5545.120,N,03737.200,E,1,08,0.9,545.4,M,46.9,M,,"
+
+
+def sentence(body: str = GGA) -> str:
+    """NMEA sentence with checksum, as device writes it."""
+    checksum = 0
+    for char in body.encode():
+        checksum ^= char
+    return f"${body}*{checksum:02X}\r\n"
+
+
+def follow(path, actions):
+    """tail_lines whose every poll runs next action on the file."""
+    steps = iter(actions)
+
+    def sleep(_):
+        next(steps)()
+    return tail_lines(path, follow=True, sleep=sleep)
+
+
+def test_follow_skips_recorded_history(tmp_path):
+    log = tmp_path / "gps.nmea"
+    log.write_text("old 1\nold 2\n")
+
+    def append():
+        with open(log, "a") as f:
+            f.write("new\n")
+
+    assert next(follow(log, [append])) == "new\n"
+
+
+def test_not_following_reads_whole_file(tmp_path):
+    log = tmp_path / "gps.nmea"
+    log.write_bytes(sentence().encode() + b"tail")
+
+    lines = list(tail_lines(log, follow=False))
+
+    assert lines == [sentence().replace("\r\n", "\n"), "tail"]
+    assert parse_nmea_sentence(lines[0]) is not None
+
+
+def test_follow_rereads_truncated_file(tmp_path):
+    log = tmp_path / "gps.nmea"
+    log.write_text("old line which is long\n")
+
+    def truncate():
+        log.write_text("fresh\n")
+
+    assert next(follow(log, [truncate])) == "fresh\n"
+
+
+def test_follow_reopens_rotated_file(tmp_path):
+    log = tmp_path / "gps.nmea"
+    log.write_text("old\n")
+
+    def rotate():
+        os.rename(log, tmp_path / "gps.nmea.1")
+        log.write_text("rotated\n")
+
+    assert next(follow(log, [rotate])) == "rotated\n"
+
+
+def test_follow_waits_for_rotated_file_to_appear(tmp_path):
+    log = tmp_path / "gps.nmea"
+    log.write_text("old\n")
+
+    def move_away():
+        os.rename(log, tmp_path / "gps.nmea.1")
+
+    def create():
+        log.write_text("new file\n")
+
+    assert next(follow(log, [move_away, create])) == "new file\n"
@@ -0,0 +1,102 @@
+from datetime import datetime
+import json
+import multiprocessing
+
+from history import JSONLinesWeatherStorage, SQLiteWeatherStorage
+from history import make_observation
+
+from conftest import make_weathers
+
+
+def test_read_range_skips_torn_line_between_records(tmp_path, weather_model):
+    jsonfile = tmp_path / "history.jsonl"
+    JSONLinesWeatherStorage(jsonfile).save(weather_model)
+    with open(jsonfile, "ab") as f:
+        # crash in the middle of write
+        f.write(b'{"date": "2024-01-15 10:0')
+    storage = JSONLinesWeatherStorage(jsonfile)
+    storage.save(weather_model)
+    storage.save(weather_model)
+
+    records = list(storage.read_range())
+
+    assert len(records) == 3
+    assert all(set(record) == {"date", "weather"} for record in records)
+
+
+def test_read_range_skips_foreign_lines(tmp_path, weather_model):
+    jsonfile = tmp_path / "history.jsonl"
+    storage = JSONLinesWeatherStorage(jsonfile)
+    storage.save(weather_model)
+    with open(jsonfile, "a") as f:
+        f.write(json.dumps({"date": "junk"}) + "\n")
+    storage = JSONLinesWeatherStorage(jsonfile)
+    storage.save(weather_model)
+
+    dates = [record["date"] for record in storage.read_range()]
+
+    assert len(dates) == 2
+    assert "junk" not in dates
+
+
+def _append_records(jsonfile, weather_model, count):
+    storage = JSONLinesWeatherStorage(jsonfile)
+    for _ in range(count):
+        storage.save(weather_model)
+
+
+def test_concurrent_writers_keep_index_aligned(tmp_path, weather_model):
+    jsonfile = tmp_path / "history.jsonl"
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(
+            target=_append_records,
+            args=(jsonfile, weather_model, 500),
+        )
+        for _ in range(8)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    records = list(JSONLinesWeatherStorage(jsonfile).read_range())
+
+    assert len(records) == 4000
+    assert all(set(record) == {"date", "weather"} for record in records)
+
+
+def test_index_stays_sorted_across_instances(tmp_path):
+    jsonfile = tmp_path / "history.jsonl"
+    late = JSONLinesWeatherStorage(jsonfile)
+    early = JSONLinesWeatherStorage(jsonfile)
+    record = {"date": "2024-01-15 10:00:00", "weather": "ok"}
+    late._write(record, 2_000.0)
+    # other process with stale clock writes after it
+    early._write(record, 1_000.0)
+
+    with open(jsonfile.with_name("history.jsonl.idx"), "rb") as idx:
+        index = idx.read()
+    entry = JSONLinesWeatherStorage._index_entry
+    stamps = [ts for ts, _ in entry.iter_unpack(index)]
+    assert stamps == [2_000.0, 2_000.0]
+
+
+def test_sqlite_storage_filters_by_city_and_range(tmp_path):
+    weathers = make_weathers(200)
+    storage = SQLiteWeatherStorage(tmp_path / "history.sqlite3")
+    storage.save_many(reversed(weathers[100:]))
+    for weather in weathers[:100]:
+        storage.save(weather)
+    start = datetime(2024, 1, 15, 12, 0)
+    end = datetime(2024, 1, 16, 6, 0)
+
+    found = list(storage.iter_observations("Kazan", start, end))
+
+    expected = [
+        make_observation(weather) for weather in weathers
+        if weather.city == "Kazan" and start <= weather.observed_at <= end
+    ]
+    assert found == expected
+    assert len(list(storage.iter_observations())) == 200
+    storage.close()
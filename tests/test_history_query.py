@@ -0,0 +1,120 @@
+from collections import Counter, defaultdict
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from columnar_storage import ColumnarWeatherStorage
+from exceptions import StorageError
+from history import SQLiteWeatherStorage, make_observation
+from history_query import Bucket, HistoryQueryEngine, np
+from weather_utils import TemperatureScaleKind
+
+from conftest import make_weathers
+
+WEATHERS = make_weathers(500)
+START = datetime(2024, 1, 16, 7, 30)
+END = datetime(2024, 1, 20, 18, 0)
+
+
+@pytest.fixture(params=["sqlite", "columnar"])
+def source(request, tmp_path):
+    if request.param == "sqlite":
+        storage = SQLiteWeatherStorage(tmp_path / "history.sqlite3")
+    else:
+        storage = ColumnarWeatherStorage(tmp_path / "columns")
+    storage.save_many(WEATHERS[:300])
+    storage.save_many(WEATHERS[300:])
+    return storage
+
+
+def expected_observations(city=None, start=None, end=None):
+    return [
+        obs for obs in map(make_observation, WEATHERS)
+        if (city is None or obs.city == city)
+        and (start is None or obs.observed_at >= start)
+        and (end is None or obs.observed_at <= end)
+    ]
+
+
+def brute_force_aggregate(bucket, city, start, end, scale):
+    groups = defaultdict(list)
+    conditions = defaultdict(Counter)
+    for obs in expected_observations(city, start, end):
+        moment = obs.observed_at.replace(minute=0, second=0, microsecond=0)
+        if bucket is Bucket.DAY:
+            moment = moment.replace(hour=0)
+        temperature = obs.temperature
+        if obs.scale != scale.value:
+            if scale is TemperatureScaleKind.CELSIUS:
+                temperature = (temperature - 32) * 5 / 9
+            else:
+                temperature = temperature * 9 / 5 + 32
+        groups[moment, obs.city].append(temperature)
+        conditions[moment, obs.city][obs.main] += 1
+    return [
+        (start_, city_, len(temps), min(temps), max(temps),
+         sum(temps) / len(temps), conditions[start_, city_])
+        for (start_, city_), temps in sorted(groups.items())
+    ]
+
+
+@pytest.mark.parametrize("city, start, end", [
+    (None, None, None),
+    ("Moscow", None, None),
+    (None, START, END),
+    ("Tver", START, END),
+    ("Nowhere", None, None),
+])
+def test_backends_select_same_records(source, city, start, end):
+    engine = HistoryQueryEngine(source)
+
+    found = list(engine.select(city, start, end))
+
+    assert found == expected_observations(city, start, end)
+
+
+@pytest.mark.parametrize("use_numpy", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(
+        np is None, reason="numpy is not installed")),
+])
+@pytest.mark.parametrize("bucket", list(Bucket))
+@pytest.mark.parametrize("city, start, end", [
+    (None, None, None),
+    ("Kazan", START, END),
+])
+@pytest.mark.parametrize("scale", list(TemperatureScaleKind))
+def test_backends_aggregate_alike(
+        source, use_numpy, bucket, city, start, end, scale):
+    engine = HistoryQueryEngine(source, chunk_size=7, use_numpy=use_numpy)
+
+    stats = list(engine.aggregate(bucket, city, start, end, scale))
+
+    expected = brute_force_aggregate(bucket, city, start, end, scale)
+    assert [(s.start, s.city) for s in stats] == [e[:2] for e in expected]
+    for got, (_, _, count, min_, max_, mean, conditions) in zip(
+            stats, expected):
+        assert got.count == count
+        assert got.min == pytest.approx(min_)
+        assert got.max == pytest.approx(max_)
+        assert got.mean == pytest.approx(mean)
+        assert got.conditions == conditions
+
+
+def test_columnar_rejects_dictionary_overflow(tmp_path, weather_model):
+    storage = ColumnarWeatherStorage(tmp_path / "columns")
+    storage.save_many(WEATHERS[:10])
+    cities = [
+        replace(weather_model, city=f"city {i}") for i in range(1 << 16)
+    ]
+
+    with pytest.raises(StorageError):
+        storage.save_many(cities)
+
+    # failed batch leaves neither rows nor codes behind
+    storage.save_many(WEATHERS[10:20])
+    reopened = ColumnarWeatherStorage(tmp_path / "columns")
+    assert len(reopened) == 20
+    assert list(reopened.iter_observations()) == expected_observations(
+            end=WEATHERS[19].observed_at)
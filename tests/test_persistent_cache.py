@@ -0,0 +1,149 @@
+import threading
+
+from coordinates import Coordinates
+from persistent_cache import PersistentCachedWeatherService
+from persistent_cache import SQLiteResponseCache
+from weather_api_service import OPW_WeatherService
+
+from conftest import fixture_path
+
+PLACE = Coordinates(55.75, 37.62)
+
+
+class FixtureTransport:
+    def __init__(self) -> None:
+        with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+            self.body = f.readline().rstrip(b"\n")
+        self.requests = 0
+
+    def get(self, url, timeout=None):
+        self.requests += 1
+        return self.body
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_service(tmp_path, **kwargs):
+    transport = FixtureTransport()
+    clock = Clock()
+    service = PersistentCachedWeatherService(
+            OPW_WeatherService("http://localhost/{latitude}/{longitude}",
+                               "metric", transport),
+            SQLiteResponseCache(tmp_path / "cache.sqlite3"),
+            "ru",
+            soft_ttl=600,
+            hard_ttl=3600,
+            clock=clock,
+            **kwargs,
+            )
+    return service, transport, clock
+
+
+def test_corrupt_entry_is_refetched(tmp_path):
+    service, transport, clock = make_service(tmp_path)
+    cache = SQLiteResponseCache(tmp_path / "cache.sqlite3")
+    cache.put(service._cache_key(PLACE), b'{"main": tru', clock.now)
+
+    weather = service.get_weather(PLACE)
+
+    assert transport.requests == 1
+    assert weather.city == "Moscow"
+    assert cache.get(service._cache_key(PLACE)).body == transport.body
+
+
+def test_stale_entry_is_returned_and_refreshed_by_hook(tmp_path):
+    refreshed = []
+    service, transport, clock = make_service(
+            tmp_path,
+            background_refresh=refreshed.append,
+            )
+    service.get_weather(PLACE)
+    clock.now += 1200
+
+    weather = service.get_weather(PLACE)
+
+    assert weather.city == "Moscow"
+    assert transport.requests == 1
+    assert refreshed == [PLACE]
+
+
+def test_default_refresh_thread_does_not_hold_exit(tmp_path):
+    service, transport, clock = make_service(tmp_path)
+    service.get_weather(PLACE)
+    clock.now += 1200
+
+    service.get_weather(PLACE)
+
+    refreshers = [t for t in threading.enumerate()
+                  if t.name.startswith("weather-refresh-")]
+    assert all(thread.daemon for thread in refreshers)
+    service.wait_refreshes(5)
+    assert transport.requests == 2
+
+
+def test_live_lease_stops_other_refreshers(tmp_path):
+    spawned = []
+    service, transport, clock = make_service(
+            tmp_path,
+            background_refresh=spawned.append,
+            lease_ttl=120,
+            )
+    # next CLI run over the same cache file
+    other, _, _ = make_service(
+            tmp_path,
+            background_refresh=spawned.append,
+            lease_ttl=120,
+            )
+    other._clock = clock
+    service.get_weather(PLACE)
+    clock.now += 1200
+
+    service.get_weather(PLACE)
+    other.get_weather(PLACE)
+    assert spawned == [PLACE]
+
+    # refresh process died without storing response
+    clock.now += 121
+    other.get_weather(PLACE)
+    assert spawned == [PLACE, PLACE]
+
+
+def test_hook_refreshes_key_again_after_it_is_stored(tmp_path):
+    spawned = []
+    service, transport, clock = make_service(
+            tmp_path,
+            background_refresh=spawned.append,
+            )
+    service.get_weather(PLACE)
+    clock.now += 1200
+    service.get_weather(PLACE)
+    # refresh process stores response, which ends the lease
+    service.refresh(PLACE)
+
+    clock.now += 1200
+    service.get_weather(PLACE)
+
+    assert spawned == [PLACE, PLACE]
+
+
+def test_refresh_process_exits_quietly_without_quota(monkeypatch):
+    import config
+    from exceptions import QuotaExceededError
+    from persistent_cache import _refresh_main
+
+    class Service:
+        def refresh(self, coordinates):
+            raise QuotaExceededError("API call quota is exhausted")
+
+    class Container:
+        weather_service = Service()
+
+    monkeypatch.setattr(config, "get_container", lambda: Container())
+
+    assert _refresh_main(["--refresh", "55.75", "37.62"]) is None
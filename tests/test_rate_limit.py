@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from async_weather_service import AsyncWeatherService
+from coordinates import Coordinates
+from exceptions import QuotaExceededError
+from rate_limit import Priority, QuotaStore, RateLimiter, call_priority
+from weather_api_service import OPW_WeatherService
+
+from conftest import fixture_path
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_quota_is_shared_through_store(tmp_path):
+    wall = Clock()
+    store = QuotaStore(tmp_path / "quota.sqlite3", clock=wall)
+    first_run = RateLimiter(per_day=2, max_wait=0, clock=wall, store=store)
+    first_run.acquire()
+    first_run.acquire()
+
+    # next CLI run starts with full buckets of its own
+    second_run = RateLimiter(per_day=2, max_wait=0, clock=wall, store=store)
+    with pytest.raises(QuotaExceededError):
+        second_run.acquire()
+
+    wall.now += 86400 / 2
+    second_run.acquire()
+    assert second_run.stats.granted == 1
+
+
+def test_unusable_store_falls_back_to_process_quota(tmp_path):
+    store = QuotaStore(tmp_path / "missing" / "quota.sqlite3")
+    limiter = RateLimiter(per_minute=1, max_wait=0, store=store)
+
+    limiter.acquire()
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire()
+
+
+class FixtureClient:
+    def __init__(self) -> None:
+        with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+            self._body = f.readline()
+        self.requests = 0
+
+    async def get(self, url: str) -> bytes:
+        self.requests += 1
+        return self._body
+
+    async def close(self) -> None:
+        pass
+
+
+def test_async_batch_is_rate_limited():
+    limiter = RateLimiter(per_minute=2, max_wait=0)
+    service = OPW_WeatherService(
+            "http://localhost/{latitude}/{longitude}",
+            "metric",
+            rate_limiter=limiter,
+            )
+    client = FixtureClient()
+    async_service = AsyncWeatherService(service, client=client)
+    places = [Coordinates(55.0 + i, 37.0) for i in range(3)]
+
+    async def collect():
+        return [r async for r in async_service.get_weather_many(places)]
+
+    results = asyncio.run(collect())
+
+    assert client.requests == 2
+    assert sum(result.ok for result in results) == 2
+    assert [type(r.error) for r in results if not r.ok] == [QuotaExceededError]
+
+
+class BlockedStore:
+    """store whose file is locked by other process until released."""
+
+    def __init__(self) -> None:
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def exchange(self, buckets, decide, timeout=None):
+        self.entered.set()
+        self.release.wait(5)
+        return decide()
+
+
+def test_slow_store_does_not_hold_other_callers():
+    store = BlockedStore()
+    limiter = RateLimiter(per_minute=10, max_wait=0.2, store=store)
+    first = threading.Thread(
+            target=limiter.acquire,
+            args=(Priority.BACKGROUND, ))
+    first.start()
+    store.entered.wait(5)
+
+    started = time.monotonic()
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire(Priority.INTERACTIVE)
+    elapsed = time.monotonic() - started
+    store.release.set()
+    first.join(5)
+
+    assert 0.15 < elapsed < 1.0
+    assert limiter.stats.granted == 1
+
+
+def test_background_wait_may_be_bounded():
+    limiter = RateLimiter(per_minute=1)
+    limiter.acquire(Priority.BACKGROUND)
+
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire(Priority.BACKGROUND, timeout=0.05)
+    assert limiter.stats.deferred == 1
+
+
+def test_cancelled_wait_takes_no_token():
+    clock = Clock()
+    limiter = RateLimiter(per_minute=1, clock=clock)
+    limiter.acquire()
+    cancelled = threading.Event()
+    errors = []
+
+    def wait():
+        try:
+            limiter.acquire(Priority.BACKGROUND, cancelled=cancelled)
+        except QuotaExceededError as err:
+            errors.append(err)
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    time.sleep(0.05)
+    clock.now += 60
+    cancelled.set()
+    limiter.wake()
+    waiter.join(5)
+
+    assert len(errors) == 1
+    assert limiter.stats.granted == 1
+    limiter.acquire()
+    assert limiter.stats.granted == 2
+
+
+def test_cancelled_async_lookup_stops_quota_wait():
+    clock = Clock()
+    limiter = RateLimiter(per_minute=1, clock=clock)
+    service = OPW_WeatherService(
+            "http://localhost/{latitude}/{longitude}",
+            "metric",
+            rate_limiter=limiter,
+            )
+    client = FixtureClient()
+    async_service = AsyncWeatherService(service, client=client)
+    limiter.acquire()
+
+    async def cancel_waiting_lookup():
+        with call_priority(Priority.BACKGROUND):
+            lookup = asyncio.ensure_future(
+                    async_service.get_weather(Coordinates(55.0, 37.0)))
+        await asyncio.sleep(0.05)
+        lookup.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lookup
+        await async_service.close()
+
+    asyncio.run(cancel_waiting_lookup())
+    for _ in range(100):
+        if limiter.stats.rejected:
+            break
+        time.sleep(0.01)
+
+    assert limiter.stats.rejected == 1
+    clock.now += 60
+    limiter.acquire()
+    assert limiter.stats.granted == 2
+    assert client.requests == 0
+
+
+def test_background_wait_is_bounded_by_limiter():
+    limiter = RateLimiter(per_minute=1, max_background_wait=0.05)
+    limiter.acquire(Priority.BACKGROUND)
+
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire(Priority.BACKGROUND)
@@ -0,0 +1,90 @@
+import pytest
+
+from exceptions import ApiServiceError, TransportError
+from resilience import BreakerState, CircuitBreaker, Resilience
+from resilience import RetryPolicy
+from transport import HTTPConnectionPool
+
+
+def make_resilience(delays):
+    return Resilience(
+            RetryPolicy(attempts=3),
+            sleep=delays.append,
+            rnd=lambda: 1.0,
+            )
+
+
+def failing(err):
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise err
+    return attempt, calls
+
+
+@pytest.mark.parametrize("err", [
+    TransportError("connection refused"),
+    TransportError("bad response status 503", status=503),
+])
+def test_transient_errors_are_retried(err):
+    delays = []
+    attempt, calls = failing(err)
+
+    with pytest.raises(TransportError):
+        make_resilience(delays).call(attempt)
+
+    assert len(calls) == 3
+    assert delays == [0.2, 0.4]
+
+
+@pytest.mark.parametrize("err", [
+    TransportError("bad response status 404", status=404),
+    TransportError("unsupported url", transient=False),
+    ApiServiceError("broken response"),
+])
+def test_permanent_errors_are_not_retried(err):
+    delays = []
+    attempt, calls = failing(err)
+    resilience = make_resilience(delays)
+
+    with pytest.raises(ApiServiceError):
+        resilience.call(attempt)
+
+    assert len(calls) == 1
+    assert delays == []
+    assert resilience.stats.failures == 1
+
+
+def test_unsupported_url_is_not_retried():
+    delays = []
+    pool = HTTPConnectionPool()
+    resilience = make_resilience(delays)
+
+    with pytest.raises(TransportError) as info:
+        resilience.call(lambda timeout: pool.get("ftp://example.org", timeout))
+
+    assert info.value.transient is False
+    assert resilience.stats.attempts == 1
+    assert delays == []
+
+
+@pytest.mark.parametrize("err", [KeyError("main"), KeyboardInterrupt()])
+def test_unexpected_error_releases_half_open_probe(err):
+    now = [0.0]
+    breaker = CircuitBreaker(
+            failure_threshold=1,
+            reset_timeout=10.0,
+            clock=lambda: now[0],
+            )
+    resilience = Resilience(RetryPolicy(attempts=1), breaker)
+    with pytest.raises(TransportError):
+        resilience.call(failing(TransportError("refused"))[0])
+    now[0] = 10.0
+    assert breaker.state is BreakerState.HALF_OPEN
+
+    with pytest.raises(type(err)):
+        resilience.call(failing(err)[0])
+
+    assert resilience.call(lambda timeout: "ok") == "ok"
+    assert breaker.state is BreakerState.CLOSED
@@ -0,0 +1,36 @@
+from config import Container
+from settings_utils import _dotenv_mock
+
+
+def read_env(tmp_path, text):
+    path = tmp_path / ".env"
+    path.write_text(text)
+    return _dotenv_mock().dotenv_values(dotenv_path=path)
+
+
+def test_inline_comments_are_dropped(tmp_path):
+    values = read_env(
+            tmp_path,
+            "# whole line comment\n"
+            "HTTP_POOL_SIZE=4          # idle connections kept per host\n"
+            "HTTP_READ_TIMEOUT=10.0\t# seconds\n"
+            "OPENWEATHER_URL=http://localhost/?lat={latitude}#anchor\n",
+            )
+
+    assert values == {
+        "HTTP_POOL_SIZE": "4",
+        "HTTP_READ_TIMEOUT": "10.0",
+        "OPENWEATHER_URL": "http://localhost/?lat={latitude}#anchor",
+    }
+
+
+def test_commented_settings_build_transport(tmp_path):
+    values = read_env(
+            tmp_path,
+            "HTTP_POOL_SIZE=4          # idle connections kept per host\n"
+            "HTTP_CONNECT_TIMEOUT=3.0  # seconds\n",
+            )
+
+    transport = Container(values).transport
+
+    assert transport is not None
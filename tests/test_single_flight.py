@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from coordinates import Coordinates
+from single_flight import AsyncSingleFlight, CoalescingWeatherService
+from single_flight import SingleFlight
+from weather_api_service import OPW_WeatherService
+
+from conftest import fixture_path
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition is not met in time"
+        time.sleep(0.005)
+
+
+def run_callers(flights, func, count):
+    """call flights.do from count threads, return their outcomes."""
+    outcomes = [None] * count
+
+    def call(pos):
+        try:
+            outcomes[pos] = ("result", flights.do("key", func))
+        except Exception as err:
+            outcomes[pos] = ("error", err)
+    threads = [threading.Thread(target=call, args=(i, )) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_calls_of_key_run_once():
+    flights: SingleFlight[object] = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def func():
+        runs.append(1)
+        release.wait(5)
+        return object()
+
+    threads, outcomes = run_callers(flights, func, 8)
+    wait_for(lambda: flights.stats.calls == 8)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(runs) == 1
+    assert len({id(value) for _, value in outcomes}) == 1
+    assert flights.stats.collapsed == 7
+
+
+def test_error_reaches_every_waiter():
+    flights: SingleFlight[object] = SingleFlight()
+    release = threading.Event()
+    error = ValueError("broken response")
+
+    def func():
+        release.wait(5)
+        raise error
+
+    threads, outcomes = run_callers(flights, func, 5)
+    wait_for(lambda: flights.stats.calls == 5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert outcomes == [("error", error)] * 5
+    # nothing is kept after call is over
+    assert flights.do("key", lambda: 42) == 42
+
+
+def test_cancelled_waiter_does_not_cancel_shared_task():
+    flights: AsyncSingleFlight[str] = AsyncSingleFlight()
+    runs = []
+
+    async def fetch():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "weather"
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "weather"
+    assert runs == [1]
+    assert flights.stats.collapsed == 1
+
+
+class BlockingTransport:
+    def __init__(self) -> None:
+        with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+            self.body = f.readline().rstrip(b"\n")
+        self.release = threading.Event()
+        self.requests = 0
+
+    def get(self, url, timeout=None):
+        self.requests += 1
+        self.release.wait(5)
+        return self.body
+
+
+def test_nearby_lookups_share_request():
+    transport = BlockingTransport()
+    service = CoalescingWeatherService(OPW_WeatherService(
+            "http://localhost/{latitude}/{longitude}",
+            "metric",
+            transport,
+            ))
+    places = [Coordinates(55.751, 37.621), Coordinates(55.749, 37.619)]
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda place=place: results.append(
+                service.get_weather(place)))
+        for place in places * 2
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: service.stats.calls == 4)
+    transport.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert transport.requests == 1
+    assert len(results) == 4
+    assert all(weather is results[0] for weather in results)
@@ -0,0 +1,97 @@
+import random
+import time
+
+import pytest
+
+from coordinates import Coordinates, distance_m
+from spatial_cache import SpatialCachedWeatherService, SpatialIndex
+
+
+def brute_nearest(points, place, radius):
+    best = None
+    for index, point in enumerate(points):
+        distance = distance_m(place, point)
+        if distance <= radius and (best is None or distance < best[0]):
+            best = (distance, index)
+    return best
+
+
+def around(rng, latitude, longitude, spread):
+    lat = min(90.0, max(-90.0, latitude + rng.uniform(-spread, spread)))
+    lon = (longitude + rng.uniform(-spread, spread) + 180) % 360 - 180
+    return Coordinates(lat, lon)
+
+
+@pytest.mark.parametrize("centre", [
+    (55.75, 37.62),
+    (0.0, 179.999),
+    (-16.5, -179.99),
+    (89.999, 0.0),
+    (-89.995, 120.0),
+])
+def test_nearest_matches_brute_force(centre):
+    rng = random.Random(f"{centre}")
+    index: SpatialIndex[int] = SpatialIndex(500.0)
+    points = [around(rng, *centre, 0.05) for _ in range(400)]
+    for value, point in enumerate(points):
+        index.insert(point, value, 0.0)
+    for _ in range(200):
+        place = around(rng, *centre, 0.05)
+        for radius in (100.0, 500.0, 2_000.0):
+            expected = brute_nearest(points, place, radius)
+            found = index.nearest(place, radius)
+            if expected is None:
+                assert found is None
+                continue
+            assert found is not None
+            assert found[0] == pytest.approx(expected[0], abs=1e-6)
+            assert found[0] == pytest.approx(
+                    distance_m(place, points[found[2]]), abs=1e-6)
+
+
+def test_nearest_near_pole_does_not_scan_whole_rows():
+    index: SpatialIndex[int] = SpatialIndex(500.0)
+    index.insert(Coordinates(89.9995, 10.0), 1, 0.0)
+    started = time.perf_counter()
+    for _ in range(100):
+        found = index.nearest(Coordinates(89.999, -170.0), 500.0)
+    assert time.perf_counter() - started < 0.1
+    assert found is not None and found[2] == 1
+
+
+def test_expire_and_trim_drop_oldest_points():
+    index: SpatialIndex[str] = SpatialIndex(500.0)
+    index.insert(Coordinates(89.9999, 0.0), "old", 1.0)
+    index.insert(Coordinates(10.0, 10.0), "mid", 2.0)
+    index.insert(Coordinates(10.001, 10.0), "new", 3.0)
+    assert index.expire(before=2.0) == 1
+    assert index.nearest(Coordinates(89.9999, 90.0), 500.0) is None
+    assert index.trim(max_size=1) == 1
+    found = index.nearest(Coordinates(10.0, 10.0), 500.0)
+    assert found is not None and found[2] == "new"
+    assert len(index) == 1
+
+
+class CountingService:
+    units = "metric"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_weather(self, coordinates):
+        self.calls += 1
+        return (coordinates, self.calls)
+
+
+def test_cached_service_answers_from_nearby_observation():
+    now = [0.0]
+    inner = CountingService()
+    service = SpatialCachedWeatherService(
+            inner, radius=500.0, max_age=60.0, clock=lambda: now[0])
+    first = service.get_weather(Coordinates(55.75, 37.62))
+    assert service.get_weather(Coordinates(55.751, 37.621)) is first
+    now[0] = 61.0
+    assert service.get_weather(Coordinates(55.751, 37.621)) is not first
+    assert inner.calls == 2
+    assert service.stats.saved_calls == 1
+    assert service.stats.expired == 1
@@ -0,0 +1,68 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.fake_openweather import FakeOpenWeather, start_server
+from coordinates import Coordinates
+from exceptions import TransportError
+from transport import HTTPConnectionPool
+
+PLACE = Coordinates(55.75, 37.62)
+
+
+@pytest.fixture
+def server(request):
+    fake = FakeOpenWeather(idle_timeout=getattr(request, "param", None))
+    server = start_server(fake)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def weather_url(server):
+    return server.url_template.format(
+            latitude=PLACE.latitude,
+            longitude=PLACE.longitude,
+            )
+
+
+def test_connection_is_reused(server):
+    pool = HTTPConnectionPool()
+
+    for _ in range(5):
+        pool.get(weather_url(server))
+
+    assert pool.stats.misses == 1
+    assert pool.stats.hits == 4
+    pool.close()
+
+
+def test_connection_goes_back_after_error_status(server):
+    pool = HTTPConnectionPool()
+    bad_url = weather_url(server).replace("lat=", "latitude=")
+
+    with pytest.raises(TransportError) as info:
+        pool.get(bad_url)
+    pool.get(weather_url(server))
+
+    assert info.value.status == 400
+    assert pool.stats.misses == 1
+    assert pool.stats.hits == 1
+    pool.close()
+
+
+@pytest.mark.parametrize("server", [0.1], indirect=True)
+def test_stale_connection_is_retried_once(server):
+    pool = HTTPConnectionPool()
+    pool.get(weather_url(server))
+    # server closes idle keep-alive socket meanwhile
+    time.sleep(0.3)
+
+    body = pool.get(weather_url(server))
+
+    assert json.loads(body)["cod"] == 200
+    assert pool.stats.discarded == 1
+    assert pool.stats.misses == 2
+    assert server.fake.stats.ok == 2
+    pool.close()
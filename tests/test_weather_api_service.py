@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from exceptions import ApiServiceError, GroupFetchError, TransportError
+from weather_api_service import OPW_WeatherService, select_fields
+
+from conftest import fixture_path
+
+URL = "http://localhost/{latitude}/{longitude}"
+
+
+@pytest.fixture
+def corpus():
+    with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+        return [line.rstrip(b"\n") for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("loads", [None, json.loads])
+def test_broken_documents_are_rejected(corpus, loads):
+    service = OPW_WeatherService(URL, "metric", loads=loads)
+    valid = corpus[0]
+
+    for resp in (valid[:-1], valid[: len(valid) // 2], valid + b"}",
+                 valid.replace(b'"coord"', b"coord")):
+        with pytest.raises(ApiServiceError):
+            service.parse_weather(resp)
+
+
+def test_select_fields_matches_full_decoding(corpus):
+    full = OPW_WeatherService(URL, "metric", loads=json.loads)
+    selective = OPW_WeatherService(URL, "metric", loads=select_fields)
+
+    for resp in corpus:
+        assert selective.parse_weather(resp) == full.parse_weather(resp)
+
+
+@pytest.fixture
+def group_document():
+    with open(fixture_path("group_response.json"), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("loads", [None, select_fields])
+def test_parse_group_maps_ids_to_models(group_document, loads):
+    records = json.loads(group_document)["list"]
+    service = OPW_WeatherService(URL, "metric", loads=loads)
+
+    weathers = service.parse_group(group_document)
+
+    assert list(weathers) == [record["id"] for record in records]
+    for record in records:
+        weather = weathers[record["id"]]
+        assert weather.city == record["name"]
+        assert weather.temperature.degrees == round(record["main"]["temp"])
+        assert weather.weather_type.main == record["weather"][0]["main"]
+        assert weather.weather_type.description == (
+                record["weather"][0]["description"]
+                )
+
+
+class GroupTransport:
+    """answers first batch with fixture, fails the others."""
+
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        if len(self.urls) > 1:
+            raise TransportError("connection refused")
+        return self._body
+
+
+def test_failed_batch_keeps_received_models(group_document):
+    from weather_api_service import GROUP_SIZE
+
+    records = json.loads(group_document)["list"]
+    fixture_ids = [record["id"] for record in records]
+    ids = fixture_ids + list(range(1, 2 * GROUP_SIZE - len(fixture_ids) + 1))
+    transport = GroupTransport(group_document)
+    service = OPW_WeatherService(
+            URL,
+            "metric",
+            transport,
+            group_url="http://localhost/group?id={ids}",
+            )
+
+    with pytest.raises(GroupFetchError) as info:
+        service.get_weather_by_ids(ids)
+
+    assert len(transport.urls) == 2
+    assert set(info.value.weathers) == set(fixture_ids)
+    assert info.value.failed_ids == ids[GROUP_SIZE:]
+
+
+def test_parse_group_uses_injected_decoder(group_document):
+    decoded = []
+
+    def loads(resp):
+        decoded.append(resp)
+        return json.loads(resp)
+    service = OPW_WeatherService(URL, "metric", loads=loads)
+
+    service.parse_group(group_document)
+
+    assert decoded == [group_document]
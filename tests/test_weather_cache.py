@@ -0,0 +1,107 @@
+import pytest
+
+from coordinates import Coordinates
+from exceptions import ApiServiceError, TransportError
+from weather_api_service import OPW_WeatherService
+from weather_cache import CachedWeatherService, TTLCache
+
+from conftest import fixture_path
+
+PLACE = Coordinates(55.75, 37.62)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entry_expires_after_ttl():
+    clock = Clock()
+    cache: TTLCache[str] = TTLCache(ttl=10, clock=clock)
+    cache.put("key", "value")
+
+    clock.now += 9.9
+    assert cache.get("key") == "value"
+    clock.now += 0.1
+    assert cache.get("key") is None
+
+    assert cache.stats.expired == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache: TTLCache[int] = TTLCache(max_entries=2, clock=Clock())
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # "a" becomes most recently used
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+class ScriptedTransport:
+    """answers with queued bodies or raises queued errors."""
+
+    def __init__(self, *answers) -> None:
+        self._answers = list(answers)
+        self.requests = 0
+
+    def get(self, url, timeout=None):
+        self.requests += 1
+        answer = self._answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def make_service(transport, clock):
+    service = OPW_WeatherService(
+            "http://localhost/{latitude}/{longitude}",
+            "metric",
+            transport,
+            )
+    return CachedWeatherService(service, "ru", ttl=600, clock=clock)
+
+
+@pytest.fixture
+def body():
+    with open(fixture_path("weather_responses.jsonl"), "rb") as f:
+        return f.readline().rstrip(b"\n")
+
+
+def test_close_places_share_entry_until_it_expires(body):
+    clock = Clock()
+    transport = ScriptedTransport(body, body)
+    service = make_service(transport, clock)
+
+    first = service.get_weather(PLACE)
+    assert service.get_weather(Coordinates(55.751, 37.621)) is first
+    clock.now += 600
+    service.get_weather(PLACE)
+
+    assert transport.requests == 2
+    assert service.stats.hits == 1
+
+
+@pytest.mark.parametrize("error", [
+    TransportError("bad response status 503", status=503),
+    b'{"cod": 401, "message": "Invalid API key"}',
+])
+def test_errors_are_not_cached(body, error):
+    transport = ScriptedTransport(error, body)
+    service = make_service(transport, Clock())
+
+    with pytest.raises(ApiServiceError):
+        service.get_weather(PLACE)
+    weather = service.get_weather(PLACE)
+
+    assert weather.city == "Moscow"
+    assert transport.requests == 2
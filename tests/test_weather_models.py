@@ -0,0 +1,15 @@
+from weather_models import CelsiusTemperature, FarenheitTemperature
+
+
+def test_of_shares_instances_per_scale_and_value():
+    assert CelsiusTemperature.of(3) is CelsiusTemperature.of(3)
+    assert CelsiusTemperature.of(3) is not FarenheitTemperature.of(3)
+
+
+def test_of_keeps_number_type():
+    whole = CelsiusTemperature.of(7)
+    fractional = CelsiusTemperature.of(7.0)
+
+    assert type(whole.degrees) is int
+    assert type(fractional.degrees) is float
+    assert CelsiusTemperature.of(7) is whole
@@ -0,0 +1,127 @@
+"""Per-stage timing spans.
+
+    with span("service.parse"):
+        ...
+
+Spans are off by default: span() then returns one shared no-op
+context manager, well under a microsecond per stage. enable() starts
+recording to SpanRecorder."""
+import time
+from types import TracebackType
+from typing import Callable, ContextManager, Dict, Optional, Type
+
+
+__all__ = [
+        "SpanRecorder",
+        "SpanStats",
+        "enable",
+        "disable",
+        "span",
+        ]
+
+
+class SpanStats:
+    # plain class: dataclasses import costs more than CLI startup budget
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc: Optional[BaseException],
+            tb: Optional[TracebackType],
+            ) -> None:
+        return None
+
+
+class _Span:
+    __slots__ = ("_recorder", "_name", "_started")
+
+    def __init__(self, recorder: "SpanRecorder", name: str) -> None:
+        self._recorder = recorder
+        self._name = name
+        self._started = 0.0
+
+    def __enter__(self) -> None:
+        self._started = self._recorder.clock()
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc: Optional[BaseException],
+            tb: Optional[TracebackType],
+            ) -> None:
+        elapsed = self._recorder.clock() - self._started
+        self._recorder.add(self._name, elapsed)
+
+
+class SpanRecorder:
+    """accumulates span durations by name, thread safe."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        # imported here, disabled spans must not slow down startup
+        import threading
+        self.clock = clock
+        self._spans: Dict[str, SpanStats] = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str) -> ContextManager[None]:
+        return _Span(self, name)
+
+    def add(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.add(elapsed)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """milliseconds per span name, in order of first finish."""
+        with self._lock:
+            return {
+                name: {
+                    "count": stats.count,
+                    "total_ms": round(stats.total * 1000, 3),
+                    "max_ms": round(stats.max * 1000, 3),
+                }
+                for name, stats in self._spans.items()
+            }
+
+
+_NO_SPAN = _NoSpan()
+_recorder: Optional[SpanRecorder] = None
+
+
+def enable(clock: Callable[[], float] = time.perf_counter) -> SpanRecorder:
+    global _recorder
+    _recorder = SpanRecorder(clock)
+    return _recorder
+
+
+def disable() -> None:
+    global _recorder
+    _recorder = None
+
+
+def span(name: str) -> ContextManager[None]:
+    recorder = _recorder
+    if recorder is None:
+        return _NO_SPAN
+    return _Span(recorder, name)
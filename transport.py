@@ -0,0 +1,219 @@
+from collections import deque
+from dataclasses import dataclass
+import http.client
+import ssl
+import threading
+from typing import Deque, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from exceptions import TransportError
+from timing import span
+
+
+__all__ = [
+        "HTTPConnectionPool",
+        "PoolStats",
+        ]
+
+
+_HostKey = Tuple[str, str, int]
+_ConnT = Union[http.client.HTTPConnection, http.client.HTTPSConnection]
+
+# errors which mean that kept-alive socket was closed by server
+# between our requests, so request may be safely repeated once.
+_STALE_CONN_ERRORS = (
+        http.client.RemoteDisconnected,
+        http.client.BadStatusLine,
+        BrokenPipeError,
+        ConnectionResetError,
+        ConnectionAbortedError,
+)
+
+
+def _split_url(url: str) -> Tuple[_HostKey, str]:
+    """split url on pool key (scheme, host, port) and request path."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise TransportError(f"unsupported url {url!r}", transient=False)
+    default_port = 443 if parts.scheme == "https" else 80
+    key = (parts.scheme, parts.hostname, parts.port or default_port)
+    path = parts.path or "/"
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    return key, path
+
+
+@dataclass(slots=True)
+class PoolStats:
+    """counters of connection pool usage."""
+    requests: int = 0
+    hits: int = 0
+    misses: int = 0
+    discarded: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """part of requests served by already opened socket."""
+        if not self.requests:
+            return 0.0
+        return self.hits / self.requests
+
+    @property
+    def reuse_rate(self) -> float:
+        """mean requests count per opened socket."""
+        if not self.misses:
+            return 0.0
+        return self.requests / self.misses
+
+
+class HTTPConnectionPool:
+    """Keep-alive HTTP(S) connections, pooled per host.
+
+    SSL context is created once, so repeated requests to the
+    same host reuse TCP+TLS session instead of new handshake."""
+
+    def __init__(
+            self,
+            pool_size: int = 4,
+            connect_timeout: float = 3.0,
+            read_timeout: float = 10.0,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            ) -> None:
+        if pool_size < 1:
+            raise ValueError("pool_size must be positive")
+        self._pool_size = pool_size
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        if ssl_context is None:
+            # keep previous behaviour: certificates were never verified
+            ssl_context = ssl._create_unverified_context()
+        self._ssl_context = ssl_context
+        self._idle: Dict[_HostKey, Deque[_ConnT]] = {}
+        self._lock = threading.Lock()
+        self._stats = PoolStats()
+
+    @property
+    def stats(self) -> PoolStats:
+        return self._stats
+
+    def get(self, url: str, timeout: Optional[float] = None) -> bytes:
+        """make GET request and return response body.
+
+        timeout overrides connect and read timeouts for this request."""
+        key, path = _split_url(url)
+        conn, reused = self._acquire(key, timeout)
+        try:
+            status, body = self._request(conn, path)
+        except _STALE_CONN_ERRORS as err:
+            conn.close()
+            if not reused:
+                raise TransportError(err) from err
+            # server closed idle socket, try once with fresh one
+            self._count_discarded()
+            conn = self._new_connection(key, timeout)
+            status, body = self._safe_request(conn, path)
+        except (OSError, http.client.HTTPException) as err:
+            conn.close()
+            raise TransportError(err) from err
+        self._release(key, conn)
+        if status != 200:
+            raise TransportError(
+                    f"bad response status {status}",
+                    status=status,
+                    )
+        return body
+
+    def close(self) -> None:
+        """close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def _acquire(
+            self,
+            key: _HostKey,
+            timeout: Optional[float],
+            ) -> Tuple[_ConnT, bool]:
+        with self._lock:
+            self._stats.requests += 1
+            idle = self._idle.get(key)
+            if idle:
+                self._stats.hits += 1
+                conn = idle.pop()
+            else:
+                self._stats.misses += 1
+                conn = None
+        if conn is None:
+            return self._new_connection(key, timeout), False
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout or self._read_timeout)
+        return conn, True
+
+    def _release(self, key: _HostKey, conn: _ConnT) -> None:
+        if conn.sock is None:
+            # server asked to close connection, nothing to keep
+            return
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self._pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _count_discarded(self) -> None:
+        with self._lock:
+            self._stats.discarded += 1
+            self._stats.misses += 1
+
+    def _new_connection(
+            self,
+            key: _HostKey,
+            timeout: Optional[float] = None,
+            ) -> _ConnT:
+        scheme, host, port = key
+        connect_timeout = self._connect_timeout
+        if timeout is not None:
+            connect_timeout = min(connect_timeout, timeout)
+        conn: _ConnT
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(
+                    host,
+                    port,
+                    timeout=connect_timeout,
+                    context=self._ssl_context,
+                    )
+        else:
+            conn = http.client.HTTPConnection(
+                    host,
+                    port,
+                    timeout=connect_timeout,
+                    )
+        try:
+            # DNS, TCP and TLS handshake
+            with span("http.connect"):
+                conn.connect()
+        except OSError as err:
+            conn.close()
+            raise TransportError(err) from err
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout or self._read_timeout)
+        return conn
+
+    def _request(self, conn: _ConnT, path: str) -> Tuple[int, bytes]:
+        with span("http.request"):
+            conn.request("GET", path, headers={"Connection": "keep-alive"})
+            response = conn.getresponse()
+            body = response.read()
+        if response.will_close:
+            conn.close()
+        return response.status, body
+
+    def _safe_request(self, conn: _ConnT, path: str) -> Tuple[int, bytes]:
+        try:
+            return self._request(conn, path)
+        except (OSError, http.client.HTTPException) as err:
+            conn.close()
+            raise TransportError(err) from err
+
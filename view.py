@@ -1,6 +1,11 @@
 from sys import stdout
 from datetime import datetime
-from typing import TypeVar
+from functools import lru_cache, partial
+from itertools import islice
+import re
+import unicodedata
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+from typing import TextIO, TypeVar
 from typing import MutableMapping as MutMapp
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, asdict
@@ -10,6 +15,9 @@ from weather_models import FormattedWeather
 
 ItemT = TypeVar("ItemT", contravariant=True)
 
+_ESCAPE_SEQ = re.compile(r"\x1b\[[0-9;]*m")
+_TABLE_HEADER = ("Город / район", "Погода", "Описание", "Восход", "Закат")
+
 
 @dataclass(slots=True, frozen=True)
 class DisplaySettings:
@@ -52,12 +60,141 @@ class CurrentWeatherPrinter(BaseWeatherPrinter):
             return str(item)
 
     def _draw(self, preview: MutMapp[str, str]) -> None:
-        result = (
-                f"{'Город / район:'.ljust(16)}{preview['city']}\n"
-                f"{'Погода:'.ljust(16)}{preview['temperature']}\n"
-                f"{'Описание:'.ljust(16)}{preview['weather_descr']}\n"
-                f"{'Восход:'.ljust(16)}{preview['sunrise']}\n"
-                f"{'Закат:'.ljust(16)}{preview['sunset']}\n"
-        )
+        result = "".join(f"{line}\n" for line in self._make_lines(preview))
         stdout.write(result)
         stdout.flush()
+
+    def _make_lines(self, preview: MutMapp[str, str]) -> List[str]:
+        return [
+                f"{'Город / район:'.ljust(16)}{preview['city']}",
+                f"{'Погода:'.ljust(16)}{preview['temperature']}",
+                f"{'Описание:'.ljust(16)}{preview['weather_descr']}",
+                f"{'Восход:'.ljust(16)}{preview['sunrise']}",
+                f"{'Закат:'.ljust(16)}{preview['sunset']}",
+        ]
+
+
+class WatchWeatherPrinter(CurrentWeatherPrinter):
+    """redraw in place only lines which were changed.
+
+    First call prints all lines, next ones move cursor up to changed
+    lines and rewrite them, cursor is left below the block."""
+
+    _clear_line = "\x1b[2K"
+
+    def __init__(
+            self,
+            settings: DisplaySettings,
+            out: TextIO = stdout,
+            ) -> None:
+        super().__init__(settings)
+        self._out = out
+        self._shown: List[str] = []
+
+    def _draw(self, preview: MutMapp[str, str]) -> None:
+        lines = self._make_lines(preview)
+        if len(lines) != len(self._shown):
+            result = "".join(f"{line}\n" for line in lines)
+        else:
+            result = self._diff(lines)
+        self._shown = lines
+        if result:
+            self._out.write(result)
+            self._out.flush()
+
+    def _diff(self, lines: List[str]) -> str:
+        parts = []
+        total = len(lines)
+        for pos, (old, new) in enumerate(zip(self._shown, lines)):
+            if old == new:
+                continue
+            shift = total - pos
+            parts.append(
+                    f"\x1b[{shift}F{self._clear_line}{new}\x1b[{shift}E",
+                    )
+        return "".join(parts)
+
+
+def _strftime(fmt: str, moment: datetime) -> str:
+    return moment.strftime(fmt)
+
+
+def _visible_width(text: str) -> int:
+    """terminal cells of text: no escapes, wide chars take two cells."""
+    text = _ESCAPE_SEQ.sub("", text)
+    if text.isascii():
+        return len(text)
+    return sum(
+            2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+            for char in text
+            if not unicodedata.combining(char)
+            )
+
+
+class TableWeatherPrinter(BaseWeatherPrinter):
+    """display many locations as aligned table.
+
+    Whole table (or page, if page_size is set) goes to output
+    with single write."""
+
+    _column_sep = "  "
+
+    def __init__(
+            self,
+            settings: DisplaySettings,
+            out: TextIO = stdout,
+            page_size: Optional[int] = None,
+            ) -> None:
+        super().__init__(settings)
+        self._out = out
+        self._page_size = page_size
+        # sunrise / sunset of one day repeat a lot among rows
+        self._format_time: Callable[[datetime], str] = lru_cache(
+                maxsize=4096,
+                )(partial(_strftime, settings.datetime_fmt))
+
+    def display_weather(self, weather: FormattedWeather) -> None:
+        self.display_many((weather, ))
+
+    def display_many(self, weathers: Iterable[FormattedWeather]) -> None:
+        for page in self._pages(weathers):
+            self._out.write(self._render(page))
+            self._out.flush()
+
+    def _pages(
+            self,
+            weathers: Iterable[FormattedWeather],
+            ) -> Iterator[List[Sequence[str]]]:
+        rows = map(self._make_row, weathers)
+        if self._page_size is None:
+            yield list(rows)
+            return
+        while page := list(islice(rows, self._page_size)):
+            yield page
+
+    def _make_row(self, weather: FormattedWeather) -> Sequence[str]:
+        city = weather.city
+        if isinstance(city, bytes):
+            city = city.decode()
+        return (
+            city,
+            weather.temperature,
+            weather.weather_descr,
+            self._format_time(weather.sunrise),
+            self._format_time(weather.sunset),
+        )
+
+    def _render(self, rows: List[Sequence[str]]) -> str:
+        table = [_TABLE_HEADER, *rows]
+        cell_widths = [[_visible_width(cell) for cell in row] for row in table]
+        col_widths = [max(column) for column in zip(*cell_widths)]
+        lines = []
+        for row, widths in zip(table, cell_widths):
+            cells = [
+                f"{cell}{' ' * (col_width - width)}"
+                for cell, width, col_width in zip(row, widths, col_widths)
+            ]
+            lines.append(self._column_sep.join(cells).rstrip())
+        lines.append("")
+        return "\n".join(lines)
+
@@ -0,0 +1,77 @@
+import re
+import time
+from typing import Callable, Optional, Tuple
+
+from coordinates import Coordinates, LocationProvider
+from exceptions import ApiServiceError, CantGetCoordinates, StorageError
+from history import WeatherStorage, save_weather
+from view import BaseWeatherPrinter
+from weather_api_service import ExternalWeatherService
+from weather_formatter import WeatherFormatter
+from base_types import LiteralT
+
+
+__all__ = [
+        "peek_observation_time",
+        "run_watch",
+        ]
+
+
+# top level "dt" of current weather response, observation unix time
+_DT_PATTERN = re.compile(rb'"dt"\s*:\s*(\d+)')
+
+
+def peek_observation_time(response: LiteralT) -> Optional[int]:
+    """find observation time without decoding whole response."""
+    if isinstance(response, str):
+        response = response.encode()
+    match_ = _DT_PATTERN.search(response)
+    if match_ is None:
+        return None
+    return int(match_[1])
+
+
+def run_watch(
+        service: ExternalWeatherService,
+        location_provider: LocationProvider,
+        formatter: WeatherFormatter,
+        printer: BaseWeatherPrinter,
+        interval: float,
+        storage: Optional[WeatherStorage] = None,
+        iterations: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        ) -> None:
+    """refresh weather every interval seconds until interrupted.
+
+    Service, formatter and printer live between refreshes, so
+    connection stays open. Response with already shown observation
+    time (and same place) is not parsed nor formatted."""
+    shown: Optional[Tuple[Coordinates, Optional[int]]] = None
+    done = 0
+    try:
+        while iterations is None or done < iterations:
+            if done:
+                sleep(interval)
+            done += 1
+            try:
+                coordinates = location_provider.get_coordinates()
+                response = service.get_raw_weather(coordinates)
+            except (CantGetCoordinates, ApiServiceError):
+                # keep last picture, try again on next tick
+                continue
+            observation = (coordinates, peek_observation_time(response))
+            if observation[1] is not None and observation == shown:
+                continue
+            try:
+                weather = service.parse_weather(response)
+            except ApiServiceError:
+                continue
+            printer.display_weather(formatter.format_weather(weather))
+            shown = observation
+            if storage is not None:
+                try:
+                    save_weather(weather, storage)
+                except StorageError:
+                    pass
+    except KeyboardInterrupt:
+        pass
@@ -1,16 +1,14 @@
 from datetime import datetime
 import json
-from json.decoder import JSONDecodeError
-import ssl
-from typing import Literal, Mapping, TypeAlias
-from typing import Union, Any
-import urllib.request
-from urllib.error import URLError
+import re
+import sys
+from typing import Callable, Dict, Iterable, List, Literal, Mapping, Tuple
+from typing import Type, TypeAlias, TypeVar, Union, Any, Optional
 from abc import ABC, abstractmethod
 
 from coordinates import Coordinates
 
-from exceptions import ApiServiceError
+from exceptions import ApiServiceError, GroupFetchError
 from weather_models import (
         WeatherModel,
         WeatherDescription,
@@ -19,12 +17,85 @@ from weather_models import (
         FarenheitTemperature,
 )
 from weather_utils import TemperatureScaleKind
-from base_types import NumericArg, LiteralT, NumericT
+from transport import HTTPConnectionPool
+from rate_limit import RateLimiter
+from resilience import Resilience
+from timing import span
+from base_types import LiteralT, NumericT
 
 
 JSONRespT: TypeAlias = Mapping[Any, Any]
+JSONLoadsT: TypeAlias = Callable[[LiteralT], Any]
 DimSystemT: TypeAlias = Union[Literal["metric"], Literal["imperial"]]
 SunTimeT: TypeAlias = Union[Literal["sunrise"], Literal["sunset"]]
+CityIdT: TypeAlias = int
+
+_T = TypeVar("_T")
+
+# OpenWeather group endpoint accepts at most 20 city ids
+GROUP_SIZE = 20
+
+# top level fields used by model, "list" holds records of group response
+_SELECTED_FIELDS = re.compile(r'"(weather|main|sys|name|dt|list)"\s*:\s*')
+_FIELD_DECODER = json.JSONDecoder()
+
+
+def select_fields(resp: LiteralT) -> Dict[str, Any]:
+    """decode only values of fields used by model, opt-in fast path
+    (OPW_WeatherService(..., loads=select_fields)) for trusted service.
+
+    Search goes on after end of decoded value, so keys nested in it
+    (weather[0].main) are never taken for top level ones; "list" of
+    group response is decoded whole. Other parts of response (coord,
+    wind, ...) are skipped without decoding, so they are not validated
+    and key looking like wanted one inside them may be taken. Default
+    decoder checks whole document."""
+    if isinstance(resp, bytes):
+        resp = resp.decode()
+    fields: Dict[str, Any] = {}
+    pos = 0
+    while len(fields) < 5:
+        match_ = _SELECTED_FIELDS.search(resp, pos)
+        if match_ is None:
+            break
+        fields[match_[1]], pos = _FIELD_DECODER.raw_decode(resp, match_.end())
+    return fields
+
+
+# faster decoder if installed, all of them take bytes and raise ValueError
+try:
+    import orjson  # type: ignore[import]
+    full_json_loads: JSONLoadsT = orjson.loads
+except ImportError:
+    try:
+        import ujson  # type: ignore[import]
+        full_json_loads = ujson.loads
+    except ImportError:
+        full_json_loads = json.loads
+
+# anything broken or missing in response
+_PARSE_ERRORS = (
+        ValueError,
+        KeyError,
+        IndexError,
+        TypeError,
+        OverflowError,
+        OSError,
+        )
+
+# descriptions are immutable and have few distinct values
+_MAX_SHARED_DESCRIPTIONS = 1024
+_DESCRIPTIONS: Dict[Tuple[str, str], WeatherDescription] = {}
+
+
+def _shared_description(main: str, description: str) -> WeatherDescription:
+    key = (main, description)
+    weather_descr = _DESCRIPTIONS.get(key)
+    if weather_descr is None:
+        weather_descr = WeatherDescription(main=main, description=description)
+        if len(_DESCRIPTIONS) < _MAX_SHARED_DESCRIPTIONS:
+            _DESCRIPTIONS[key] = weather_descr
+    return weather_descr
 
 
 class ExternalWeatherService(ABC):
@@ -33,103 +104,190 @@ class ExternalWeatherService(ABC):
             self,
             url: str,
             units: DimSystemT,
+            transport: Optional[HTTPConnectionPool] = None,
+            loads: Optional[JSONLoadsT] = None,
+            resilience: Optional[Resilience] = None,
+            rate_limiter: Optional[RateLimiter] = None,
             ) -> None:
         self._url = url
         self._units = units
+        if transport is None:
+            transport = HTTPConnectionPool()
+        self._transport = transport
+        self._loads = full_json_loads if loads is None else loads
+        self._resilience = resilience
+        self._rate_limiter = rate_limiter
         if self._units == "metric":
             self._tmpr_scale = TemperatureScaleKind.CELSIUS
         else:
             self._tmpr_scale = TemperatureScaleKind.FARENHEIT
 
+    @property
+    def units(self) -> DimSystemT:
+        return self._units
+
+    @property
+    def transport(self) -> HTTPConnectionPool:
+        return self._transport
+
+    @property
+    def resilience(self) -> Optional[Resilience]:
+        """retry and circuit breaker state, None if requests go as is."""
+        return self._resilience
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        return self._rate_limiter
+
     def get_weather(self, coordinates: Coordinates) -> WeatherModel:
-        response = self._get_weather_service_response(
+        response = self.get_raw_weather(coordinates)
+        weather = self.parse_weather(response)
+        return weather
+
+    def get_raw_weather(self, coordinates: Coordinates) -> LiteralT:
+        """fetch service response without parsing."""
+        with span("service.fetch"):
+            return self._call(
+                    lambda timeout: self._get_weather_service_response(
+                        latitude=coordinates.latitude,
+                        longitude=coordinates.longitude,
+                        timeout=timeout,
+                        ),
+                    )
+
+    def parse_weather(self, resp: LiteralT) -> WeatherModel:
+        """build model from raw service response."""
+        with span("service.parse"):
+            return self._parse_weather_service_response(resp)
+
+    def weather_url(self, coordinates: Coordinates) -> str:
+        return self._url.format(
                 latitude=coordinates.latitude,
-                longitude=coordinates.longitude
+                longitude=coordinates.longitude,
                 )
-        weather = self._parse_weather_service_response(response)
-        return weather
 
     def _get_weather_service_response(
             self,
             latitude: NumericT,
             longitude: NumericT,
+            timeout: Optional[float] = None,
             ) -> LiteralT:
-        ssl._create_default_https_context = ssl._create_unverified_context
         url = self._url.format(latitude=latitude, longitude=longitude)
-        try:
-            return urllib.request.urlopen(url).read()
-        except URLError:
-            raise ApiServiceError
+        return self._get(url, timeout)
 
-    def _parse_weather_service_response(self, resp: LiteralT) -> WeatherModel:
-        try:
-            openweather_dict = json.loads(resp)
-        except JSONDecodeError:
-            raise ApiServiceError
-        return WeatherModel(
-            temperature=self._get_temperature(openweather_dict),
-            weather_type=self._parse_weather_descr(openweather_dict),
-            sunrise=self._parse_sun_time(openweather_dict, "sunrise"),
-            sunset=self._parse_sun_time(openweather_dict, "sunset"),
-            city=self._parse_city(openweather_dict)
-        )
+    def _call(self, attempt: Callable[[Optional[float]], _T]) -> _T:
+        """run attempt(timeout) with retries if resilience is set."""
+        if self._resilience is None:
+            return attempt(None)
+        return self._resilience.call(attempt)
 
-    @abstractmethod
-    def _get_temperature(self, data_src: JSONRespT) -> BaseWeatherTemperature:
-        pass
+    def _get(self, url: str, timeout: Optional[float] = None) -> bytes:
+        if self._rate_limiter is not None:
+            # every attempt, retries included, is counted by quota
+            with span("service.rate_limit"):
+                self._rate_limiter.acquire()
+        return self._transport.get(url, timeout)
 
-    @abstractmethod
-    def _parse_weather_descr(self, data_src: JSONRespT) -> WeatherDescription:
-        pass
-
-    @abstractmethod
-    def _parse_sun_time(
-            self,
-            data_src: JSONRespT,
-            time: SunTimeT,
-            ) -> datetime:
-        pass
+    def _parse_weather_service_response(self, resp: LiteralT) -> WeatherModel:
+        try:
+            return self._build_model(self._loads(resp))
+        except _PARSE_ERRORS as err:
+            raise ApiServiceError(err)
 
     @abstractmethod
-    def _parse_city(self, data_src: JSONRespT) -> LiteralT:
+    def _build_model(self, data: JSONRespT) -> WeatherModel:
+        """model of decoded response, errors are wrapped by caller."""
         pass
 
 
 class OPW_WeatherService(ExternalWeatherService):
 
-    def _get_temperature(self, data_src: JSONRespT) -> BaseWeatherTemperature:
-        "TODO: have to separate specific classes creation from Service."""
-        temperature = self._convert_temperature_to_arg(
-                data_src["main"]["temp"],
+    def __init__(
+            self,
+            url: str,
+            units: DimSystemT,
+            transport: Optional[HTTPConnectionPool] = None,
+            loads: Optional[JSONLoadsT] = None,
+            resilience: Optional[Resilience] = None,
+            rate_limiter: Optional[RateLimiter] = None,
+            group_url: Optional[str] = None,
+            ) -> None:
+        super().__init__(
+                url,
+                units,
+                transport,
+                loads,
+                resilience,
+                rate_limiter,
                 )
+        self._group_url = group_url
+        self._temperature_cls: Type[BaseWeatherTemperature]
         if self._tmpr_scale is TemperatureScaleKind.CELSIUS:
-            return CelsiusTemperature(temperature)
-        return FarenheitTemperature(temperature)
+            self._temperature_cls = CelsiusTemperature
+        else:
+            self._temperature_cls = FarenheitTemperature
 
-    def _convert_temperature_to_arg(self, value: NumericT) -> NumericArg:
-        "TODO: have to separate specific classes creation from Service."""
-        return NumericArg(round(value))
+    def get_weather_by_ids(
+            self,
+            city_ids: Iterable[CityIdT],
+            ) -> Dict[CityIdT, WeatherModel]:
+        """weather of many cities, GROUP_SIZE cities per request.
 
-    def _parse_weather_descr(self, data_src: JSONRespT) -> WeatherDescription:
-        try:
-            weather_type = data_src["weather"][0]["main"]
-            weather_descr = data_src["weather"][0]["description"]
-            return WeatherDescription(
-                    main=weather_type,
-                    description=weather_descr,
-            )
-        except (KeyError, IndexError) as err:
-            raise ApiServiceError(err)
+        Needs group_url template with {ids} placeholder. Failed batch
+        does not stop the others; if any failed, GroupFetchError is
+        raised after all of them with models that were received."""
+        if self._group_url is None:
+            raise ApiServiceError("group endpoint url is not set")
+        ids = list(dict.fromkeys(city_ids))
+        weathers: Dict[CityIdT, WeatherModel] = {}
+        failed_ids: List[CityIdT] = []
+        errors: List[ApiServiceError] = []
+        for start in range(0, len(ids), GROUP_SIZE):
+            batch = ids[start:start + GROUP_SIZE]
+            url = self._group_url.format(ids=",".join(map(str, batch)))
+            try:
+                with span("service.fetch_group"):
+                    response = self._call(
+                            lambda timeout: self._get(url, timeout),
+                            )
+                weathers.update(self.parse_group(response))
+            except ApiServiceError as err:
+                failed_ids.extend(batch)
+                errors.append(err)
+        if errors:
+            raise GroupFetchError(
+                    f"{len(errors)} of group requests failed: {errors[0]}",
+                    weathers=weathers,
+                    failed_ids=failed_ids,
+                    ) from errors[0]
+        return weathers
 
-    def _parse_sun_time(
-            self,
-            data_src: JSONRespT,
-            time: SunTimeT,
-            ) -> datetime:
-        return datetime.fromtimestamp(data_src["sys"][time])
+    def parse_group(self, resp: LiteralT) -> Dict[CityIdT, WeatherModel]:
+        """models of group response "list", keyed by city id."""
+        with span("service.parse_group"):
+            try:
+                records = self._loads(resp)["list"]
+                return {
+                    record["id"]: self._build_model(record)
+                    for record in records
+                }
+            except _PARSE_ERRORS as err:
+                raise ApiServiceError(err)
 
-    def _parse_city(self, data_src: JSONRespT) -> LiteralT:
-        try:
-            return data_src["name"]
-        except KeyError:
-            raise ApiServiceError
+    def _build_model(self, data: JSONRespT) -> WeatherModel:
+        """model of one current weather record, errors are not wrapped."""
+        weather = data["weather"][0]
+        sun = data["sys"]
+        city = data["name"]
+        dt = data.get("dt")
+        return WeatherModel(
+            temperature=self._temperature_cls.of(round(data["main"]["temp"])),
+            weather_type=_shared_description(
+                weather["main"],
+                weather["description"],
+                ),
+            sunrise=datetime.fromtimestamp(sun["sunrise"]),
+            sunset=datetime.fromtimestamp(sun["sunset"]),
+            city=sys.intern(city) if isinstance(city, str) else city,
+            observed_at=None if dt is None else datetime.fromtimestamp(dt),
+        )
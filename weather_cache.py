@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+from typing import Callable, Generic, Hashable, NamedTuple, Optional
+from typing import Tuple, TypeVar
+
+from coordinates import Coordinates, round_coordinates
+from weather_api_service import ExternalWeatherService
+from weather_models import WeatherModel
+
+
+__all__ = [
+        "CacheKey",
+        "CacheStats",
+        "TTLCache",
+        "CachedWeatherService",
+        "make_cache_key",
+        ]
+
+
+_V = TypeVar("_V")
+ClockT = Callable[[], float]
+
+DEFAULT_TTL = 600.0
+DEFAULT_PRECISION = 2
+
+
+class CacheKey(NamedTuple):
+    latitude: float
+    longitude: float
+    units: str
+    lang: str
+
+
+def make_cache_key(
+        coordinates: Coordinates,
+        units: str,
+        lang: str,
+        precision: int = DEFAULT_PRECISION,
+        ) -> CacheKey:
+    """quantize coordinates, so close points share one key.
+
+    precision 2 gives cells about 1.1 km by latitude."""
+    rounded = round_coordinates(coordinates, precision)
+    return CacheKey(rounded.latitude, rounded.longitude, units, lang)
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expired: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return self.hits / total
+
+
+class TTLCache(Generic[_V]):
+    """LRU mapping with per-entry time to live."""
+
+    def __init__(
+            self,
+            ttl: float = DEFAULT_TTL,
+            max_entries: int = 1024,
+            clock: ClockT = time.monotonic,
+            ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._items: OrderedDict[Hashable, Tuple[float, _V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[_V]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._stats.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at <= self._clock():
+                del self._items[key]
+                self._stats.expired += 1
+                self._stats.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def put(
+            self,
+            key: Hashable,
+            value: _V,
+            ttl: Optional[float] = None,
+            ) -> None:
+        expires_at = self._clock() + (self._ttl if ttl is None else ttl)
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_entries:
+                self._items.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class CachedWeatherService:
+    """in-process cache in front of ExternalWeatherService."""
+
+    def __init__(
+            self,
+            service: ExternalWeatherService,
+            lang: str,
+            ttl: float = DEFAULT_TTL,
+            max_entries: int = 1024,
+            precision: int = DEFAULT_PRECISION,
+            clock: ClockT = time.monotonic,
+            ) -> None:
+        self._service = service
+        self._lang = lang
+        self._precision = precision
+        self._cache: TTLCache[WeatherModel] = TTLCache(
+                ttl,
+                max_entries,
+                clock,
+                )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def get_weather(self, coordinates: Coordinates) -> WeatherModel:
+        key = self.cache_key(coordinates)
+        weather = self._cache.get(key)
+        if weather is None:
+            weather = self._service.get_weather(coordinates)
+            self._cache.put(key, weather)
+        return weather
+
+    def cache_key(self, coordinates: Coordinates) -> CacheKey:
+        return make_cache_key(
+                coordinates,
+                self._service.units,
+                self._lang,
+                self._precision,
+                )
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Optional
-from typing import List, ClassVar
+from typing import Dict, Iterable, Iterator, Tuple, ClassVar
 
 from weather_models import FormattedWeather, WeatherDescription
 from weather_models import WeatherModel, BaseWeatherIconKind
@@ -11,7 +11,7 @@ from weather_utils import (
         UnicodeWeatherKindIcons,
         )
 from colors import BasePainter, DrawMode
-from base_types import ColorMapT, LiteralT, ColorableT, LiteralArg
+from base_types import ColorMapT, ColorableT, LiteralArg
 
 
 def get_icon_by_description(
@@ -32,6 +32,13 @@ class WeatherFormatter(ABC):
     def format_weather(self, weather: WeatherModel) -> FormattedWeather:
         pass
 
+    def format_many(
+            self,
+            weathers: Iterable[WeatherModel],
+            ) -> Iterator[FormattedWeather]:
+        for weather in weathers:
+            yield self.format_weather(weather)
+
 
 class OpenweatherColorFormatter(WeatherFormatter):
 
@@ -44,29 +51,77 @@ class OpenweatherColorFormatter(WeatherFormatter):
             ) -> None:
         self._painters = painters
         self._mode = mode
+        # painters resolved by item type, filled on first use
+        self._painters_by_type: Dict[type, BasePainter] = {}
+        # one shared icon object per icon kind
+        self._icons: Dict[UnicodeWeatherKindIcons, BaseWeatherIconKind] = {
+            icon: self._build_icon(icon) for icon in UnicodeWeatherKindIcons
+        }
+        self._icons_by_descr: Dict[Tuple[str, str], BaseWeatherIconKind] = {}
 
     def format_weather(self, weather: WeatherModel) -> FormattedWeather:
-        temperature: LiteralT = ""
-        items: List[LiteralT] = []
         w_type = weather.weather_type
-        w_icon = self._get_weather_icon(w_type)
-        icon = self._build_icon(w_icon)
-        if self._mode is DrawMode.FULLCOLOR:
-            for item in (weather.temperature, icon):
-                items.append(self._colorise(item))
-        else:
-            temperature = self._make_monochrom(weather.temperature)
-            items.extend([temperature, icon.value])
-        full_weather_str = self._compile(items)
-        items.clear()
         return FormattedWeather(
                 city=weather.city,
-                temperature=full_weather_str,
+                temperature=self._render(weather),
                 weather_descr=w_type.description,
                 sunrise=weather.sunrise,
                 sunset=weather.sunset,
         )
 
+    def format_many(
+            self,
+            weathers: Iterable[WeatherModel],
+            ) -> Iterator[FormattedWeather]:
+        """format batch, all lookups are cached between items."""
+        render = self._render
+        for weather in weathers:
+            yield FormattedWeather(
+                    weather.city,
+                    render(weather),
+                    weather.weather_type.description,
+                    weather.sunrise,
+                    weather.sunset,
+            )
+
+    def format_row(self, items: Iterable[ColorableT]) -> str:
+        """paint items of one line, e.g. forecast temperatures."""
+        if self._mode is DrawMode.FULLCOLOR:
+            paint = self._colorise
+        else:
+            paint = self._make_monochrom
+        cells = " ".join(map(paint, items))
+        return f"{cells} {self._end_unicode_line}"
+
+    def icon_for(self, description: WeatherDescription) -> BaseWeatherIconKind:
+        return self._get_icon_for(description)
+
+    def _render(self, weather: WeatherModel) -> str:
+        icon = self._get_icon_for(weather.weather_type)
+        temperature = weather.temperature
+        if self._mode is DrawMode.FULLCOLOR:
+            return (
+                f"{self._colorise(temperature)} "
+                f"{self._colorise(icon)} "
+                f"{self._end_unicode_line}"
+            )
+        return (
+            f"{self._make_monochrom(temperature)} "
+            f"{icon.value} "
+            f"{self._end_unicode_line}"
+        )
+
+    def _get_icon_for(
+            self,
+            description: WeatherDescription,
+            ) -> BaseWeatherIconKind:
+        key = (description.main, description.description)
+        icon = self._icons_by_descr.get(key)
+        if icon is None:
+            icon = self._icons[self._get_weather_icon(description)]
+            self._icons_by_descr[key] = icon
+        return icon
+
     def _get_weather_icon(
             self,
             description: WeatherDescription,
@@ -87,12 +142,12 @@ class OpenweatherColorFormatter(WeatherFormatter):
         return painter.paint_nocolor(item)
 
     def _get_painter_for(self, item: ColorableT) -> BasePainter:
-        key = create_subscr_key(item)
-        return self._painters[key]
-
-    def _compile(self, items: list) -> str:
-        items.append(self._end_unicode_line)
-        return " ".join(items)
+        item_type = type(item)
+        painter = self._painters_by_type.get(item_type)
+        if painter is None:
+            painter = self._painters[create_subscr_key(item_type)]
+            self._painters_by_type[item_type] = painter
+        return painter
 
 
 def format_weather(weather: WeatherModel) -> str:
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import TypeAlias, TypeVar, Type, cast
+from typing import ClassVar, Dict, Optional, Tuple, TypeAlias, TypeVar
+from typing import Type, cast
 from enum import Enum
 
 from base_types import WeatherArg, WeatherInfoPart, LiteralT, NumericT
+from base_types import NumericArg
+from weather_utils import TemperatureScaleKind
 
 
 WeatherType: TypeAlias = str
@@ -37,36 +40,70 @@ class _TempScaleUnicodeSymbols(str, Enum):
 
 
 class BaseWeatherTemperature(WeatherInfoPart):
-    """Base class, represents temperature object."""
+    """Base class, represents temperature object.
+
+    Temperature is immutable, so equal values may share one instance,
+    see of()."""
+
+    __slots__ = ("_temp", )
 
     _scale = _TempScaleUnicodeSymbols
+    _temp_kind: ClassVar[str] = ""
+    scale_kind: ClassVar[TemperatureScaleKind]
 
     def __init__(self, value: WeatherArg) -> None:
         """TODO do we type check or assert here?"""
-        self._temp = value
-        self._temp_kind = ""
+        # keep plain number, not WeatherArg box
+        self._temp: NumericT = value.value
 
     @classmethod
     def rebuild(cls: Type[TemperatureT], item: WeatherArg) -> TemperatureT:
         return cast(TemperatureT, cls(item))
 
+    @classmethod
+    def of(cls: Type[TemperatureT], value: NumericT) -> TemperatureT:
+        """shared instance for value (flyweight)."""
+        # 1 == 1.0, but formatting differs
+        key = (cls, type(value), value)
+        temperature = _TEMPERATURES.get(key)
+        if temperature is None:
+            temperature = cls(NumericArg(value))
+            if len(_TEMPERATURES) < _MAX_SHARED_TEMPERATURES:
+                _TEMPERATURES[key] = temperature
+        return cast(TemperatureT, temperature)
+
     def __repr__(self) -> str:
-        return f"{type(self).__name__} {self._temp.value}{self._temp_kind}"
+        return f"{type(self).__name__} {self._temp}{self._temp_kind}"
 
     @property
     def kind(self) -> str:
         return self._temp_kind
 
+    @property
+    def degrees(self) -> NumericT:
+        """value in own scale, as it was received."""
+        return self._temp
+
     def draw(self) -> str:
-        tmpr_value = self._temp.value
+        tmpr_value = self._temp
         return f"{tmpr_value}{self._temp_kind}"
 
 
+# rounded temperatures have few distinct values, so cache stays small
+_MAX_SHARED_TEMPERATURES = 4096
+_TEMPERATURES: Dict[
+        Tuple[type, type, NumericT],
+        BaseWeatherTemperature,
+        ] = {}
+
+
 class BaseWeatherIconKind(WeatherInfoPart):
     """Base class, represents Unicode icon object."""
 
+    __slots__ = ("_value", )
+
     def __init__(self, value: WeatherArg) -> None:
-        self._value = value
+        self._value: LiteralT = value.value
 
     @classmethod
     def rebuild(cls: Type[IconT], item: WeatherArg) -> IconT:
@@ -74,16 +111,18 @@ class BaseWeatherIconKind(WeatherInfoPart):
 
     @property
     def value(self) -> LiteralT:
-        return self._value.value
+        return self._value
 
     def draw(self) -> str:
-        ic_value = self._value.value
+        ic_value = self._value
         return str(ic_value)
 
 
 class WeatherIcon(BaseWeatherIconKind):
     """Simple base icon."""
 
+    __slots__ = ()
+
     def __init__(self, value: WeatherArg) -> None:
         super().__init__(value)
 
@@ -93,33 +132,35 @@ class WeatherIcon(BaseWeatherIconKind):
 
 class CelsiusTemperature(BaseWeatherTemperature):
 
-    def __init__(self, temp: WeatherArg) -> None:
-        super().__init__(temp)
-        self._temp_kind = self._scale.CELSIUS
+    __slots__ = ()
+
+    scale_kind = TemperatureScaleKind.CELSIUS
+    _temp_kind = BaseWeatherTemperature._scale.CELSIUS
 
     @property
     def value(self) -> NumericT:
-        return self._temp.value
+        return self._temp
 
 
 class FarenheitTemperature(BaseWeatherTemperature):
 
-    def __init__(self, temp: WeatherArg) -> None:
-        super().__init__(temp)
-        self._temp_kind = self._scale.FARENHEIT
+    __slots__ = ()
+
+    scale_kind = TemperatureScaleKind.FARENHEIT
+    _temp_kind = BaseWeatherTemperature._scale.FARENHEIT
 
     @property
     def value(self) -> NumericT:
-        return (self._temp.value - 32) * (5 / 9)
+        return (self._temp - 32) * (5 / 9)
 
 
-@dataclass(slots=True)
+@dataclass(slots=True, frozen=True)
 class WeatherDescription:
     main: str
     description: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FormattedWeather:
     city: LiteralT
     temperature: str
@@ -128,10 +169,11 @@ class FormattedWeather:
     sunset: datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class WeatherModel:
     temperature: BaseWeatherTemperature
     weather_type: WeatherDescription
     sunrise: datetime
     sunset: datetime
     city: LiteralT
+    observed_at: Optional[datetime] = None